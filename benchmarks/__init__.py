@@ -0,0 +1 @@
+"""Benchmarks: synthetic terminal sessions and the performance suite (not installed with fixtrace)."""
@@ -0,0 +1,155 @@
+"""Load-test the model paths offline against the fake model server.
+
+Usage:
+    python -m benchmarks.bench_ai [--sessions 200] [--workers 8] [--clients 8] [--requests 10]
+                                  [--latency 0.3] [--jitter 0.5] [--error-rate 0.05] [--hang-rate 0]
+                                  [--timeout 10] [--concurrency 8] [--retries 2]
+
+Starts fixtrace.fake_server in-process, points FixTrace at it
+(FIXTRACE_PROVIDER=local) and measures:
+
+- bulk: `generate --all` over a synthetic archive of --sessions sessions
+  with --workers workers (throughput, and per-session model time from the
+  recorded stage timings);
+- interactive: --clients concurrent `ask`s, --requests each (time to first
+  piece and total time).
+
+Latencies are reported as p50/p95/p99. Everything runs in a scratch home
+directory, with the response cache off.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def report(label, seconds):
+    from fixtrace import stats
+
+    if not seconds:
+        print(f"  {label:<24} no samples")
+        return
+    p50, p95, p99 = (stats.percentile(seconds, q) for q in (0.5, 0.95, 0.99))
+    print(f"  {label:<24} p50 {p50 * 1000:7.0f} ms   p95 {p95 * 1000:7.0f} ms   p99 {p99 * 1000:7.0f} ms")
+
+
+def bench_bulk(args):
+    """Summarise a synthetic archive in parallel, as `generate --all` does."""
+    from fixtrace import bulk, session
+    from benchmarks import generate
+
+    session_ids = generate.build_archive(session.SESSIONS_DIR, args.sessions, seed=args.seed)
+    started = time.perf_counter()
+    failures = 0
+    for _, _, error in bulk.summarize_sessions(session_ids, workers=args.workers, rate=0, use_cache=False):
+        if error:
+            failures += 1
+    elapsed = time.perf_counter() - started
+
+    model_times = []
+    for session_id in session_ids:
+        metadata = session.load_metadata(session.get_session_dir(session_id))
+        for run in metadata.get("timings", []):
+            if "ai_call" in run["stages"]:
+                model_times.append(run["stages"]["ai_call"]["seconds"])
+
+    print(f"bulk: {len(session_ids)} sessions, {args.workers} workers")
+    print(f"  throughput               {len(session_ids) / elapsed:7.1f} sessions/s ({elapsed:.1f}s, {failures} failed)")
+    report("model time per session", model_times)
+
+
+def bench_interactive(args):
+    """Concurrent asks, each streaming its answer."""
+    from fixtrace import ai
+
+    context = "$ npm start\nError: listen EADDRINUSE: address already in use :::3000\n" * 50
+    first_pieces, totals, errors = [], [], []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            first = None
+            failed = False
+            for piece in ai.stream_gemini(context, None, use_cache=False):
+                if first is None:
+                    first = time.perf_counter() - started
+                failed = piece.startswith("⚠️ AI Error")
+            total = time.perf_counter() - started
+            with lock:
+                if failed:
+                    errors.append(total)
+                else:
+                    first_pieces.append(first)
+                    totals.append(total)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    count = args.clients * args.requests
+    print(f"interactive: {args.clients} clients x {args.requests} asks")
+    print(f"  throughput               {count / elapsed:7.1f} asks/s ({elapsed:.1f}s, {len(errors)} failed)")
+    report("time to first piece", first_pieces)
+    report("total", totals)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sessions", type=int, default=200, help="Sessions to summarise (0 skips bulk)")
+    arg_parser.add_argument("--workers", type=int, default=8, help="Bulk workers")
+    arg_parser.add_argument("--clients", type=int, default=8, help="Concurrent interactive clients (0 skips them)")
+    arg_parser.add_argument("--requests", type=int, default=10, help="Asks per client")
+    arg_parser.add_argument("--latency", type=float, default=0.3, help="Server: median seconds to the first piece")
+    arg_parser.add_argument("--jitter", type=float, default=0.5, help="Server: log-normal shape of the latency")
+    arg_parser.add_argument("--error-rate", type=float, default=0.05, help="Server: fraction of requests that fail")
+    arg_parser.add_argument("--hang-rate", type=float, default=0.0, help="Server: fraction of requests never answered")
+    arg_parser.add_argument("--timeout", type=float, default=10, help="Client: FIXTRACE_AI_TIMEOUT")
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="Client: FIXTRACE_AI_CONCURRENCY")
+    arg_parser.add_argument("--retries", type=int, default=2, help="Client: FIXTRACE_AI_RETRIES")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    # fixtrace reads its paths and model settings on first use, so set both
+    # up before importing it
+    home = Path(tempfile.mkdtemp(prefix="fixtrace-bench-"))
+    os.environ["HOME"] = str(home)
+    from fixtrace import fake_server
+
+    model = fake_server.FakeModel(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        hang_rate=args.hang_rate, seed=args.seed,
+    )
+    server = fake_server.make_server(model, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update({
+        "FIXTRACE_PROVIDER": "local",
+        "FIXTRACE_LOCAL_URL": f"http://127.0.0.1:{server.server_address[1]}",
+        "FIXTRACE_AI_TIMEOUT": str(args.timeout),
+        "FIXTRACE_AI_CONCURRENCY": str(args.concurrency),
+        "FIXTRACE_AI_RETRIES": str(args.retries),
+    })
+    print(f"server: latency {args.latency}s (jitter {args.jitter}), {args.error_rate:.0%} errors, {args.hang_rate:.0%} hangs; "
+          f"client: timeout {args.timeout}s, concurrency {args.concurrency}, retries {args.retries}")
+
+    try:
+        if args.sessions:
+            bench_bulk(args)
+        if args.clients:
+            bench_interactive(args)
+    finally:
+        server.shutdown()
+        shutil.rmtree(home, ignore_errors=True)
+    print(f"server saw {model.requests} requests ({model.errors} injected errors)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Benchmark parser.clean_text against the original implementation.
+
+Usage:
+    python -m benchmarks.bench_clean_text [--mb 50] [--raw path/to/raw.txt]
+
+Prints throughput (MB/s) for the legacy and current implementations and
+verifies that both produce identical output on the lines whose cleaning
+hasn't changed since (see RENDERED_RE). clean_text also masks secrets now,
+so the legacy output is redacted before it is compared.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+from fixtrace import parser, redact
+
+
+# Raw lines the current clean_text renders the way a terminal would (a
+# carriage return inside the line, cursor moves, erase-line) where the
+# legacy one just deleted the control characters; they're left out of the
+# output check
+RENDERED_RE = re.compile(r'\r(?!$)|\x1b\[[0-9;]*[CDGK]')
+
+
+def comparable_text(text):
+    """text without the lines matching RENDERED_RE. Returns (text, lines_left_out)."""
+    lines = text.split('\n')
+    kept = [line for line in lines if not RENDERED_RE.search(line)]
+    return '\n'.join(kept), len(lines) - len(kept)
+
+
+def legacy_clean_text(text):
+    """The original clean_text, kept verbatim as the reference implementation."""
+    osc_escape = re.compile(r'\x1B\].*?(?:\x07|\x1B\\)')
+    text = osc_escape.sub('', text)
+
+    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+    text = ansi_escape.sub('', text)
+
+    chars = []
+    for c in text:
+        if c == '\x08':
+            if chars and chars[-1] != '\n':
+                chars.pop()
+        else:
+            chars.append(c)
+    text = "".join(chars)
+
+    lines = text.split('\n')
+    resolved_lines = []
+
+    noise_patterns = [
+        "Asking AI...",
+        "Analyzing last",
+        "Using active session:",
+        "Using latest session:",
+        "Pulling from",
+        "Pull complete",
+        "Extracting",
+        "Downloading",
+        "Waiting",
+        "Verifying Checksum",
+        "Download complete"
+    ]
+    spinner_chars = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+    for line in lines:
+        line = line.replace('\r', '').strip()
+        if not line:
+            continue
+        is_noise = False
+        if any(pattern in line for pattern in noise_patterns):
+            is_noise = True
+        elif any(c in line for c in spinner_chars):
+            is_noise = True
+        if not is_noise:
+            resolved_lines.append(line)
+
+    return "\n".join(resolved_lines)
+
+
+def synthetic_log(size_mb, seed=0):
+    """Build a terminal log with colours, titles, backspaces, spinners and pulls."""
+    rng = random.Random(seed)
+    pieces = [
+        "\x1b]0;user@host: ~/project\x07\x1b[01;32muser@host\x1b[00m:\x1b[01;34m~/project\x1b[00m$ npm install\r\n",
+        "npm WARN deprecated left-pad@1.3.0: use String.prototype.padStart\r\n",
+        "\x1b[31mError: listen EADDRINUSE: address already in use :::3000\x1b[0m\r\n",
+        "    at Server.setupListenHandle [as _listen2] (node:net:1817:16)\r\n",
+        "⠙ Installing dependencies...\r\n",
+        "a1b2c3d4: Pulling fs layer\r\n",
+        "a1b2c3d4: Downloading  12.3MB/45.6MB\r\n",
+        "a1b2c3d4: Pull complete\r\n",
+        "project % gti\x08\x08it status\r\n",
+        "On branch main\r\nnothing to commit, working tree clean\r\n",
+        "Collecting requests==2.31.0\r\n",
+        "\x1b[?2004h\x1b[?2004l\r\n",
+    ]
+    target = size_mb * 1024 * 1024
+    out = []
+    size = 0
+    while size < target:
+        piece = rng.choice(pieces)
+        out.append(piece)
+        size += len(piece)
+    return "".join(out)
+
+
+def reference_clean_text(text):
+    """What clean_text should return: the legacy output with secrets masked."""
+    return redact.redact(legacy_clean_text(text))
+
+
+def measure(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--mb", type=int, default=50, help="Synthetic log size in MB")
+    arg_parser.add_argument("--raw", type=Path, help="Benchmark a real raw.txt instead")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation (best is kept)")
+    args = arg_parser.parse_args()
+
+    if args.raw:
+        # newline='' keeps carriage returns as recorded
+        with open(args.raw, encoding="utf-8", errors="ignore", newline="") as f:
+            text = f.read()
+    else:
+        text = synthetic_log(args.mb)
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    legacy_time, legacy_out = measure(legacy_clean_text, text, args.repeat)
+    current_time, current_out = measure(parser.clean_text, text, args.repeat)
+
+    print(f"input:   {size_mb:.1f} MB")
+    print(f"legacy:  {size_mb / legacy_time:8.1f} MB/s ({legacy_time:.3f}s)")
+    print(f"current: {size_mb / current_time:8.1f} MB/s ({current_time:.3f}s)")
+    print(f"speedup: {legacy_time / current_time:.1f}x")
+
+    legacy_out = redact.redact(legacy_out)
+    if legacy_out != current_out:
+        check_text, left_out = comparable_text(text)
+        legacy_out = reference_clean_text(check_text)
+        current_out = parser.clean_text(check_text)
+        if left_out:
+            print(f"(output compared without the {left_out} line(s) the current implementation renders)")
+    if legacy_out != current_out:
+        print("❌ Output differs from the legacy implementation")
+        sys.exit(1)
+    print("✅ Output identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Check CLI cold-start time against a budget.
+
+Usage:
+    python -m benchmarks.bench_startup [--budget-ms 300] [--runs 5] [--command list]
+
+Runs `fixtrace <command>` in fresh interpreters and fails (exit 1) if the
+median wall time goes over the budget, or if a module that should load
+lazily (the GenAI SDK, dotenv, Rich tables) is imported at startup. The
+slowest imports, as reported by `python -X importtime`, are listed to show
+where the time goes.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules only the commands that need them may import
+LAZY_MODULES = ["google.genai", "dotenv", "rich.table", "rich.progress"]
+
+
+def run(args):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return subprocess.run(
+        [sys.executable] + args, cwd=ROOT, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+    )
+
+
+def time_command(command, runs):
+    """Wall time in seconds for each fresh `python -m fixtrace.cli <command>`."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run(["-m", "fixtrace.cli"] + command)
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            print(result.stdout + result.stderr)
+            print(f"❌ fixtrace {' '.join(command)} failed")
+            sys.exit(1)
+    return times
+
+
+def eagerly_imported():
+    """Which of LAZY_MODULES importing the CLI pulls in."""
+    code = (
+        "import sys, fixtrace.cli; "
+        f"print('\\n'.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    return run(["-c", code]).stdout.split()
+
+
+def slowest_imports(count):
+    """(cumulative microseconds, module) for the slowest imports of the CLI."""
+    stderr = run(["-X", "importtime", "-c", "import fixtrace.cli"]).stderr
+    imports = []
+    for line in stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        imports.append((int(parts[1]), parts[2].strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--budget-ms", type=float, default=300, help="Maximum median cold-start time")
+    arg_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    arg_parser.add_argument("--command", nargs="+", default=["list"], help="fixtrace command to time")
+    arg_parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = arg_parser.parse_args()
+
+    print("slowest imports (cumulative):")
+    for micros, module in slowest_imports(args.top):
+        print(f"  {micros / 1000:7.1f} ms  {module}")
+
+    times = time_command(args.command, args.runs)
+    median_ms = statistics.median(times) * 1000
+    print(f"fixtrace {' '.join(args.command)}: median {median_ms:.0f} ms, "
+          f"min {min(times) * 1000:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    eager = eagerly_imported()
+    if eager:
+        print(f"❌ Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("❌ Over the startup budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
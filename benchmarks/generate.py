@@ -0,0 +1,338 @@
+"""Generate synthetic terminal sessions: raw.txt logs and whole session archives.
+
+Usage:
+    python -m benchmarks.generate raw path/to/raw.txt [--size 100MB] [--markers] [--seed 0]
+    python -m benchmarks.generate archive path/to/sessions [--sessions 5000] [--seed 0]
+
+Logs look like what `script` or the pty engine records: coloured prompts in
+several styles (bash, zsh, root, oh-my-zsh, plain $), OSC window titles,
+bracketed paste, typos fixed with backspaces, npm spinners, docker pulls
+that redraw layers with cursor moves, pip progress bars, tracebacks, test
+runs and common errors. With --markers, prompts and commands carry OSC 133
+markers as the shell hook emits them. Output depends only on the seed and
+size, so runs are comparable from KB to GB scale.
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fixtrace import markdown, parser
+
+# Raw files are written in batches of about this many bytes
+WRITE_BATCH_SIZE = 1024 * 1024
+
+SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+PROMPT_STYLES = ["bash", "bash", "zsh", "root", "oh-my-zsh", "plain"]
+PROJECTS = ["api", "web", "infra", "ml-pipeline", "docs", "payments"]
+PY_PACKAGES = ["requests", "numpy", "flask", "pydantic", "boto3", "rich", "typer", "sqlalchemy"]
+NPM_PACKAGES = ["left-pad", "request", "uuid", "core-js", "glob", "inflight", "rimraf"]
+IMAGES = ["postgres:16", "redis:7", "node:20-alpine", "python:3.12-slim", "nginx:latest"]
+MISSING_COMMANDS = ["kubectl", "terraform", "jq", "pnpm", "gh"]
+ENV_VARS = ["DATABASE_URL", "GEMINI_API_KEY", "STRIPE_SECRET", "REDIS_HOST"]
+FILES = ["app.py", "main.go", "package.json", "README.md", "Dockerfile", "docker-compose.yml", "src", "tests"]
+SESSION_NAMES = [
+    "fix api port conflict", "docker compose won't start", "pip install fails on M1",
+    "flaky integration tests", "deploy permission denied", "node upgrade",
+]
+SPINNER = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+HEX = "0123456789abcdef"
+ID_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def parse_size(text):
+    """Parse a size like "512KB", "20MB" or "1GB" (or plain bytes) into bytes."""
+    text = text.strip().upper()
+    for unit in ("GB", "MB", "KB", "B"):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * SIZE_UNITS[unit])
+    return int(text)
+
+
+def _hex(rng, length):
+    return "".join(rng.choice(HEX) for _ in range(length))
+
+
+def _prompt(style, project):
+    if style == "bash":
+        return (f"\x1b]0;dev@host: ~/{project}\x07"
+                f"\x1b[01;32mdev@host\x1b[00m:\x1b[01;34m~/{project}\x1b[00m$ ")
+    if style == "zsh":
+        return f"{project} % "
+    if style == "root":
+        return f"root@box:/srv/{project}# "
+    if style == "oh-my-zsh":
+        # No $, # or %: only the shell hook finds these commands
+        return f"\x1b[1;32m➜  \x1b[36m{project}\x1b[0m \x1b[1;34mgit:(\x1b[31mmain\x1b[34m)\x1b[0m "
+    return "$ "
+
+
+def _typed(rng, command):
+    """Echo of command being typed, sometimes with a typo erased by backspaces."""
+    if len(command) < 4 or rng.random() > 0.1:
+        return command
+    typo = command[1] + command[0] + command[2:rng.randint(3, len(command))]
+    erase = "\x08 \x08" if rng.random() < 0.5 else "\x08\x1b[K"
+    return typo + erase * len(typo) + command
+
+
+# Commands: each returns (command, output, exit status)
+
+def _git_status(rng, project):
+    files = rng.sample(["src/app.py", "src/db.py", "tests/test_api.py", "README.md", "setup.cfg"], 2)
+    output = "On branch main\r\nChanges not staged for commit:\r\n"
+    output += '  (use "git add <file>..." to update what will be committed)\r\n\r\n'
+    output += "".join(f"\t\x1b[31mmodified:   {name}\x1b[m\r\n" for name in files)
+    return "git status", output + "\r\n", 0
+
+
+def _ls(rng, project):
+    names = rng.sample(FILES, 5)
+    colored = [f"\x1b[01;34m{name}\x1b[0m" if "." not in name else name for name in names]
+    return "ls --color=auto", "  ".join(colored) + "\r\n", 0
+
+
+def _npm_install(rng, project):
+    output = []
+    for i in range(rng.randint(5, 40)):
+        package = rng.choice(NPM_PACKAGES)
+        output.append(f"\x1b[1G\x1b[0K{SPINNER[i % len(SPINNER)]} reify:{package}: timing reifyNode Completed in {rng.randint(1, 900)}ms")
+    output.append("\x1b[1G\x1b[0K")
+    for package in rng.sample(NPM_PACKAGES, 2):
+        output.append(f"\x1b[33mnpm\x1b[39m \x1b[30;43mWARN\x1b[0m \x1b[35mdeprecated\x1b[0m {package}@1.{rng.randint(0, 9)}.0: this package is no longer supported\r\n")
+    output.append(f"\r\nadded {rng.randint(50, 900)} packages, and audited {rng.randint(900, 1500)} packages in {rng.randint(2, 40)}s\r\n")
+    return "npm install", "".join(output), 0
+
+
+def _npm_start(rng, project):
+    port = rng.choice([3000, 5000, 8080])
+    output = (
+        f"\r\n> {project}@1.0.0 start\r\n> node server.js\r\n\r\n"
+        "node:events:497\r\n      throw er; // Unhandled 'error' event\r\n      ^\r\n\r\n"
+        f"\x1b[31mError: listen EADDRINUSE: address already in use :::{port}\x1b[39m\r\n"
+        "    at Server.setupListenHandle [as _listen2] (node:net:1817:16)\r\n"
+        "    at listenInCluster (node:net:1865:12)\r\n"
+        "    at Server.listen (node:net:1953:7)\r\n"
+        f"    at Object.<anonymous> (/home/dev/{project}/server.js:{rng.randint(5, 90)}:8)\r\n"
+    )
+    return "npm start", output, 1
+
+
+def _docker_pull(rng, project):
+    image = rng.choice(IMAGES)
+    layers = [_hex(rng, 12) for _ in range(rng.randint(3, 8))]
+    output = [f"{image.split(':')[1]}: Pulling from library/{image.split(':')[0]}\r\n"]
+    output.extend(f"{layer}: Pulling fs layer \r\n" for layer in layers)
+    # Layers are redrawn in place: up to the layer's line, clear, rewrite, back down
+    for _ in range(rng.randint(10, 60)):
+        index = rng.randrange(len(layers))
+        up = len(layers) - index
+        total = rng.randint(2, 90)
+        done = rng.randint(0, total)
+        bar = "=" * (50 * done // total) + ">"
+        output.append(f"\x1b[{up}A\x1b[2K\r{layers[index]}: Downloading [{bar:<50}]  {done}MB/{total}MB\r\x1b[{up}B")
+    for index, layer in enumerate(layers):
+        up = len(layers) - index
+        output.append(f"\x1b[{up}A\x1b[2K\r{layer}: Pull complete \r\x1b[{up}B")
+    output.append(f"Digest: sha256:{_hex(rng, 64)}\r\nStatus: Downloaded newer image for {image}\r\n")
+    return f"docker pull {image}", "".join(output), 0
+
+
+def _pip_install(rng, project):
+    package = rng.choice(PY_PACKAGES)
+    version = f"{rng.randint(1, 3)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}"
+    size = rng.randint(2, 400) / 10
+    output = [f"Collecting {package}=={version}\r\n",
+              f"  Downloading {package}-{version}-py3-none-any.whl ({size} MB)\r\n"]
+    for step in range(1, 21):
+        filled = 40 * step // 20
+        output.append(f"\r     \x1b[38;5;197m{'━' * filled}\x1b[0m\x1b[38;5;237m{'━' * (40 - filled)}\x1b[0m "
+                      f"\x1b[32m{size * step / 20:.1f}/{size} MB\x1b[0m \x1b[31m{rng.randint(1, 30)}.{rng.randint(0, 9)} MB/s\x1b[0m eta \x1b[36m0:00:0{rng.randint(0, 9)}\x1b[0m")
+    output.append(f"\r\nSuccessfully installed {package}-{version}\r\n")
+    return f"pip install {package}=={version}", "".join(output), 0
+
+
+def _python_traceback(rng, project):
+    module = rng.choice(["requests", "numpy", "dotenv", "yaml", "psycopg2"])
+    output = (
+        "Traceback (most recent call last):\r\n"
+        f'  File "/home/dev/{project}/app.py", line {rng.randint(1, 20)}, in <module>\r\n'
+        f"    import {module}\r\n"
+        f"ModuleNotFoundError: No module named '{module}'\r\n"
+    )
+    return "python app.py", output, 1
+
+
+def _missing_env(rng, project):
+    var = rng.choice(ENV_VARS)
+    output = (
+        "Traceback (most recent call last):\r\n"
+        f'  File "/home/dev/{project}/settings.py", line {rng.randint(1, 60)}, in <module>\r\n'
+        f'    URL = os.environ["{var}"]\r\n'
+        f"KeyError: '{var}'\r\n"
+    )
+    return "python manage.py runserver", output, 1
+
+
+def _pytest(rng, project):
+    count = rng.randint(10, 60)
+    failed = rng.randint(0, 2)
+    dots = "".join("\x1b[32m.\x1b[0m" for _ in range(count - failed)) + "\x1b[31mF\x1b[0m" * failed
+    output = (
+        "\x1b[1m============================= test session starts ==============================\x1b[0m\r\n"
+        f"collected {count} items\r\n\r\n"
+        f"tests/test_api.py {dots}\x1b[32m{'[100%]':>10}\x1b[0m\r\n\r\n"
+    )
+    if failed:
+        output += f"\x1b[31m========================= {failed} failed, {count - failed} passed in {rng.randint(1, 9)}.{rng.randint(10, 99)}s =========================\x1b[0m\r\n"
+    else:
+        output += f"\x1b[32m============================== {count} passed in {rng.randint(1, 9)}.{rng.randint(10, 99)}s ===============================\x1b[0m\r\n"
+    return "pytest -q", output, 1 if failed else 0
+
+
+def _permission_denied(rng, project):
+    return "./deploy.sh", "bash: ./deploy.sh: Permission denied\r\n", 126
+
+
+def _command_not_found(rng, project):
+    command = rng.choice(MISSING_COMMANDS)
+    return f"{command} version", f"zsh: command not found: {command}\r\n", 127
+
+
+def _curl(rng, project):
+    total = rng.randint(100, 9000)
+    output = ["  % Total    % Received % Xferd  Average Speed   Time    Time     Time  Current\r\n",
+              "                                 Dload  Upload   Total   Spent    Left  Speed\r\n"]
+    for step in range(0, 101, 10):
+        output.append(f"\r{step:3d} {total}k  {step:3d} {total * step // 100}k    0     0  {rng.randint(100, 9999)}k      0 --:--:-- --:--:-- --:--:-- {rng.randint(100, 9999)}k")
+    output.append("\r\n")
+    return f"curl -O https://example.com/{project}.tar.gz", "".join(output), 0
+
+
+COMMANDS = [
+    _git_status, _ls, _npm_install, _npm_start, _docker_pull, _pip_install,
+    _python_traceback, _missing_env, _pytest, _permission_denied, _command_not_found, _curl,
+]
+
+
+def iter_blocks(seed=0, markers=False):
+    """Yield prompt + command + output blocks forever, deterministically for seed."""
+    rng = random.Random(seed)
+    while True:
+        # Each stretch of commands runs in one project with one prompt style
+        style = rng.choice(PROMPT_STYLES)
+        project = rng.choice(PROJECTS)
+        prompt = _prompt(style, project)
+        bracketed = style in ("bash", "root")
+        for _ in range(rng.randint(3, 15)):
+            command, output, status = rng.choice(COMMANDS)(rng, project)
+            typed = _typed(rng, command)
+            if bracketed:
+                prompt_text = f"\x1b[?2004h{prompt}"
+                enter = "\x1b[?2004l\r\r\n"
+            else:
+                prompt_text = prompt
+                enter = "\r\n"
+            if markers:
+                yield f"\x1b]133;A\x07{prompt_text}\x1b]133;B\x07{typed}{enter}\x1b]133;C\x07{output}\x1b]133;D;{status}\x07"
+            else:
+                yield f"{prompt_text}{typed}{enter}{output}"
+
+
+def iter_raw_bytes(size, seed=0, markers=False):
+    """Yield encoded blocks until at least size bytes have been produced."""
+    produced = 0
+    for block in iter_blocks(seed, markers):
+        if produced >= size:
+            return
+        data = block.encode("utf-8")
+        produced += len(data)
+        yield data
+
+
+def generate_text(size, seed=0, markers=False):
+    """Return a synthetic terminal log of about size bytes."""
+    return b"".join(iter_raw_bytes(size, seed, markers)).decode("utf-8")
+
+
+def write_raw(path, size, seed=0, markers=False):
+    """Write a synthetic raw.txt of about size bytes, in batches (fine for GB sizes)."""
+    batch = []
+    batch_size = 0
+    with open(path, "wb") as f:
+        for data in iter_raw_bytes(size, seed, markers):
+            batch.append(data)
+            batch_size += len(data)
+            if batch_size >= WRITE_BATCH_SIZE:
+                f.write(b"".join(batch))
+                batch = []
+                batch_size = 0
+        f.write(b"".join(batch))
+    return path
+
+
+def build_archive(sessions_dir, count, seed=0, complete_ratio=0.8, raw_size=(2 * 1024, 32 * 1024)):
+    """Create count session folders under sessions_dir, like ~/.fixtrace/sessions.
+
+    Each session gets metadata.json, a small raw.txt and its events.jsonl;
+    complete_ratio of them also get a summary.md. Start times are spread
+    over the days before now, newest last. Returns the session IDs.
+    """
+    rng = random.Random(seed)
+    sessions_dir = Path(sessions_dir)
+    sessions_dir.mkdir(parents=True, exist_ok=True)
+    started = datetime.now() - timedelta(days=count // 5 + 1)
+    session_ids = []
+    for i in range(count):
+        started += timedelta(minutes=rng.randint(10, 24 * 60 // 5 * 2))
+        session_id = started.strftime("%Y-%m-%d-") + "".join(rng.choice(ID_CHARS) for _ in range(6))
+        session_dir = sessions_dir / session_id
+        session_dir.mkdir(exist_ok=True)
+
+        metadata = {
+            "session_id": session_id,
+            "name": rng.choice(SESSION_NAMES) if rng.random() < 0.7 else session_id,
+            "started_at": started.isoformat(),
+        }
+        with open(session_dir / "metadata.json", "w") as f:
+            json.dump(metadata, f, indent=2)
+
+        raw_file = write_raw(session_dir / "raw.txt", rng.randint(*raw_size), seed=seed + i, markers=rng.random() < 0.5)
+        parser.parse_raw_to_jsonl(raw_file, session_dir / "events.jsonl")
+        if rng.random() < complete_ratio:
+            summary = "## 💡 Analysis\nThe server was already running on the port.\n\n## 🚀 Resolution Steps\n1. Stop the old process.\n"
+            with open(session_dir / "summary.md", "w") as f:
+                f.write(markdown.render_markdown(session_id, metadata, summary))
+        session_ids.append(session_id)
+    return session_ids
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = arg_parser.add_subparsers(dest="kind", required=True)
+
+    raw_parser = subparsers.add_parser("raw", help="Write one synthetic raw.txt")
+    raw_parser.add_argument("path", type=Path)
+    raw_parser.add_argument("--size", default="10MB", help="Target size, e.g. 512KB, 100MB, 2GB")
+    raw_parser.add_argument("--markers", action="store_true", help="Add OSC 133 markers (as with the shell hook)")
+    raw_parser.add_argument("--seed", type=int, default=0)
+
+    archive_parser = subparsers.add_parser("archive", help="Create a folder of synthetic sessions")
+    archive_parser.add_argument("path", type=Path, help="Sessions folder (like ~/.fixtrace/sessions)")
+    archive_parser.add_argument("--sessions", type=int, default=2000, help="Number of sessions")
+    archive_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if args.kind == "raw":
+        write_raw(args.path, parse_size(args.size), seed=args.seed, markers=args.markers)
+        print(f"✅ Wrote {args.path} ({args.path.stat().st_size / (1024 * 1024):.1f} MB)")
+    else:
+        session_ids = build_archive(args.path, args.sessions, seed=args.seed)
+        print(f"✅ Created {len(session_ids)} sessions in {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Run the benchmark suite, save the results as JSON and compare them with a baseline.
+
+Usage:
+    python -m benchmarks.run [--size 20MB] [--sessions 2000] [--repeat 3]
+                             [--only clean_text list_sessions ...]
+                             [--output results.json] [--baseline benchmarks/baseline.json]
+                             [--tolerance 20] [--save-baseline]
+
+Everything runs against a temporary home directory filled by
+benchmarks.generate (one large raw.txt and an archive of --sessions session
+folders), so the real ~/.fixtrace is never touched. Each benchmark keeps
+its best time over --repeat runs. With a baseline (the default one is used
+if it exists), benchmarks more than --tolerance percent slower than the
+baseline are listed and the run fails (exit 1).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCH_DIR / "results"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# Bump when result files change shape
+RESULTS_VERSION = 1
+
+
+def best_of(fn, repeat, number=1):
+    """Best wall time in seconds for one call of fn, over repeat runs of number calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_benchmarks(args, home):
+    """Build the data under home, run the selected benchmarks, return {name: result}."""
+    from fixtrace import classify, markdown, parser, recall, search, session
+    from benchmarks import generate
+
+    def selected(name):
+        return not args.only or name in args.only
+
+    results = {}
+
+    def record(name, seconds, size=None):
+        results[name] = {"seconds": seconds}
+        if size is not None:
+            results[name]["mb_per_s"] = size / (1024 * 1024) / seconds
+        rate = f"  {results[name]['mb_per_s']:8.1f} MB/s" if size is not None else ""
+        print(f"  {name:<32} {seconds * 1000:10.2f} ms{rate}")
+
+    session.ensure_dirs()
+    work_dir = home / "work"
+    work_dir.mkdir()
+
+    print(f"generating {args.size / (1024 * 1024):.1f} MB log and {args.sessions} sessions (seed {args.seed})...")
+    raw_file = generate.write_raw(work_dir / "raw.txt", args.size, seed=args.seed)
+    marked_raw_file = generate.write_raw(work_dir / "raw_markers.txt", args.size, seed=args.seed, markers=True)
+    text = raw_file.read_text(encoding="utf-8")
+    session_ids = generate.build_archive(session.SESSIONS_DIR, args.sessions, seed=args.seed)
+
+    # A recorded session whose raw.txt is the large log
+    live_dir = session.SESSIONS_DIR / session_ids[-1]
+    shutil.copyfile(raw_file, live_dir / "raw.txt")
+
+    print("results:")
+    if selected("clean_text"):
+        record("clean_text", best_of(lambda: parser.clean_text(text), args.repeat), args.size)
+    if selected("parse_raw_to_jsonl"):
+        jsonl_file = work_dir / "events.jsonl"
+        record("parse_raw_to_jsonl", best_of(lambda: parser.parse_raw_to_jsonl(raw_file, jsonl_file), args.repeat), args.size)
+        record("parse_raw_to_jsonl_markers", best_of(lambda: parser.parse_raw_to_jsonl(marked_raw_file, jsonl_file), args.repeat), args.size)
+    if selected("classify"):
+        # What `ask` hands the rules: the cleaned last 1000 lines
+        tail = "\n".join(parser.clean_text(session.get_recent_log_content(live_dir, 1000)).split("\n")[-1000:])
+        record("classify", best_of(lambda: classify.classify(tail), args.repeat, number=20))
+    if selected("get_recent_log_content"):
+        for lines in (50, 2000):
+            record(f"get_recent_log_content_{lines}", best_of(lambda: session.get_recent_log_content(live_dir, lines), args.repeat, number=20))
+    if selected("list_sessions"):
+        record("rebuild_index", best_of(session.rebuild_index, args.repeat))
+        record("list_sessions", best_of(session.list_sessions, args.repeat, number=5))
+        record("list_sessions_filtered", best_of(lambda: session.list_sessions(name="port", status="✅ Complete"), args.repeat, number=5))
+    if selected("recall_lookup"):
+        record("recall_build_index", best_of(recall.update_index, 1))
+        query = "$ npm start\nError: listen EADDRINUSE: address already in use :::8080\n"
+        record("recall_lookup", best_of(lambda: recall.lookup(query), args.repeat, number=20))
+    if selected("generate_markdown"):
+        # Build the search and recall indexes up front, as an existing install has them
+        search.update_index()
+        recall.update_index()
+        summary = "## 💡 Analysis\nThe port was taken.\n\n## 🚀 Resolution Steps\n1. Stop the old server.\n"
+        targets = [(session_id, session.get_session_dir(session_id)) for session_id in session_ids[:20]]
+        metadata = {session_id: session.load_metadata(session_dir) for session_id, session_dir in targets}
+
+        def generate_all():
+            for session_id, session_dir in targets:
+                markdown.generate_markdown(session_id, session_dir, metadata[session_id], summary)
+
+        record("generate_markdown", best_of(generate_all, args.repeat) / len(targets))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each benchmark against the baseline. Returns the names that regressed."""
+    if baseline["params"] != results["params"]:
+        print(f"⚠️  Baseline was run with different parameters: {baseline['params']}")
+    print(f"\n{'benchmark':<34} {'baseline':>10} {'current':>10} {'change':>8}")
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"  {name:<32} {'-':>10} {result['seconds'] * 1000:8.2f}ms {'new':>8}")
+            continue
+        change = 100 * (result["seconds"] / previous["seconds"] - 1)
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  ❌"
+        print(f"  {name:<32} {previous['seconds'] * 1000:8.2f}ms {result['seconds'] * 1000:8.2f}ms {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--size", default="20MB", help="Size of the generated raw.txt (e.g. 512KB, 20MB, 1GB)")
+    arg_parser.add_argument("--sessions", type=int, default=2000, help="Sessions in the generated archive")
+    arg_parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (best is kept)")
+    arg_parser.add_argument("--only", nargs="+", metavar="NAME",
+                            help="Run only these: clean_text, parse_raw_to_jsonl, get_recent_log_content, classify, list_sessions, recall_lookup, generate_markdown")
+    arg_parser.add_argument("--output", type=Path, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Results file to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=20, help="Allowed slowdown against the baseline (%%)")
+    arg_parser.add_argument("--save-baseline", action="store_true", help="Also save the results as the baseline")
+    args = arg_parser.parse_args()
+
+    # fixtrace derives its paths from the home directory when it is first
+    # imported, so point it at a scratch one before anything imports it
+    home = Path(tempfile.mkdtemp(prefix="fixtrace-bench-"))
+    os.environ["HOME"] = str(home)
+    from benchmarks.generate import parse_size
+
+    try:
+        args.size = parse_size(args.size)
+        benchmarks = run_benchmarks(args, home)
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"size": args.size, "sessions": args.sessions, "seed": args.seed, "repeat": args.repeat},
+        "benchmarks": benchmarks,
+    }
+
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nsaved {output}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, args.baseline)
+        print(f"saved baseline {args.baseline}")
+        return
+    if not args.baseline.exists():
+        return
+
+    with open(args.baseline, "r") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} benchmark(s) more than {args.tolerance:.0f}% slower than the baseline: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,55 @@
-"AI Integration: Handle interactions with Gemini API."
+"AI Integration: Handle interactions with the model (Gemini, or a local server)."
 
 import os
-from dotenv import load_dotenv
-from google import genai
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Load .env file from current directory or parent directories
-load_dotenv()
+from . import cache, compress, parser, providers, redact
+
+MODEL = 'gemini-2.5-flash'
+
+# HTTP status codes worth retrying (rate limits, overload, timeouts)
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Default token budgets (see build_prompt). An ask prompt keeps the most
+# recent commands that fit in ASK_BUDGET_TOKENS; session logs whose summary
+# prompt would be larger are summarised in windows of SUMMARY_WINDOW_TOKENS
+# that run concurrently, then merged
+ASK_BUDGET_TOKENS = 8000
+SUMMARY_WINDOW_TOKENS = 30000
+SUMMARY_WORKERS = 4
+CHARS_PER_TOKEN = 4
+
+# Rounds of condensing window notes before a summary gives up (each round
+# shrinks the log by roughly the window size over the notes size, so real
+# sessions need one or two)
+MAX_SUMMARY_ROUNDS = 4
+
+# Model settings (see get_settings)
+DEFAULT_SETTINGS = {
+    "provider": "gemini",       # or "local": a server speaking fake_server's protocol
+    "model": MODEL,             # Gemini model
+    "local_url": providers.DEFAULT_LOCAL_URL,
+    "timeout": 120.0,           # seconds before a request is given up on
+    "concurrency": 8,           # model requests in flight at once, per process
+    "retries": 2,               # retries of transient errors per request
+    "budget": ASK_BUDGET_TOKENS,                # tokens per ask prompt
+    "summary_budget": SUMMARY_WINDOW_TOKENS,    # tokens per summary request
+}
+
+# Environment variables (also read from .env) that override them
+SETTINGS_ENV = {
+    "provider": "FIXTRACE_PROVIDER",
+    "model": "FIXTRACE_MODEL",
+    "local_url": "FIXTRACE_LOCAL_URL",
+    "timeout": "FIXTRACE_AI_TIMEOUT",
+    "concurrency": "FIXTRACE_AI_CONCURRENCY",
+    "retries": "FIXTRACE_AI_RETRIES",
+    "budget": "FIXTRACE_AI_BUDGET",
+    "summary_budget": "FIXTRACE_SUMMARY_BUDGET",
+}
 
 # Shared prompts
 GENERIC_SYSTEM_PROMPT = """
@@ -110,66 +154,456 @@ Do not include any text outside this format.
 Here is the terminal session log: 
 """
 
-def _get_client():
-    """Initialize and return the Gemini client."""
-    api_key = os.environ.get('GEMINI_API_KEY')
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable not set")
-    return genai.Client(api_key=api_key)
+CHUNK_SUMMARY_PROMPT = """
+You are reading part {part} of {total} of a long terminal debugging session.
+Write compact notes on this part only, as short bullet points under these headings:
+
+Problem:
+Key Commands:
+Errors Encountered:
+Fixes Attempted:
+
+Rules:
+- Keep exact commands and the key line of each error message.
+- Say whether each fix appeared to work, if the log shows it.
+- Ignore shell noise, prompts, and unrelated output.
+- Do NOT include secrets, tokens, credentials, or environment values.
+- If nothing relevant happened in this part, write "No relevant activity."
+
+Here is this part of the terminal session log:
+"""
+
+# The reduce step reuses SUMMARY_PROMPT, so the final output keeps the exact
+# "🛠 FixTrace Summary" format; only the nature of the input is explained.
+MERGE_PROMPT = """
+NOTE: This session was too long to send in one piece. Instead of the raw log,
+the input below is a series of notes, one per consecutive part of the
+session, in chronological order. Treat them as the terminal log; later parts
+show what happened after earlier ones.
+""" + SUMMARY_PROMPT
+
+# Shared provider and request slots (see get_provider)
+_settings = None
+_provider = None
+_slots = None
+_provider_lock = threading.Lock()
+_usage_lock = threading.Lock()
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about 4 characters per token)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def fit_log(log_text, max_tokens):
+    """Keep the most recent command blocks of a cleaned log that fit in max_tokens.
+    
+    Blocks are dropped whole, oldest first, and replaced by one "lines
+    omitted" line. If even the last block doesn't fit, its command line and
+    as many of its final lines as fit are kept (the end of a single huge
+    line, if that is all there is room for).
+    
+    Returns:
+        tuple: (log_text, omitted_lines)
+    """
+    if estimate_tokens(log_text) <= max_tokens:
+        return log_text, 0
+    
+    total_lines = log_text.count('\n') + 1
+    # Room for the "omitted" line, which can't be sized before it is counted
+    max_chars = max(64, max_tokens * CHARS_PER_TOKEN - 64)
+    kept = []
+    size = 0
+    for block in reversed(compress.split_blocks(log_text)):
+        block_size = sum(len(line) + 1 for line in block)
+        if size + block_size > max_chars:
+            if not kept:
+                kept = _fit_block(block, max_chars)
+            break
+        kept[:0] = block
+        size += block_size
+    
+    omitted = total_lines - len(kept)
+    if omitted:
+        kept.insert(0, f"... ({omitted} earlier lines omitted) ...")
+    return '\n'.join(kept), omitted
+
+def _fit_block(block, max_chars):
+    """The command line and final output lines of one oversized block, within max_chars."""
+    head = block[:1] if len(block[0]) < max_chars // 2 else []
+    size = sum(len(line) + 1 for line in head)
+    tail = []
+    for line in reversed(block[len(head):]):
+        if size + len(line) + 1 > max_chars:
+            if not tail:
+                tail.append("..." + line[-(max_chars - size - 3):])
+            break
+        tail.insert(0, line)
+        size += len(line) + 1
+    return head + tail
+
+def describe_prompt(tokens, budget, omitted):
+    """One status line reporting a prompt's size against its budget."""
+    line = f"Sending ~{tokens:,} tokens (budget {budget:,})"
+    if omitted:
+        line += f", {omitted:,} earlier lines left out to fit"
+    return line
+
+def build_prompt(head, log_text, tail="", budget=None):
+    """Put a log between prompt text, trimmed (see fit_log) so the whole is within budget tokens.
+    
+    Raises:
+        ValueError: If the budget can't hold the prompt text itself.
+    
+    Returns:
+        tuple: (prompt, estimated_tokens, omitted_lines)
+    """
+    if budget is not None:
+        room = budget - estimate_tokens(head + tail)
+        if room <= 0:
+            raise ValueError(f"Token budget {budget:,} is too small for the prompt (~{estimate_tokens(head + tail):,} tokens without the log)")
+        log_text, omitted = fit_log(log_text, room)
+    else:
+        omitted = 0
+    prompt = head + log_text + tail
+    return prompt, estimate_tokens(prompt), omitted
+
+def get_settings():
+    """Model settings: DEFAULT_SETTINGS overridden by the SETTINGS_ENV variables.
+    
+    dotenv is imported here, not at module load, so commands that never
+    call the model don't pay for it.
+    
+    Raises:
+        ValueError: If a numeric setting is not a number.
+    """
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        
+        # Load .env file from current directory or parent directories
+        load_dotenv()
+        settings = dict(DEFAULT_SETTINGS)
+        for key, name in SETTINGS_ENV.items():
+            value = os.environ.get(name)
+            if value is None:
+                continue
+            try:
+                settings[key] = type(DEFAULT_SETTINGS[key])(value)
+            except ValueError:
+                raise ValueError(f"Invalid {name}: {value}")
+        _settings = settings
+    return _settings
+
+def get_provider():
+    """Return the configured provider (see providers.py).
+    
+    The provider is created once per process and shared, so its HTTP
+    connections are reused (by bulk workers and the daemon).
+    """
+    global _provider, _slots
+    with _provider_lock:
+        if _provider is None:
+            settings = get_settings()
+            _provider = providers.create(
+                settings["provider"], settings["model"], settings["local_url"], settings["timeout"]
+            )
+            _slots = threading.BoundedSemaphore(max(1, settings["concurrency"]))
+        return _provider
+
+def model_key():
+    """Names the model in cache keys and summary fingerprints (no client needed)."""
+    settings = get_settings()
+    if settings["provider"] == "local":
+        return f"local:{settings['local_url'].rstrip('/')}"
+    return settings["model"]
 
-def _call_gemini(full_prompt):
-    """Helper to call Gemini API with error handling."""
+def _request(full_prompt):
+    """One model call, waiting for a free request slot first."""
+    provider = get_provider()
+    with _slots:
+        return provider.generate(full_prompt)
+
+def _request_stream(full_prompt):
+    """One streamed model call; the request slot is held until the stream ends."""
+    provider = get_provider()
+    with _slots:
+        yield from provider.generate_stream(full_prompt)
+
+def _generate(full_prompt, use_cache=True, retries=None, before_request=None):
+    """Send a prompt to the model, serving repeated prompts from the response cache.
+    
+    The cache key covers the model and the full prompt (template, cleaned
+    context, and question). Errors are raised, never cached. before_request,
+    if given, is called before every request actually sent (not for a
+    cached response).
+    """
+    key = cache.make_key(model_key(), full_prompt)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    
+    def request():
+        if before_request is not None:
+            before_request()
+        return _request(full_prompt)
+    
+    text = _with_retries(request, retries)
+    if use_cache and text:
+        cache.put(key, text)
+    return text
+
+def _generate_stream(full_prompt, use_cache=True, retries=None, before_request=None):
+    """Like _generate, but yields the response text piece by piece as it arrives.
+    
+    A cached response is yielded in one piece. The full response is cached
+    only once the stream has finished. Transient errors are retried only
+    until the first piece has arrived, so nothing is yielded twice.
+    """
+    key = cache.make_key(model_key(), full_prompt)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+    
+    if retries is None:
+        retries = get_settings()["retries"]
+    parts = []
+    for attempt in range(retries + 1):
+        if before_request is not None:
+            before_request()
+        try:
+            for piece in _request_stream(full_prompt):
+                parts.append(piece)
+                yield piece
+            break
+        except Exception as e:
+            if parts or attempt >= retries or not _is_transient(e):
+                raise
+            _backoff(attempt)
+    text = "".join(parts)
+    if use_cache and text:
+        cache.put(key, text)
+
+def _generate_progressive(full_prompt, use_cache=True, on_progress=None, retries=None, before_request=None):
+    """Stream a response, calling on_progress(text_so_far) after each piece.
+    
+    Returns the full text. Without on_progress this is a plain _generate.
+    """
+    if on_progress is None:
+        return _generate(full_prompt, use_cache=use_cache, retries=retries, before_request=before_request)
+    text = ""
+    for piece in _generate_stream(full_prompt, use_cache=use_cache, retries=retries, before_request=before_request):
+        text += piece
+        on_progress(text)
+    return text
+
+def _is_transient(error):
+    """True for errors that may succeed on retry (rate limits, network blips)."""
+    if getattr(error, 'code', None) in TRANSIENT_STATUS_CODES:
+        return True
+    # The SDK's HTTP layer (httpx) raises its own connection/timeout errors
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__module__.startswith('httpx')
+
+def _backoff(attempt, base_delay=1.0):
+    """Sleep before retry number attempt + 1: exponential, with jitter."""
+    time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def _with_retries(fn, retries=None, base_delay=1.0):
+    """Call fn, retrying transient errors with exponential backoff and jitter.
+    
+    retries defaults to the configured FIXTRACE_AI_RETRIES.
+    """
+    if retries is None:
+        retries = get_settings()["retries"]
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= retries or not _is_transient(e):
+                raise
+            _backoff(attempt, base_delay)
+
+def summary_fingerprint():
+    """Identify the model + prompt a summary was made with (changes when either does)."""
+    return cache.make_key(model_key(), SUMMARY_PROMPT)[:16]
+
+def _call_gemini(full_prompt, use_cache=True):
+    """Helper to call the model with error handling."""
     try:
-        client = _get_client()
-        response = client.models.generate_content(
-            model='gemini-2.5-flash', 
-            contents=full_prompt
-        )
-        return response.text
+        return _generate(full_prompt, use_cache=use_cache)
     except Exception as e:
         return f"⚠️ AI Error: {str(e)}"
 
-def query_gemini(context_text, user_question=None):
-    """Query Gemini with session context and optional user question.
+def query_gemini(context_text, user_question=None, use_cache=True, budget=None):
+    """Query the model with session context and optional user question.
     
     Args:
         context_text (str): The raw terminal output to analyze.
         user_question (str, optional): Specific question from the user.
                                      If None, defaults to error analysis/fix suggestion.
+        use_cache (bool): Reuse a cached response for an identical request.
+        budget (int, optional): Token budget of the prompt (default: the
+            configured FIXTRACE_AI_BUDGET); older commands are left out to fit.
     
     Returns:
         str: The AI's response text.
     """
+    try:
+        prompt, _, _ = build_query_prompt(context_text, user_question, budget)
+    except ValueError as e:
+        return f"⚠️ AI Error: {str(e)}"
+    return _call_gemini(prompt, use_cache=use_cache)
+
+def stream_gemini(context_text, user_question=None, use_cache=True, budget=None):
+    """Like query_gemini, but yields the response text as it arrives.
+    
+    Errors are yielded as a final "⚠️ AI Error" piece rather than raised.
+    """
+    try:
+        prompt, _, _ = build_query_prompt(context_text, user_question, budget)
+    except ValueError as e:
+        yield f"⚠️ AI Error: {str(e)}"
+        return
+    yield from stream_prompt(prompt, use_cache=use_cache)
+
+def stream_prompt(prompt, use_cache=True):
+    """Stream the answer to a prompt from build_query_prompt (errors as in stream_gemini)."""
+    try:
+        yield from _generate_stream(prompt, use_cache=use_cache)
+    except Exception as e:
+        yield f"⚠️ AI Error: {str(e)}"
+
+def prepare_context(log_text, lines, compress_log=True):
+    """Turn a session log (see parser.read_session_log) into the context of an ask prompt.
+    
+    Logs are redacted again, since events parsed before redaction existed
+    may still hold secrets, and compressed unless compress_log is False.
+    The status line starts with "Analyzing last" so clean_text filters it
+    out of later asks.
+    
+    Returns:
+        tuple: (context_text, status_line)
+    """
+    log_text = redact.redact(log_text)
+    if not compress_log:
+        return log_text, f"Analyzing last {lines} lines..."
+    before = estimate_tokens(log_text)
+    log_text = compress.compress_log(log_text)
+    after = estimate_tokens(log_text)
+    saved = 100 * (before - after) // before if before else 0
+    return log_text, f"Analyzing last {lines} lines... (compressed ~{before:,} → ~{after:,} tokens, -{saved}%)"
+
+def build_query_prompt(context_text, user_question=None, budget=None):
+    """Combine the system prompt, the logs, and the question (or fix request).
+    
+    The logs are trimmed to the most recent commands that fit in budget
+    tokens (default: the configured FIXTRACE_AI_BUDGET).
+    
+    Returns:
+        tuple: (prompt, estimated_tokens, omitted_lines), see build_prompt.
+    """
     if user_question:
         instruction = f"{QA_PROMPT}\n\nUSER QUESTION:\n{user_question}"
     else:
         instruction = SUGGESTION_PROMPT
-        
-    full_prompt = f"{GENERIC_SYSTEM_PROMPT}\n\nTERMINAL LOGS:\n{context_text}\n\nINSTRUCTIONS:\n{instruction}"
-    return _call_gemini(full_prompt)
+    if budget is None:
+        budget = get_settings()["budget"]
+    
+    return build_prompt(
+        f"{GENERIC_SYSTEM_PROMPT}\n\nTERMINAL LOGS:\n",
+        context_text,
+        f"\n\nINSTRUCTIONS:\n{instruction}",
+        budget,
+    )
 
-def generate_summary(session_log):
-    """Generate a structured summary of the session using Gemini.
+def generate_summary(session_log, use_cache=True, retries=None, on_progress=None, budget=None, usage=None, before_request=None):
+    """Generate a structured summary of the session using the model.
     
     Args:
         session_log (str): The readable session log.
+        use_cache (bool): Reuse a cached summary when the log is unchanged.
+        retries (int, optional): How many times to retry transient API
+            errors (default: the configured FIXTRACE_AI_RETRIES).
+        on_progress (callable, optional): Streams the final summary; called
+            with the text so far as it arrives (it starts over on a retry).
+        budget (int, optional): Token budget of each request (default: the
+            configured FIXTRACE_SUMMARY_BUDGET). A longer log is summarised
+            in windows that fit, then merged.
+        usage (dict, optional): "tokens" is increased by the estimated
+            tokens of every prompt sent.
+        before_request (callable, optional): Called before every request
+            sent to the model, retries and the windows of a long log
+            included, but not for responses served from the cache (bulk
+            uses it for rate limiting).
     
     Returns:
         tuple: (summary_text, error_message)
     """
     try:
-        full_prompt = SUMMARY_PROMPT + session_log
+        if budget is None:
+            budget = get_settings()["summary_budget"]
         
-        # We use _get_client here directly to handle exceptions differently
-        # (returning None, error string instead of an error string content)
-        client = _get_client()
-        response = client.models.generate_content(
-            model='gemini-2.5-flash', 
-            contents=full_prompt
-        )
-        return response.text, None
+        # Errors are returned as (None, error string) instead of as the
+        # response content, so we call _generate directly
+        def call(prompt, on_progress=None):
+            if usage is not None:
+                with _usage_lock:
+                    usage["tokens"] = usage.get("tokens", 0) + estimate_tokens(prompt)
+            def attempt():
+                return _generate_progressive(
+                    prompt, use_cache=use_cache, on_progress=on_progress, retries=0, before_request=before_request
+                )
+            
+            return _with_retries(attempt, retries)
+        
+        if estimate_tokens(SUMMARY_PROMPT + session_log) <= budget:
+            return call(SUMMARY_PROMPT + session_log, on_progress), None
+        return _map_reduce_summary(session_log, call, budget, on_progress), None
         
     except ValueError as e:
         return None, str(e)
     except Exception as e:
-        return None, f"Gemini API error: {str(e)}"
\ No newline at end of file
+        return None, f"Model API error: {str(e)}"
+
+def _map_reduce_summary(session_log, call, budget, on_progress=None):
+    """Summarise a long log in windows concurrently, then merge the notes.
+    
+    The log is split on command boundaries into windows that fill the
+    token budget (less the prompt around them) and each window is condensed
+    into notes in parallel. If the notes together are still over budget
+    they are condensed again, and a final pass turns them into the standard
+    summary format (streamed to on_progress).
+    
+    Raises:
+        ValueError: If the budget can't hold the prompts themselves, or is
+            too small for the notes to fit within MAX_SUMMARY_ROUNDS rounds
+            (or a round stops making them smaller).
+    """
+    room = budget - estimate_tokens(MERGE_PROMPT)
+    if room <= 0:
+        raise ValueError(f"Summary token budget {budget:,} is too small for the prompt (~{estimate_tokens(MERGE_PROMPT):,} tokens without the log)")
+    window_chars = room * CHARS_PER_TOKEN
+    text = session_log
+    for _ in range(MAX_SUMMARY_ROUNDS):
+        windows = parser.split_session_log(text, window_chars)
+        total = len(windows)
+        prompts = [
+            CHUNK_SUMMARY_PROMPT.format(part=i, total=total) + window
+            for i, window in enumerate(windows, 1)
+        ]
+        with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+            notes = list(executor.map(call, prompts))
+        
+        # Each part's notes start with a "$ " header line so the next round
+        # of splitting keeps a part's notes together
+        condensed = "\n".join(
+            f"$ # Part {i} of {total}\n{note.strip()}" for i, note in enumerate(notes, 1)
+        )
+        if estimate_tokens(condensed) <= room or total == 1:
+            return call(MERGE_PROMPT + condensed, on_progress)
+        if len(condensed) >= len(text):
+            break  # The notes are no smaller than what they condense
+        text = condensed
+    
+    raise ValueError(f"Summary token budget {budget:,} is too small for this session's notes (~{estimate_tokens(condensed):,} tokens); raise FIXTRACE_SUMMARY_BUDGET")
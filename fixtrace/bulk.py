@@ -0,0 +1,151 @@
+"""Bulk regeneration: summarise many sessions in parallel with rate limiting."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from . import session, parser, markdown, ai, redact, stats
+
+
+class RateLimiter:
+    """Client-side limiter spacing calls at most `rate` per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """Block until the caller may make its next call."""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def summarize_session(session_id, use_cache=True, retries=None, on_progress=None, timer=None, before_request=None):
+    """Generate the AI summary for one session and rewrite its summary.md.
+
+    summary.md is rewritten as the summary streams in; if generation fails
+    the previous file is put back. The summary fingerprint is only recorded
+    once the finished file is written, so a run interrupted mid-stream is
+    never mistaken for an up-to-date one. on_progress, if given, is also called
+    with the summary text so far. timer, if given (a stats.Timer), gets the
+    build_log, ai_call and write_markdown spans. before_request is passed to
+    ai.generate_summary.
+
+    Returns:
+        tuple: (markdown_file, error_message)
+    """
+    session_dir = session.get_session_dir(session_id)
+    metadata = session.load_metadata(session_dir)
+
+    timer = timer or stats.Timer()
+    with timer.span("build_log") as span:
+        jsonl_file = session_dir / "events.jsonl"
+        events = parser.parse_jsonl(jsonl_file)
+        # Sessions parsed before redaction existed may still hold secrets
+        log_text = redact.redact(parser.build_session_log(events))
+        span["bytes"] = jsonl_file.stat().st_size if events else 0
+
+    md_path = session_dir / "summary.md"
+    try:
+        previous = md_path.read_text()
+    except FileNotFoundError:
+        previous = None
+    previous_fingerprint = metadata.get("summary_fingerprint")
+    streamed = False
+
+    def progress(text):
+        nonlocal streamed
+        if not streamed:
+            # summary.md is about to stop matching the recorded fingerprint
+            session.update_metadata(session_dir, lambda metadata: metadata.pop("summary_fingerprint", None))
+        streamed = True
+        markdown.write_partial_markdown(session_id, session_dir, metadata, text)
+        if on_progress:
+            on_progress(text)
+
+    with timer.span("ai_call") as span:
+        span["bytes"] = len(log_text.encode("utf-8"))
+        ai_summary, error = ai.generate_summary(
+            log_text, use_cache=use_cache, retries=retries, on_progress=progress, usage=span,
+            before_request=before_request,
+        )
+    if not ai_summary:
+        if streamed:
+            if previous is None:
+                md_path.unlink()
+            else:
+                md_path.write_text(previous)
+                if previous_fingerprint:
+                    session.update_metadata(
+                        session_dir, lambda metadata: metadata.update(summary_fingerprint=previous_fingerprint)
+                    )
+        return None, error
+
+    # metadata was read before the model call, which can take minutes, so
+    # it is re-read to keep the timings recorded meanwhile
+    metadata = session.load_metadata(session_dir) or metadata
+    with timer.span("write_markdown"):
+        md_file = markdown.generate_markdown(session_id, session_dir, metadata, ai_summary=ai_summary)
+    # Remember which prompt/model produced this summary so bulk runs can
+    # skip it
+    fingerprint = ai.summary_fingerprint()
+    session.update_metadata(session_dir, lambda metadata: metadata.update(summary_fingerprint=fingerprint))
+    return md_file, None
+
+
+def is_up_to_date(session_id):
+    """True if the session's summary was made with the current prompt and model."""
+    metadata = session.load_metadata(session.get_session_dir(session_id))
+    return (
+        metadata.get("summary_fingerprint") == ai.summary_fingerprint()
+        and (session.get_session_dir(session_id) / "summary.md").exists()
+    )
+
+
+def summarize_sessions(session_ids, workers=4, rate=1.0, retries=3, use_cache=True):
+    """Summarise sessions concurrently, yielding (session_id, md_file, error) as each finishes.
+
+    Args:
+        session_ids (list): Sessions to summarise.
+        workers (int): Maximum number of requests in flight.
+        rate (float): Maximum model requests started per second, counting
+            every window, merge and retry of a session; responses served
+            from the cache don't count (0 for no limit).
+        retries (int): Retries per session for transient API errors.
+        use_cache (bool): Reuse cached AI responses.
+
+    If the consumer stops early (e.g. Ctrl+C), sessions not yet started are
+    cancelled. Completed sessions are recorded in their metadata, so running
+    the same batch again resumes where it left off.
+    """
+    limiter = RateLimiter(rate)
+
+    def run(session_id):
+        timer = stats.Timer()
+        result = summarize_session(
+            session_id, use_cache=use_cache, retries=retries, timer=timer, before_request=limiter.wait
+        )
+        stats.record(session.get_session_dir(session_id), "generate", timer)
+        return result
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    futures = {executor.submit(run, session_id): session_id for session_id in session_ids}
+    try:
+        for future in as_completed(futures):
+            session_id = futures[future]
+            try:
+                md_file, error = future.result()
+            except Exception as e:
+                md_file, error = None, str(e)
+            yield session_id, md_file, error
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
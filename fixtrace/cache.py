@@ -0,0 +1,147 @@
+"""Response cache: content-addressed on-disk cache for AI responses."""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from .session import FIXTRACE_DIR
+
+CACHE_DIR = FIXTRACE_DIR / "cache"
+STATS_FILE = CACHE_DIR / "stats.json"
+
+# Eviction limits: least recently used entries go first once the cache is
+# over MAX_CACHE_BYTES; anything unused for MAX_CACHE_AGE seconds is dropped.
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+MAX_CACHE_AGE = 30 * 24 * 60 * 60
+
+
+def make_key(*parts):
+    """Hash the parts (model, prompt, ...) into a cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = (part or "").encode("utf-8", errors="surrogatepass")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") differ
+        digest.update(f"{len(data)}:".encode())
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _entry_path(key):
+    return CACHE_DIR / f"{key}.json"
+
+
+def _count(field):
+    """Increment a hit/miss counter.
+    
+    Bulk workers, the daemon and the summary worker count concurrently, so
+    the file is locked while it is read and rewritten.
+    """
+    try:
+        with open(STATS_FILE, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                stats = json.loads(f.read() or "{}")
+            except ValueError:
+                stats = {}
+            stats[field] = stats.get(field, 0) + 1
+            f.seek(0)
+            f.truncate()
+            json.dump(stats, f)
+    except OSError:
+        pass
+
+
+def _read_stats():
+    try:
+        with open(STATS_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get(key):
+    """Return the cached response for key, or None on a miss."""
+    path = _entry_path(key)
+    try:
+        if time.time() - path.stat().st_mtime > MAX_CACHE_AGE:
+            path.unlink()
+            raise FileNotFoundError
+        with open(path, "r") as f:
+            response = json.load(f)["response"]
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+    except (OSError, ValueError, KeyError):
+        _count("misses")
+        return None
+    _count("hits")
+    return response
+
+
+def put(key, response):
+    """Store a response, then evict old entries if the cache is too big."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # A temporary file of its own, since several writers may store the same key
+    with tempfile.NamedTemporaryFile("w", dir=CACHE_DIR, suffix=".tmp", delete=False) as f:
+        json.dump({"response": response, "created_at": time.time()}, f)
+    os.replace(f.name, _entry_path(key))
+    evict()
+
+
+def _entries():
+    """List (mtime, size, path) for every cache entry."""
+    entries = []
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.path != str(STATS_FILE):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def evict(max_bytes=None, max_age=None):
+    """Drop expired entries, then least recently used ones until under max_bytes."""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    max_age = MAX_CACHE_AGE if max_age is None else max_age
+    now = time.time()
+    entries = sorted(_entries())
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def stats():
+    """Return hit/miss counters plus the current entry count and size."""
+    counters = _read_stats()
+    entries = _entries()
+    return {
+        "hits": counters.get("hits", 0),
+        "misses": counters.get("misses", 0),
+        "entries": len(entries),
+        "bytes": sum(size for _, size, _ in entries),
+    }
+
+
+def clear():
+    """Delete every cache entry and reset the counters."""
+    for _, _, path in _entries():
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    try:
+        STATS_FILE.unlink()
+    except FileNotFoundError:
+        pass
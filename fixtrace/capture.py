@@ -1,24 +1,64 @@
-"""Capture engine: wrap script subprocess for terminal I/O capture."""
+"""Capture engine: record terminal I/O, natively through a pty or by wrapping `script`."""
 
 import subprocess
 import signal
 import os
+import sys
+import time
+import select
 from pathlib import Path
 
+# Capture engines: "pty" runs the shell in a pseudo-terminal owned by this
+# process; "script" wraps the system `script` command (no timing data).
+ENGINES = ("pty", "script")
+DEFAULT_ENGINE = "pty"
 
-def start_capture(session_dir):
+# Timing sidecar written next to raw.txt by the pty engine. The first line
+# is a header with the wall-clock start time; every other line is
+# "<seconds since previous chunk> <bytes in chunk>", one per output chunk.
+TIMING_HEADER = "# fixtrace-timing v1 start="
+
+READ_SIZE = 64 * 1024
+
+# How often the I/O loop checks whether the shell has exited even though
+# something (e.g. a background job) still holds the terminal open
+POLL_INTERVAL = 0.5
+
+
+def start_capture(session_dir, engine=DEFAULT_ENGINE):
+    """Start capturing a shell session into session_dir/raw.txt.
+
+    Returns (proc, raw_file). proc has a .pid (the process to signal to stop
+    the session) and a blocking .wait(); with the pty engine, wait() is what
+    relays the terminal, so it must be called from the main thread.
+    """
+    if engine == "script":
+        return _start_script(session_dir)
+    if engine != "pty":
+        raise ValueError(f"Unknown capture engine: {engine} (expected one of {', '.join(ENGINES)})")
+
+    raw_file = session_dir / "raw.txt"
+    try:
+        proc = PtyCapture(raw_file, session_dir / "timing.txt")
+        proc.start()
+        return proc, raw_file
+    except Exception as e:
+        print(f"Error starting capture: {e}")
+        return None, raw_file
+
+
+def _start_script(session_dir):
     """Start script capture by calling it directly (non-blocking).
-    
+
     The script command will take over the current shell and record to raw_file.
     The user will interact with the script session directly.
     """
     raw_file = session_dir / "raw.txt"
-    
+
     # Determine flags based on platform
     # macOS uses -F for immediate flush, Linux uses -f
-    import sys
     flush_flag = "-F" if sys.platform == "darwin" else "-f"
-    
+
     # Start script command using Popen to capture the process ID
     # This allows us to kill the specific 'script' process later
     try:
@@ -27,7 +67,8 @@ def start_capture(session_dir):
             stdin=None,  # Inherit stdin
             stdout=None, # Inherit stdout
             stderr=None, # Inherit stderr
-            preexec_fn=os.setsid # Start in new session to avoid signal propagation issues
+            preexec_fn=os.setsid, # Start in new session to avoid signal propagation issues
+            env=dict(os.environ, FIXTRACE_SESSION=session_dir.name),
         )
         return proc, raw_file
     except Exception as e:
@@ -35,18 +76,176 @@ def start_capture(session_dir):
         return None, raw_file
 
 
+class PtyCapture:
+    """Run the user's shell in a pseudo-terminal and record everything it prints.
+
+    Output is appended to raw_file as it arrives, and each chunk's timing
+    (monotonic clock) to timing_file.
+    """
+
+    def __init__(self, raw_file, timing_file, shell=None):
+        self.raw_file = raw_file
+        self.timing_file = timing_file
+        self.shell = shell or os.environ.get("SHELL") or "/bin/sh"
+        self.pid = None
+        self.master_fd = None
+        self.returncode = None
+        self.started = None
+
+    def start(self):
+        """Fork the shell on a new pty. Output is relayed once wait() runs."""
+        import pty
+
+        pid, master_fd = pty.fork()
+        if pid == 0:
+            # Child: become the shell (pty.fork already made it a session
+            # leader with the pty as its controlling terminal)
+            try:
+                # Lets `fixtrace hook` scripts know they are being recorded
+                os.environ["FIXTRACE_SESSION"] = Path(self.raw_file).parent.name
+                os.execvp(self.shell, [self.shell])
+            finally:
+                os._exit(127)
+
+        self.pid = pid
+        self.master_fd = master_fd
+        self.started = time.monotonic()
+        with open(self.timing_file, "w") as f:
+            f.write(f"{TIMING_HEADER}{time.time():.6f}\n")
+        self._sync_window_size()
+
+    def _sync_window_size(self):
+        """Give the pty the size of the real terminal."""
+        import fcntl
+        import termios
+
+        try:
+            size = fcntl.ioctl(sys.stdin.fileno(), termios.TIOCGWINSZ, b"\0" * 8)
+            fcntl.ioctl(self.master_fd, termios.TIOCSWINSZ, size)
+        except (OSError, ValueError):
+            pass  # stdin is not a terminal
+
+    def _record(self, data, raw, timing, last):
+        """Write a chunk to raw_file and timing_file. Returns its timestamp."""
+        now = time.monotonic() - self.started
+        # Timing first, so a reader that sees the bytes can always time them
+        timing.write(f"{now - last:.6f} {len(data)}\n")
+        timing.flush()
+        raw.write(data)
+        raw.flush()
+        return now
+
+    def wait(self):
+        """Relay the terminal to and from the shell until it exits. Returns its exit code."""
+        import tty
+        import termios
+
+        if self.returncode is not None:
+            return self.returncode
+
+        stdin_fd = sys.stdin.fileno()
+        stdout_fd = sys.stdout.fileno()
+        old_attrs = None
+        if os.isatty(stdin_fd):
+            old_attrs = termios.tcgetattr(stdin_fd)
+            tty.setraw(stdin_fd)
+        old_winch = signal.signal(signal.SIGWINCH, lambda *_: self._sync_window_size())
+
+        inputs = [self.master_fd, stdin_fd]
+        last = 0.0
+        try:
+            with open(self.raw_file, "ab") as raw, open(self.timing_file, "a") as timing:
+                while self.returncode is None:
+                    try:
+                        readable, _, _ = select.select(inputs, [], [], POLL_INTERVAL)
+                    except InterruptedError:
+                        continue
+
+                    if self.master_fd in readable:
+                        try:
+                            data = os.read(self.master_fd, READ_SIZE)
+                        except OSError:
+                            data = b""  # EIO: every process using the pty is gone
+                        if not data:
+                            break
+                        last = self._record(data, raw, timing, last)
+                        _write_all(stdout_fd, data)
+
+                    if stdin_fd in readable:
+                        data = os.read(stdin_fd, READ_SIZE)
+                        if data:
+                            _write_all(self.master_fd, data)
+                        else:
+                            inputs.remove(stdin_fd)  # stdin closed (not a terminal)
+
+                    self._poll()
+
+                # The shell has exited; pass on whatever it printed last
+                while self.returncode is not None and select.select([self.master_fd], [], [], 0)[0]:
+                    try:
+                        data = os.read(self.master_fd, READ_SIZE)
+                    except OSError:
+                        break
+                    if not data:
+                        break
+                    last = self._record(data, raw, timing, last)
+                    _write_all(stdout_fd, data)
+        finally:
+            signal.signal(signal.SIGWINCH, old_winch)
+            if old_attrs:
+                termios.tcsetattr(stdin_fd, termios.TCSADRAIN, old_attrs)
+            os.close(self.master_fd)
+
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = _exit_code(status)
+        return self.returncode
+
+    def _poll(self):
+        """Reap the shell if it has exited."""
+        pid, status = os.waitpid(self.pid, os.WNOHANG)
+        if pid:
+            self.returncode = _exit_code(status)
+
+
+def _write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _exit_code(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
 def stop_capture(proc):
     """Legacy function - not used with new implementation."""
     pass
 
 
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
 def kill_process_by_pid(pid):
-    """Kill a process by PID gracefully."""
+    """Kill a process by PID gracefully.
+
+    Sends SIGTERM first. Interactive shells (the pty engine records the
+    shell itself) ignore SIGTERM, so SIGHUP follows if the process is still
+    there, just as if its terminal had been closed.
+    """
     try:
         os.kill(pid, signal.SIGTERM)
         # Wait a bit for graceful shutdown
-        import time
         time.sleep(0.5)
+        if _is_alive(pid):
+            os.kill(pid, signal.SIGHUP)
+            time.sleep(0.5)
     except OSError:
         pass  # Already dead
     except Exception as e:
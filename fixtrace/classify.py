@@ -0,0 +1,227 @@
+"""Classify: instant, offline answers for common mechanical errors.
+
+`fixtrace ask` without a question tries these rules on the most recent
+error before asking the model. A rule matches the error's output with a
+regex and fills its named groups into templates for the usual
+"💡 Analysis / 🚀 Suggestion" answer. Rules only cover errors whose fix is
+mechanical; anything else falls through to the model.
+"""
+
+import json
+import re
+
+from . import compress, parser
+from .session import FIXTRACE_DIR
+
+# Optional user rules, e.g.
+#   {"rules": {"yarn_missing": {"pattern": "yarn: command not found",
+#                               "analysis": "Yarn isn't installed.",
+#                               "suggestion": "corepack enable"}},
+#    "disabled": ["command_not_found"]}
+# "rules" adds rules (or replaces a built-in one of the same name), which
+# are tried before the built-ins; "disabled" turns built-in rules off.
+RULES_FILE = FIXTRACE_DIR / "error_rules.json"
+
+# Built-in rules, tried in order. "pattern" is a regex or a list of them
+# (the first to match a line wins); its named groups, plus any FIELDS, can
+# be used in "analysis" and "suggestion" as {name}.
+DEFAULT_RULES = {
+    # Only top-level names: the package that provides a dotted one (e.g.
+    # google.genai) can't be told from its first component, so those are
+    # left to the model
+    "module_not_found": {
+        "pattern": r"ModuleNotFoundError: No module named '(?P<module>\w+)'",
+        "analysis": "Python can't import '{module}': it isn't installed in the active environment, or, if it's one of your own modules, it isn't on the import path.",
+        "suggestion": "pip install {package}  # if it's a third-party package; for your own module, run from the project root",
+    },
+    "node_module_not_found": {
+        "pattern": r"Cannot find module '(?P<package>(?:@[\w.-]+/)?[\w-][\w.-]*)[^']*'",
+        "analysis": "Node can't find the package '{package}'; it isn't installed in node_modules.",
+        "suggestion": "npm install {package}",
+    },
+    "port_in_use": {
+        "pattern": [
+            r"(?:EADDRINUSE|[Aa]ddress already in use).*: ?(?P<port>\d{2,5})\b",
+            r"listen tcp [\w.\[\]:]*:(?P<port>\d{2,5}): bind: address already in use",
+            r"[Pp]ort (?P<port>\d{2,5}) is already (?:in use|allocated)",
+        ],
+        # Only shows the listener: it may be a service the user wants to keep
+        "analysis": "Port {port} is already in use by another process (often an earlier run that is still up); check what it is before stopping it.",
+        "suggestion": "lsof -i tcp:{port}",
+    },
+    "address_in_use": {
+        "pattern": r"EADDRINUSE|[Aa]ddress already in use",
+        "analysis": "The port the program wants is already in use by another process.",
+        "suggestion": "lsof -nP -iTCP -sTCP:LISTEN",
+    },
+    "command_not_found": {
+        "pattern": [
+            r"^zsh: command not found: (?P<command>[\w.+-]+)",
+            r"^(?:\S+: )?(?:line \d+: )?(?P<command>[\w.+-]+): command not found",
+        ],
+        # Which package provides a command (if any) varies by platform, so
+        # this only points at the checks; a package name would be a guess
+        "analysis": "The shell can't find '{command}': check the spelling, then whether it's installed but not on your PATH.",
+        "suggestion": "command -v {command} || echo $PATH",
+    },
+    "script_not_executable": {
+        # Only the shell's own error: "cat: /etc/shadow: Permission denied"
+        # is a file the user can't read, not a script to chmod
+        "pattern": [
+            r"^(?:(?:\S*/)?-?(?:ba|da|k)?sh: )?(?:line \d+: |\d+: )?(?P<path>\.{0,2}/[^\s:]+): [Pp]ermission denied",
+            r"^zsh: permission denied: (?P<path>\.{0,2}/\S+)",
+        ],
+        "analysis": "'{path}' isn't marked as executable.",
+        "suggestion": "chmod +x {path}",
+    },
+    "docker_socket": {
+        "pattern": r"permission denied while trying to connect to the Docker daemon socket",
+        "analysis": "Your user isn't in the docker group, so it can't talk to the Docker daemon.",
+        "suggestion": "sudo usermod -aG docker $USER && newgrp docker",
+    },
+    "npm_global_eacces": {
+        "pattern": r"EACCES: permission denied, \w+ '(?P<path>[^']*node_modules[^']*)'",
+        "analysis": "npm is installing global packages into {path}, which your user can't write to.",
+        "suggestion": "mkdir -p ~/.npm-global && npm config set prefix ~/.npm-global && export PATH=~/.npm-global/bin:$PATH",
+    },
+    "missing_env_var": {
+        "pattern": [
+            r"KeyError: '(?P<var>[A-Z][A-Z0-9]*_[A-Z0-9_]+)'",
+            r"(?P<var>[A-Z][A-Z0-9_]+): (?:unbound variable|parameter not set)",
+            r"(?:[Ee]nvironment variable|env var)\s+[\"'`]?(?P<var>[A-Z][A-Z0-9_]+)[\"'`]?\s+(?:is\s+)?(?:not set|missing|required|undefined)",
+            r"[Mm]issing (?:required )?environment variable:?\s+[\"'`]?(?P<var>[A-Z][A-Z0-9_]+)",
+        ],
+        "analysis": "The environment variable {var} isn't set.",
+        "suggestion": "export {var}=<value>  # or add it to your .env",
+    },
+}
+
+# Python modules whose pip package has a different name
+PIP_PACKAGES = {
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "jwt": "PyJWT",
+    "PIL": "Pillow",
+    "sklearn": "scikit-learn",
+    "yaml": "PyYAML",
+}
+
+# Rules whose templates use fields computed from the matched groups
+FIELDS = {}
+
+_classifier = None
+
+
+def _pip_package(groups):
+    return {"package": PIP_PACKAGES.get(groups["module"], groups["module"])}
+
+
+FIELDS["module_not_found"] = _pip_package
+
+
+def load_rules(rules_file=RULES_FILE):
+    """Return the active rules (name -> rule): the user's rules file, then the built-ins."""
+    rules = dict(DEFAULT_RULES)
+    try:
+        with open(rules_file, "r") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return rules
+    except ValueError as e:
+        raise ValueError(f"Invalid error rules file {rules_file}: {e}")
+
+    for name in config.get("disabled", []):
+        rules.pop(name, None)
+    user_rules = config.get("rules", {})
+    for name in user_rules:
+        rules.pop(name, None)
+    return {**user_rules, **rules}
+
+
+class _Fields(dict):
+    """Template fields; a field the rule didn't capture is shown as <name>."""
+
+    def __missing__(self, key):
+        return f"<{key}>"
+
+
+class Classifier:
+    """Compiled rules, applied to the most recent failing command of a log."""
+
+    def __init__(self, rules):
+        self.rules = []
+        for name, rule in rules.items():
+            patterns = rule.get("pattern")
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            if not patterns or "analysis" not in rule or "suggestion" not in rule:
+                raise ValueError(f"Invalid error rule '{name}': needs pattern, analysis and suggestion")
+            try:
+                compiled = [re.compile(pattern, re.MULTILINE) for pattern in patterns]
+            except re.error as e:
+                raise ValueError(f"Invalid error rule '{name}': {e}")
+            self.rules.append((name, compiled, rule))
+
+    def match_block(self, text):
+        """Return (name, answer) for the rule matching the latest line of text, or None.
+
+        Rules matching the same line are tried in order, so specific rules
+        (port_in_use) win over general ones (address_in_use).
+        """
+        best = None
+        for name, patterns, rule in self.rules:
+            for pattern in patterns:
+                for match in pattern.finditer(text):
+                    line_start = text.rfind("\n", 0, match.start()) + 1
+                    if best is None or line_start > best[0]:
+                        best = (line_start, match, name, rule)
+        if best is None:
+            return None
+
+        _, match, name, rule = best
+        fields = _Fields({key: value for key, value in match.groupdict().items() if value})
+        if name in FIELDS:
+            fields.update(FIELDS[name](fields))
+        answer = (
+            f"💡 Analysis: {rule['analysis'].format_map(fields)}\n"
+            f"🚀 Suggestion: {rule['suggestion'].format_map(fields)}\n"
+        )
+        return name, answer
+
+    def classify(self, log_text):
+        """Answer the most recent error of a cleaned log, or None to ask the model.
+
+        Commands after the error that printed nothing alarming (such as
+        `fixtrace ask` itself) are skipped. If the most recent error matches
+        no rule, None is returned rather than an answer about an older one.
+
+        Returns:
+            tuple: (rule_name, answer_text), or None.
+        """
+        for block in reversed(compress.split_blocks(log_text)):
+            output = "\n".join(block[1:] if parser.match_prompt(block[0]) is not None else block)
+            result = self.match_block(output)
+            if result is not None:
+                return result
+            if compress.ERROR_RE.search(output):
+                return None
+        return None
+
+
+def get_classifier():
+    """The classifier for the active rules, compiled on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = Classifier(load_rules())
+    return _classifier
+
+
+def classify(log_text):
+    """Answer the most recent error in log_text with a rule (see DEFAULT_RULES and RULES_FILE).
+
+    Returns:
+        tuple: (rule_name, answer_text), or None if no rule matches it.
+    """
+    return get_classifier().classify(log_text)
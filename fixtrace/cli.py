@@ -2,7 +2,7 @@
 
 import typer
 from rich.console import Console
-from rich.table import Table
+from rich.markup import escape
 from pathlib import Path
 import json
 import threading
@@ -13,7 +13,7 @@ import termios
 
 from typing import List, Optional
 
-from . import session, capture, parser, markdown, ai
+from . import session, capture, parser, markdown, ai, search, cache, bulk, daemon, hooks, stats, jobs, recall, classify, prefetch
 
 app = typer.Typer(help="FixTrace: Capture terminal sessions and auto-generate docs")
 console = Console()
@@ -37,10 +37,28 @@ def auto_stop_session(session_id, timeout_seconds):
                 pass
 
 
+def follow_session_log(raw_file, jsonl_file, checkpoint_file, stop_event, error_file, **kwargs):
+    """Run the live parser, logging a crash to error_file instead of the recorded terminal.
+    
+    start parses the whole log when the session ends if the live parser
+    didn't finish (its checkpoint isn't marked done).
+    """
+    try:
+        parser.follow_raw_file(raw_file, jsonl_file, checkpoint_file, stop_event, **kwargs)
+    except Exception:
+        import traceback
+
+        with open(error_file, "a") as f:
+            traceback.print_exc(file=f)
+
+
 @app.command()
 def start(
     name: str = typer.Option(None, "--name", help="Session name (optional)"),
     timeout: int = typer.Option(None, "--timeout", help="Auto-stop after N seconds (default: from config or 1800 = 30min)"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show how long finishing the session took"),
+    prefetch_answers: bool = typer.Option(None, "--prefetch/--no-prefetch", help="Ask the AI about failing commands in the background, so `ask` answers instantly (default: from config, off)"),
+    summary: bool = typer.Option(None, "--summary/--no-summary", help="Queue an AI summary when the session ends (default: from config, on)"),
 ):
     """Start a new capture session."""
     # Load config for defaults
@@ -54,24 +72,35 @@ def start(
             pass
     if timeout is None:
         timeout = config.get('timeout', 1800)
+    engine = config.get('capture_engine', capture.DEFAULT_ENGINE)
+    if prefetch_answers is None:
+        prefetch_answers = config.get('prefetch', False)
+    if summary is None:
+        summary = config.get('summary', True)
     
     try:
+        # Pick up summaries left queued (e.g. by a worker that didn't survive a reboot)
+        jobs.resume()
+        
         session_id, session_dir = session.create_session(name)
         
         console.print(f"[green]✅ Session started: {session_id}[/green]")
         console.print(f"[dim]Recording to: {session_dir}[/dim]")
         console.print(f"[dim]Auto-stop timeout: {timeout}s ({timeout//60} min)[/dim]")
+        if prefetch_answers:
+            console.print("[dim]Prefetching AI suggestions for failing commands[/dim]")
         console.print(f"[yellow]You are now inside the recording session.[/yellow]")
         console.print(f"[yellow]Type 'exit' or run 'fixtrace stop' in another terminal when done.[/yellow]")
         
         # Start capture - this returns the subprocess
-        proc, raw_file = capture.start_capture(session_dir)
+        proc, raw_file = capture.start_capture(session_dir, engine)
         
         if not proc:
             console.print("[red]❌ Failed to start capture process[/red]")
             raise typer.Exit(1)
 
-        # Save session ID and the PID of the CAPTURE process (script)
+        # Save session ID and the PID of the CAPTURE process (the shell
+        # for the pty engine, script otherwise)
         session.save_active_pid(session_id, proc.pid)
         
         # Start auto-stop timer in background
@@ -81,6 +110,21 @@ def start(
             daemon=True,
         )
         timer_thread.start()
+
+        # Parse the log in the background while the session is live, so
+        # finishing only has to process the last few lines
+        jsonl_file = session_dir / "events.jsonl"
+        checkpoint_file = session_dir / "parse_state.json"
+        timing_file = session_dir / "timing.txt" if engine == "pty" else None
+        stop_parsing = threading.Event()
+        prefetcher = prefetch.Prefetcher(session_id, session_dir) if prefetch_answers else None
+        parser_thread = threading.Thread(
+            target=follow_session_log,
+            args=(raw_file, jsonl_file, checkpoint_file, stop_parsing, session_dir / "parse_error.log"),
+            kwargs={"timing_file": timing_file, "on_tokens": prefetcher.feed if prefetcher else None},
+            daemon=True,
+        )
+        parser_thread.start()
         
         # Save terminal settings
         try:
@@ -99,41 +143,47 @@ def start(
         
         # Clear active PID immediately
         session.clear_active_pid()
+        if prefetcher:
+            prefetcher.close()
         
         # Script session ended - parse and generate docs
         if raw_file.exists() and raw_file.stat().st_size > 0:
             console.print(f"\n[green]✅ Session recording ended[/green]")
             
             # Read metadata
-            metadata_file = session_dir / "metadata.json"
-            metadata = {}
-            if metadata_file.exists():
-                with open(metadata_file, 'r') as f:
-                    metadata = json.load(f)
+            metadata = session.load_metadata(session_dir)
             
-            # Parse
-            jsonl_file = session_dir / "events.jsonl"
+            # Parse: let the live parser flush the tail of the log
             console.print("[dim]Parsing session...[/dim]")
-            events = parser.parse_raw_to_jsonl(raw_file, jsonl_file)
+            timer = stats.Timer()
+            with timer.span("parse") as span:
+                stop_parsing.set()
+                parser_thread.join()
+                checkpoint = parser.read_checkpoint(checkpoint_file)
+                if not (checkpoint and checkpoint.get("done")):
+                    # The live parser died; parse the whole log instead
+                    parser.parse_raw_to_jsonl(raw_file, jsonl_file, timing_file)
+                span["bytes"] = raw_file.stat().st_size
             
             # Generate Basic Markdown
             console.print("[dim]Saving session...[/dim]")
-            md_file = markdown.generate_markdown(session_id, session_dir, metadata)
+            with timer.span("write_markdown"):
+                md_file = markdown.generate_markdown(session_id, session_dir, metadata)
             
             console.print(f"[green]✅ Session complete![/green]")
             console.print(f"[cyan]Session saved to: {md_file}[/cyan]")
             
-            # Ask user if they want to generate AI summary
-            response = console.input("[bold]Would you like to generate an AI summary? (yes/no): [/bold]").strip().lower()
-            if response in ("yes", "y"):
-                with console.status("[bold green]Generating AI summary...[/bold green]"):
-                    log_text = parser.build_session_log(events)
-                    ai_summary, error = ai.generate_summary(log_text)
-                    if ai_summary:
-                        md_file = markdown.generate_markdown(session_id, session_dir, metadata, ai_summary=ai_summary)
-                        console.print(f"[green]✅ AI summary generated![/green]")
-                    else:
-                        console.print(f"[red]❌ AI summary failed: {error}[/red]")
+            stats.record(session_dir, "start", timer)
+            if verbose:
+                spans = timer.stages
+                console.print(f"[dim]Parsing: {spans['parse']['seconds']:.2f}s, saving: {spans['write_markdown']['seconds']:.2f}s[/dim]")
+            
+            # The AI summary is written by a background worker, so the shell
+            # is free right away
+            if summary:
+                jobs.enqueue(session_id)
+                jobs.start_worker()
+                console.print("[green]✅ AI summary queued[/green] [dim](`fixtrace list` shows its progress)[/dim]")
     
     except RuntimeError as e:
         console.print(f"[red]❌ Error: {e}[/red]")
@@ -192,20 +242,17 @@ def list(
 ):
     """List all captured sessions."""
     try:
-        sessions = session.list_sessions()
+        # Pick up summaries left queued (e.g. by a worker that didn't survive a reboot)
+        jobs.resume()
         
-        # Apply filters
-        if name:
-            sessions = [s for s in sessions if name.lower() in s["name"].lower()]
-        if status:
-            sessions = [s for s in sessions if s["status"].lower() == status.lower()]
+        # Filtered and sorted (newest first) by the session index
+        sessions = session.list_sessions(name=name, status=status)
         
         if not sessions:
             console.print("[dim]No sessions match the filters[/dim]")
             return
         
-        # Sort by started time, newest first
-        sessions.sort(key=lambda s: s["started_at"], reverse=True)
+        from rich.table import Table
         
         table = Table(title="FixTrace Sessions")
         table.add_column("Session ID", style="cyan")
@@ -231,9 +278,39 @@ def list(
         raise typer.Exit(1)
 
 
+def check_since(since):
+    """Exit with an error unless since is an ISO date (or date and time)."""
+    from datetime import datetime
+    
+    try:
+        datetime.fromisoformat(since)
+    except ValueError:
+        console.print(f"[red]❌ Invalid --since date: {since} (expected YYYY-MM-DD)[/red]")
+        raise typer.Exit(1)
+
+
 @app.command()
-def generate(session_id: str = typer.Argument(..., help="Session ID to regenerate")):
-    """Regenerate markdown for a session."""
+def generate(
+    session_id: str = typer.Argument(None, help="Session ID to regenerate"),
+    all_sessions: bool = typer.Option(False, "--all", help="Regenerate every session"),
+    since: str = typer.Option(None, "--since", help="Regenerate sessions started on or after this date (YYYY-MM-DD)"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Parallel AI requests when regenerating many sessions"),
+    rate: float = typer.Option(1.0, "--rate", help="Max AI requests per second when regenerating many sessions (0 = no limit)"),
+    force: bool = typer.Option(False, "--force", help="Also redo sessions already summarised with the current prompt"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached AI responses"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show response timings"),
+):
+    """Regenerate markdown for a session (or many, with --all / --since)."""
+    if since:
+        check_since(since)
+    if all_sessions or since:
+        generate_bulk(since, workers, rate, force, use_cache=not no_cache)
+        return
+    
+    if not session_id:
+        console.print("[red]❌ Provide a session ID, --all, or --since[/red]")
+        raise typer.Exit(1)
+    
     try:
         session_dir = session.get_session_dir(session_id)
         
@@ -241,30 +318,114 @@ def generate(session_id: str = typer.Argument(..., help="Session ID to regenerat
             console.print(f"[red]❌ Session not found: {session_id}[/red]")
             raise typer.Exit(1)
         
-        metadata_file = session_dir / "metadata.json"
-        metadata = {}
-        if metadata_file.exists():
-            with open(metadata_file, 'r') as f:
-                metadata = json.load(f)
-        
-        # Read events to build log
-        jsonl_file = session_dir / "events.jsonl"
-        events = parser.parse_jsonl(jsonl_file)
-        log_text = parser.build_session_log(events)
-        
-        with console.status("[bold green]Generating AI summary...[/bold green]"):
-            ai_summary, error = ai.generate_summary(log_text)
-            if ai_summary:
-                md_file = markdown.generate_markdown(session_id, session_dir, metadata, ai_summary=ai_summary)
-                console.print(f"[green]✅ Documentation regenerated with AI summary[/green]")
-                console.print(f"[cyan]Saved to: {md_file}[/cyan]")
-            else:
-                console.print(f"[red]❌ AI summary failed: {error}[/red]")
+        timer = stats.Timer()
+        md_file, error, timings = summarize_with_status(session_id, use_cache=not no_cache, timer=timer)
+        stats.record(session_dir, "generate", timer)
+        if md_file:
+            jobs.remove(session_id)  # Supersedes a queued or failed background summary
+            console.print(f"[green]✅ Documentation regenerated with AI summary[/green]")
+            console.print(f"[cyan]Saved to: {md_file}[/cyan]")
+        else:
+            console.print(f"[red]❌ AI summary failed: {error}[/red]")
+        if verbose:
+            print_timings(timings)
         
     except Exception as e:
         console.print(f"[red]❌ Error: {e}[/red]")
         raise typer.Exit(1)
 
+
+def summarize_with_status(session_id, use_cache=True, timer=None):
+    """Summarise one session behind a spinner that shows the summary streaming in.
+    
+    timer (a stats.Timer), if given, gets the pipeline stage spans.
+    
+    Returns:
+        tuple: (md_file, error, timings) where timings has "first_token"
+        (None if nothing was streamed) and "total" in seconds.
+    """
+    started = time.perf_counter()
+    timings = {"first_token": None, "total": None}
+    with console.status("[bold green]Generating AI summary...[/bold green]") as status:
+        def on_progress(text):
+            if timings["first_token"] is None:
+                timings["first_token"] = time.perf_counter() - started
+            status.update(f"[bold green]Generating AI summary... ({len(text):,} chars)[/bold green]")
+        
+        md_file, error = bulk.summarize_session(session_id, use_cache=use_cache, on_progress=on_progress, timer=timer)
+    timings["total"] = time.perf_counter() - started
+    return md_file, error, timings
+
+
+def print_timings(timings):
+    """Print time-to-first-token and total time (for --verbose)."""
+    if timings["first_token"] is not None:
+        console.print(f"[dim]Time to first token: {timings['first_token']:.2f}s, total: {timings['total']:.2f}s[/dim]")
+    else:
+        console.print(f"[dim]Total: {timings['total']:.2f}s[/dim]")
+
+
+def generate_bulk(since, workers, rate, force, use_cache=True):
+    """Regenerate summaries for many sessions in parallel, with a progress bar."""
+    from rich.progress import Progress, BarColumn, MofNCompleteColumn, TextColumn, TimeElapsedColumn
+    
+    try:
+        # Never summarise the session that is still recording
+        active_id, _ = session.get_active_session()
+        session_ids = [
+            s["session_id"] for s in session.list_sessions(since=since)
+            if s["session_id"] != active_id
+        ]
+        
+        # Sessions the background worker is about to summarise
+        session_ids = [
+            sid for sid in session_ids
+            if (jobs.load(sid) or {}).get("state") not in ("queued", "running")
+        ]
+        
+        # Resume: skip sessions already summarised with the current prompt
+        skipped = 0
+        if not force:
+            pending = [sid for sid in session_ids if not bulk.is_up_to_date(sid)]
+            skipped = len(session_ids) - len(pending)
+            session_ids = pending
+        
+        if skipped:
+            console.print(f"[dim]Skipping {skipped} session(s) already up to date (use --force to redo)[/dim]")
+        if not session_ids:
+            console.print("[dim]Nothing to regenerate[/dim]")
+            return
+        
+        failures = []
+        with Progress(
+            TextColumn("[bold green]Generating AI summaries"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            TimeElapsedColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task("summaries", total=len(session_ids))
+            for session_id, md_file, error in bulk.summarize_sessions(
+                session_ids, workers=workers, rate=rate, use_cache=use_cache
+            ):
+                if error:
+                    failures.append(session_id)
+                    progress.console.print(f"[red]❌ {session_id}: {error}[/red]")
+                else:
+                    jobs.remove(session_id)
+                progress.advance(task)
+        
+        done = len(session_ids) - len(failures)
+        console.print(f"[green]✅ Regenerated {done} session(s)[/green]")
+        if failures:
+            console.print(f"[red]❌ {len(failures)} failed; run the same command again to retry them[/red]")
+            raise typer.Exit(1)
+    
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Interrupted. Run the same command again to resume.[/yellow]")
+        raise typer.Exit(130)
+
+
 @app.command()
 def delete(session_id: str = typer.Argument(..., help="Session ID to delete")):
     """Delete a session and its files."""
@@ -282,6 +443,16 @@ def delete(session_id: str = typer.Argument(..., help="Session ID to delete")):
         
         import shutil
         shutil.rmtree(session_dir)
+        jobs.remove(session_id)
+        session.index_session(session_id)
+        try:
+            search.index_session_text(session_id)
+        except Exception:
+            pass  # The session is gone either way; `fixtrace reindex` drops it later
+        try:
+            recall.index_session(session_id)
+        except Exception:
+            pass  # Same for the recall index
         console.print(f"[green]✅ Session deleted: {session_id}[/green]")
         
     except Exception as e:
@@ -289,9 +460,132 @@ def delete(session_id: str = typer.Argument(..., help="Session ID to delete")):
         raise typer.Exit(1)
     
 
+@app.command("search")
+def search_sessions(
+    query: List[str] = typer.Argument(..., help="Words to search for in commands, outputs, and summaries"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Maximum number of sessions to show"),
+):
+    """Search all recorded sessions."""
+    try:
+        results = search.search(" ".join(query), limit=limit)
+        if not results:
+            console.print("[dim]No matching sessions[/dim]")
+            return
+        
+        from rich.table import Table
+        
+        table = Table(title="FixTrace Search")
+        table.add_column("Session ID", style="cyan")
+        table.add_column("Name", style="magenta", max_width=15, overflow="ellipsis")
+        table.add_column("Found In", style="yellow")
+        table.add_column("Match")
+        
+        for result in results:
+            session_dir = session.get_session_dir(result["session_id"])
+            session_id_display = f"[link=file://{session_dir}]{result['session_id']}[/link]"
+            snippet = escape(result["snippet"].replace("\n", " "))
+            snippet = snippet.replace(search.MATCH_START, "[bold yellow]").replace(search.MATCH_END, "[/bold yellow]")
+            table.add_row(session_id_display, result["name"], result["kind"], snippet)
+        
+        console.print(table)
+        
+    except Exception as e:
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def reindex():
+    """Rebuild the session index from the session folders."""
+    try:
+        count = session.rebuild_index()
+        updated = search.update_index()
+        recalled = recall.update_index()
+        console.print(f"[green]✅ Session index rebuilt ({count} sessions, {updated} re-indexed for search, {recalled} for past fixes)[/green]")
+    except Exception as e:
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command("cache")
+def cache_info(clear: bool = typer.Option(False, "--clear", help="Delete all cached AI responses")):
+    """Show AI response cache statistics."""
+    if clear:
+        cache.clear()
+        console.print("[green]✅ Cache cleared[/green]")
+        return
+    
+    cache_stats = cache.stats()
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    hit_rate = f"{cache_stats['hits'] / lookups:.0%}" if lookups else "n/a"
+    console.print(f"Entries: {cache_stats['entries']} ({cache_stats['bytes'] / 1024:.1f} KB)")
+    console.print(f"Hits: {cache_stats['hits']}  Misses: {cache_stats['misses']}  Hit rate: {hit_rate}")
+
+
+@app.command("stats")
+def show_stats(
+    command: str = typer.Option(None, "--command", "-c", help="Only runs of this command: start, generate or ask"),
+    since: str = typer.Option(None, "--since", help="Only sessions started on or after this date (YYYY-MM-DD)"),
+):
+    """Show how long each pipeline stage takes (p50/p95 across sessions)."""
+    if since:
+        check_since(since)
+    try:
+        stages = stats.aggregate(command=command, since=since)
+        if not stages:
+            console.print("[dim]No timings recorded yet[/dim]")
+            return
+        
+        from rich.table import Table
+        
+        table = Table(title="FixTrace Stage Timings")
+        table.add_column("Stage", style="cyan")
+        table.add_column("Runs", justify="right")
+        table.add_column("p50", justify="right", style="green")
+        table.add_column("p95", justify="right", style="yellow")
+        table.add_column("Bytes (p50)", justify="right")
+        table.add_column("Tokens (p50)", justify="right")
+        
+        for stage, row in stages.items():
+            table.add_row(
+                stage,
+                str(row["runs"]),
+                format_seconds(row["p50"]),
+                format_seconds(row["p95"]),
+                format_bytes(row["bytes_p50"]),
+                f"{row['tokens_p50']:,}" if row["tokens_p50"] is not None else "-",
+            )
+        
+        console.print(table)
+        
+    except Exception as e:
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+def format_seconds(seconds):
+    """Short duration for tables: milliseconds under a second, else seconds."""
+    if seconds < 0.01:
+        return f"{seconds * 1000:.1f} ms"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.2f} s"
+
+
+def format_bytes(size):
+    """Short size for tables (or "-" when unknown)."""
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
 @app.command()
 def config(
-    key: str = typer.Argument(..., help="Config key: timeout or output_path"),
+    key: str = typer.Argument(..., help="Config key: timeout, output_path, capture_engine, prefetch or summary"),
     value: str = typer.Argument(None, help="Value to set (omit to get current value)"),
 ):
     """Get or set configuration values."""
@@ -320,8 +614,23 @@ def config(
                 raise typer.Exit(1)
         elif key == 'output_path':
             config['output_path'] = value
+        elif key == 'capture_engine':
+            if value not in capture.ENGINES:
+                console.print(f"[red]❌ Invalid value for capture_engine: use {' or '.join(capture.ENGINES)}[/red]")
+                raise typer.Exit(1)
+            config['capture_engine'] = value
+        elif key == 'prefetch':
+            if value not in ('on', 'off'):
+                console.print("[red]❌ Invalid value for prefetch: use on or off[/red]")
+                raise typer.Exit(1)
+            config['prefetch'] = value == 'on'
+        elif key == 'summary':
+            if value not in ('on', 'off'):
+                console.print("[red]❌ Invalid value for summary: use on or off[/red]")
+                raise typer.Exit(1)
+            config['summary'] = value == 'on'
         else:
-            console.print(f"[red]❌ Invalid key: {key}. Use 'timeout' or 'output_path'[/red]")
+            console.print(f"[red]❌ Invalid key: {key}. Use 'timeout', 'output_path', 'capture_engine', 'prefetch' or 'summary'[/red]")
             raise typer.Exit(1)
         
         # Save config
@@ -353,9 +662,25 @@ def view(session_id: str = typer.Argument(..., help="Session ID to view folder")
 def ask(
     question: List[str] = typer.Argument(None, help="Specific question about the session"),
     lines: int = typer.Option(1000, "--lines", "-l", help="Number of recent terminal lines to include as context"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached AI responses"),
+    no_compress: bool = typer.Option(False, "--no-compress", help="Send the log verbatim instead of compressing it"),
+    budget: Optional[int] = typer.Option(None, "--budget", "-b", help="Token budget of the prompt; older commands are left out to fit (default: FIXTRACE_AI_BUDGET or 8000)"),
+    no_ai: bool = typer.Option(False, "--no-ai", help="Only answer locally (fixes from past sessions, built-in error rules); don't call the model"),
+    no_rules: bool = typer.Option(False, "--no-rules", help="Ask the model even when a built-in rule recognises the error"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Show response timings"),
 ):
     """Ask AI for help with the current session or a specific question."""
     try:
+        question_str = " ".join(question) if question else None
+        
+        # A running `fixtrace daemon` already has the client and the cleaned
+        # log warm; otherwise do everything in this process (--no-ai needs
+        # no client)
+        conn = None if no_ai else daemon.connect()
+        if conn is not None:
+            ask_via_daemon(conn, question_str, lines, budget, not no_compress, not no_cache, not no_rules, verbose)
+            return
+        
         # 1. Identify session
         active_id, pid = session.get_active_session()
         if active_id:
@@ -363,26 +688,31 @@ def ask(
             console.print(f"[dim]Using active session: {session_id}[/dim]")
         else:
             # Fallback to latest session
-            sessions = session.list_sessions()
-            if not sessions:
+            latest = session.get_latest_session()
+            if not latest:
                 console.print("[red]❌ No sessions found.[/red]")
                 raise typer.Exit(1)
-            # Latest session is first if sorted (session.py doesn't sort, so we do it here or assume latest)
-            sessions.sort(key=lambda s: s["started_at"], reverse=True)
-            session_id = sessions[0]["session_id"]
+            session_id = latest["session_id"]
             console.print(f"[dim]Using latest session: {session_id}[/dim]")
 
-        # 2. Extract context
+        # 2. Extract context. Sessions parsed live already have cleaned
+        # events, so only the unparsed tail of raw.txt is cleaned (see
+        # parser.read_session_log; the daemon reads it the same way).
         session_dir = session.get_session_dir(session_id)
-        console.print(f"[dim]Analyzing last {lines} lines...[/dim]")
-        
-        raw_content = session.get_recent_log_content(session_dir, lines=lines)
-        if not raw_content:
+        timer = stats.Timer()
+        with timer.span("read_raw") as span:
+            clean_content = parser.read_session_log(session_dir, lines=lines if lines > 0 else None)
+            span["bytes"] = len(clean_content.encode("utf-8"))
+        if not clean_content:
             console.print("[yellow]⚠️ Log is empty or not found.[/yellow]")
             return
 
-        # 3. Clean context (strip ANSI)
-        clean_content = parser.clean_text(raw_content)
+        # 3. Redact, collapse repeated lines and trim huge outputs around
+        # their errors
+        with timer.span("clean") as span:
+            clean_content, status_line = ai.prepare_context(clean_content, lines, compress_log=not no_compress)
+            span["bytes"] = len(clean_content.encode("utf-8"))
+        console.print(f"[dim]{status_line}[/dim]")
 
         # DEBUG: Save context to inspect sanitization
         debug_file = session_dir / "debug_ai_context.txt"
@@ -390,17 +720,202 @@ def ask(
             f.write(clean_content)
         # console.print(f"[dim]Debug context saved to: {debug_file}[/dim]")
 
-        # 4. Query AI via ai.py
-        question_str = " ".join(question) if question else None
-        with console.status("[bold green]Asking AI...[/bold green]"):
-            response = ai.query_gemini(clean_content, question_str)
-        
-        console.print(f"\n{response}")
+        # 4. Local answers, shown before the model is even asked: fixes from
+        # past sessions that hit the same error, and rules for mechanical
+        # errors (which make the model call unnecessary). With --no-ai they
+        # are all there is, question or not.
+        if not question_str or no_ai:
+            with timer.span("recall"):
+                matches = recall.lookup(clean_content, exclude=session_id)
+            print_matches(matches)
+            classified = None
+            if not no_rules:
+                with timer.span("classify"):
+                    classified = classify.classify(clean_content)
+            answered = False
+            if classified:
+                rule, answer = classified
+                console.print(f"[dim]Recognised by the '{rule}' rule (--no-rules asks the AI instead)[/dim]")
+                print_answer(iter([answer]), time.perf_counter(), verbose)
+                answered = True
+            elif not no_cache:
+                # Answered in the background when the command failed (see
+                # `start --prefetch`); waits if that request is still running
+                with timer.span("prefetch"), console.status("[bold green]Checking for a prefetched answer...[/bold green]"):
+                    prefetched = prefetch.get_answer(session_dir, clean_content)
+                if prefetched:
+                    answer, age = prefetched
+                    console.print(f"[dim]⚡ Prefetched {age:.0f}s ago, when the command failed (--no-cache asks again)[/dim]")
+                    print_answer(iter([answer]), time.perf_counter(), verbose)
+                    answered = True
+            if no_ai and not (matches or answered):
+                console.print("[dim]No similar errors in past sessions, and no rule recognises this one[/dim]")
+            if answered or no_ai:
+                stats.record(session_dir, "ask", timer)
+                return
+
+        # 5. Keep the most recent commands that fit in the token budget
+        if budget is None:
+            budget = ai.get_settings()["budget"]
+        prompt, tokens, omitted = ai.build_query_prompt(clean_content, question_str, budget)
+        console.print(f"[dim]{ai.describe_prompt(tokens, budget, omitted)}[/dim]")
+
+        # 6. Query AI via ai.py
+        with timer.span("ai_call") as span:
+            span["bytes"] = len(prompt.encode("utf-8"))
+            span["tokens"] = tokens
+            started = time.perf_counter()
+            pieces = ai.stream_prompt(prompt, use_cache=not no_cache)
+            print_answer(pieces, started, verbose)
+        stats.record(session_dir, "ask", timer)
 
     except Exception as e:
         console.print(f"[red]❌ Error: {e}[/red]")
         raise typer.Exit(1)
 
 
+def ask_via_daemon(conn, question, lines, budget, compress_log, use_cache, use_rules, verbose):
+    """Run `ask` through the daemon, printing its status lines and streamed answer."""
+    started = time.perf_counter()
+    replies = daemon.request(
+        conn, "ask", question=question, lines=lines, budget=budget, compress=compress_log,
+        use_cache=use_cache, rules=use_rules,
+    )
+    for message in replies:
+        if message["type"] == "status":
+            console.print(f"[dim]{escape(message['text'])}[/dim]")
+        elif message["type"] == "warning":
+            console.print(f"[yellow]⚠️ {escape(message['text'])}[/yellow]")
+            return
+        elif message["type"] in ("error", "done"):
+            console.print(f"[red]❌ {escape(message.get('text', 'No answer from daemon'))}[/red]")
+            raise typer.Exit(1)
+        elif message["type"] == "recall":
+            print_matches(message["matches"])
+        elif message["type"] == "prepared":
+            break
+    prepared = time.perf_counter() - started
+    
+    def pieces():
+        for message in replies:
+            if message["type"] == "text":
+                yield message["text"]
+            elif message["type"] == "error":
+                yield f"⚠️ AI Error: {message['text']}"
+    
+    print_answer(pieces(), started, verbose)
+    if verbose:
+        console.print(f"[dim]Local overhead (via daemon): {prepared * 1000:.0f} ms[/dim]")
+
+
+def print_matches(matches):
+    """Print fixes from past sessions that hit a similar error (see recall.lookup)."""
+    if not matches:
+        return
+    console.print(f"\n[bold cyan]🔁 Seen before in {len(matches)} past session{'s' if len(matches) != 1 else ''}:[/bold cyan]")
+    for match in matches:
+        session_dir = session.get_session_dir(match["session_id"])
+        console.print(
+            f"\n[magenta]{escape(match['name'])}[/magenta] "
+            f"[dim]({match['started_at'][:10]}, [link=file://{session_dir}/summary.md]{match['session_id']}[/link], "
+            f"{match['similarity']:.0%} similar)[/dim]"
+        )
+        console.print(f"[red]{escape(match['error'])}[/red]")
+        for line in match["resolution"].split("\n"):
+            console.print(f"  {escape(line)}")
+    console.print()
+
+
+def print_answer(pieces, started, verbose):
+    """Print a streamed answer; the spinner runs until the first piece arrives."""
+    with console.status("[bold green]Asking AI...[/bold green]"):
+        first = next(pieces, "")
+    first_token = time.perf_counter() - started
+    
+    console.print()
+    console.out(first, end="", highlight=False)
+    for piece in pieces:
+        console.out(piece, end="", highlight=False)
+    console.print()
+    
+    if verbose:
+        total = time.perf_counter() - started
+        console.print(f"[dim]Time to first token: {first_token:.2f}s, total: {total:.2f}s[/dim]")
+
+
+@app.command(hidden=True)
+def worker():
+    """Write queued AI summaries (started in the background by `fixtrace start`)."""
+    try:
+        if not jobs.run_worker():
+            console.print("[dim]A worker is already running[/dim]")
+    except KeyboardInterrupt:
+        console.print("\n[dim]Worker stopped[/dim]")
+    except Exception as e:
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command()
+def hook(shell: str = typer.Argument(..., help="Shell to integrate with: bash or zsh")):
+    """Print a shell hook that marks exact command boundaries and exit codes.
+    
+    Add to ~/.bashrc or ~/.zshrc:  [ -n "$FIXTRACE_SESSION" ] && eval "$(fixtrace hook bash)"
+    """
+    try:
+        script = hooks.get_hook(shell)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(1)
+    # Plain print: the script must not be wrapped or styled
+    print(script, end="")
+
+
+@app.command("daemon")
+def run_daemon(
+    detach: bool = typer.Option(False, "--detach", "-d", help="Run in the background"),
+    stop_daemon: bool = typer.Option(False, "--stop", help="Stop the running daemon"),
+):
+    """Run a warm background process that makes `fixtrace ask` respond faster."""
+    try:
+        if stop_daemon:
+            if daemon.stop():
+                console.print("[green]✅ Daemon stopped[/green]")
+            else:
+                console.print("[dim]No daemon running[/dim]")
+            return
+        
+        if daemon.is_running():
+            console.print(f"[yellow]Daemon already running on {daemon.SOCKET_PATH}[/yellow]")
+            return
+        
+        if detach:
+            import subprocess
+            
+            daemon.LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(daemon.LOG_FILE, "a") as log:
+                subprocess.Popen(
+                    [sys.executable, "-m", "fixtrace.cli", "daemon"],
+                    stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                    start_new_session=True,
+                )
+            # Wait for the socket so the next `ask` finds it
+            for _ in range(50):
+                if daemon.is_running():
+                    break
+                time.sleep(0.1)
+            console.print(f"[green]✅ Daemon started[/green] [dim](log: {daemon.LOG_FILE})[/dim]")
+            return
+        
+        console.print(f"[green]Daemon listening on {daemon.SOCKET_PATH}[/green] [dim](Ctrl+C to stop)[/dim]")
+        daemon.serve()
+    
+    except KeyboardInterrupt:
+        console.print("\n[dim]Daemon stopped[/dim]")
+    except Exception as e:
+        console.print(f"[red]❌ Error: {e}[/red]")
+        raise typer.Exit(1)
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""Compression: shrink cleaned terminal logs before they are sent to the model."""
+
+import re
+
+from .parser import match_prompt
+
+# Lines that point at the problem; kept (with some context) when an output
+# block is truncated, and used to find the most recent failing command.
+# Errno names (EADDRINUSE, ENOENT) must be upper case, or every word starting
+# with "e" would match.
+ERROR_RE = re.compile(
+    r'error|exception|traceback|fail|fatal|panic|denied|refused|not found|'
+    r'no such file|cannot|can\'t|unable to|undefined|segmentation fault|'
+    r'exit code|exit status|(?-i:\bE[A-Z]{3,}\b)',
+    re.IGNORECASE,
+)
+
+# Numbers, hex ids and paths-with-digits vary between otherwise identical
+# lines (progress counters, timestamps, retry attempts, addresses). Used to
+# compare logs for similarity (see recall.py).
+VOLATILE_RE = re.compile(r'0x[0-9a-fA-F]+|[0-9a-fA-F]{8,}|\d+(?:[.:]\d+)*')
+
+# The part of VOLATILE_RE that never matters to the model: addresses, hex
+# ids and timestamps. Other numbers (line numbers, ports, status codes) are
+# kept, so errors that differ only in them are not collapsed.
+REPEAT_VOLATILE_RE = re.compile(
+    r'0x[0-9a-fA-F]+|\b(?=\d*[a-fA-F])[0-9a-fA-F]{8,}\b|'
+    r'(?:\d{4}-\d{2}-\d{2}[T ])?(?<!\d)\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|'
+    r'\d{4}-\d{2}-\d{2}'
+)
+
+# Output blocks longer than this are truncated around their error lines.
+# The most recent failing command gets a larger allowance.
+MAX_BLOCK_LINES = 40
+MAX_PRIORITY_BLOCK_LINES = 200
+
+# Lines kept from the start and end of a truncated block, and around each
+# error line inside it.
+HEAD_LINES = 5
+TAIL_LINES = 10
+ERROR_CONTEXT_LINES = 3
+
+
+def _normalize(line):
+    """Key used to detect lines that repeat up to an address, id or timestamp."""
+    return REPEAT_VOLATILE_RE.sub('#', line)
+
+
+def collapse_repeats(lines):
+    """Collapse runs of repeated lines into one "(×N)" line.
+
+    Lines that differ only in an address, hex id or timestamp count as
+    repeats. The last line of each run is kept, since it carries the final
+    state.
+    """
+    result = []
+    run_key = None
+    run_count = 0
+    for line in lines:
+        key = _normalize(line)
+        if run_count and key == run_key:
+            run_count += 1
+            result[-1] = f"{line} (×{run_count})"
+            continue
+        run_key = key
+        run_count = 1
+        result.append(line)
+    return result
+
+
+def truncate_output(lines, max_lines):
+    """Keep the head, the tail and the lines around errors of an oversized output."""
+    if len(lines) <= max_lines:
+        return lines
+
+    keep = set(range(min(HEAD_LINES, len(lines))))
+    keep.update(range(max(0, len(lines) - TAIL_LINES), len(lines)))
+    for i, line in enumerate(lines):
+        if ERROR_RE.search(line):
+            keep.update(range(max(0, i - ERROR_CONTEXT_LINES), min(len(lines), i + ERROR_CONTEXT_LINES + 1)))
+
+    result = []
+    skipped = 0
+    for i, line in enumerate(lines):
+        if i in keep:
+            if skipped:
+                result.append(f"... ({skipped} lines omitted) ...")
+                skipped = 0
+            result.append(line)
+        else:
+            skipped += 1
+    if skipped:
+        result.append(f"... ({skipped} lines omitted) ...")
+    return result
+
+
+def split_blocks(text):
+    """Group lines into blocks that start at a shell prompt (the first may not)."""
+    blocks = []
+    for line in text.split('\n'):
+        if not blocks or match_prompt(line) is not None:
+            blocks.append([line])
+        else:
+            blocks[-1].append(line)
+    return blocks
+
+
+def _is_failing(block):
+    return any(ERROR_RE.search(line) for line in block[1:])
+
+
+def compress_log(text):
+    """Compress a cleaned log (clean_text or build_session_log output).
+
+    Repeated lines are collapsed, oversized command outputs are cut down
+    to the lines around their errors, and the most recent failing command
+    is given a larger allowance so its error is never lost.
+
+    Returns:
+        str: The compressed log.
+    """
+    blocks = split_blocks(text)
+
+    # 1. The most recent command whose output contains an error
+    priority = None
+    for i in range(len(blocks) - 1, -1, -1):
+        if _is_failing(blocks[i]):
+            priority = i
+            break
+
+    # 2. Collapse repeats, then truncate each block's output
+    compressed = []
+    for i, block in enumerate(blocks):
+        head, output = block[:1], collapse_repeats(block[1:])
+        max_lines = MAX_PRIORITY_BLOCK_LINES if i == priority else MAX_BLOCK_LINES
+        compressed.extend(head + truncate_output(output, max_lines))
+
+    return '\n'.join(compressed)
@@ -0,0 +1,225 @@
+"""Daemon: a warm background process that answers `fixtrace ask` over a Unix socket.
+
+The daemon keeps the model client (and its HTTP connection pool) alive. It
+reads a session's log the same way the in-process `ask` does (see
+parser.read_session_log and ai.prepare_context), so both send the same
+prompt. The CLI uses it when it is running and falls back to doing the work
+in-process otherwise.
+
+Protocol: the client sends one JSON request line; the daemon answers with
+JSON lines ({"type": "status" | "prepared" | "text" | "warning" | "error" |
+"done", ...}).
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from . import session, parser, ai, stats, recall, classify, prefetch
+
+SOCKET_PATH = session.FIXTRACE_DIR / "daemon.sock"
+LOG_FILE = session.FIXTRACE_DIR / "daemon.log"
+
+CONNECT_TIMEOUT = 0.2
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return  # A liveness check (is_running) connects and hangs up
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self._send(type="error", text="Invalid request")
+            return
+
+        op = request.get("op")
+        if op == "ping":
+            self._send(type="done", pid=os.getpid())
+        elif op == "shutdown":
+            self._send(type="done")
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif op == "ask":
+            try:
+                self._ask(request)
+            except Exception as e:
+                self._send(type="error", text=str(e))
+        else:
+            self._send(type="error", text=f"Unknown op: {op}")
+
+    def _send(self, **message):
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def _ask(self, request):
+        started = time.perf_counter()
+        lines = request.get("lines", 1000)
+
+        # 1. Identify session
+        active_id, _ = session.get_active_session()
+        if active_id:
+            session_id = active_id
+            self._send(type="status", text=f"Using active session: {session_id}")
+        else:
+            latest = session.get_latest_session()
+            if not latest:
+                self._send(type="error", text="No sessions found.")
+                return
+            session_id = latest["session_id"]
+            self._send(type="status", text=f"Using latest session: {session_id}")
+
+        # 2. Extract context, as `ask` does in-process
+        session_dir = session.get_session_dir(session_id)
+        timer = stats.Timer()
+        with timer.span("read_raw") as span:
+            clean_content = parser.read_session_log(session_dir, lines=lines if lines > 0 else None)
+            span["bytes"] = len(clean_content.encode("utf-8"))
+        if not clean_content:
+            self._send(type="warning", text="Log is empty or not found.")
+            return
+
+        # 3. Redact and compress
+        with timer.span("clean") as span:
+            clean_content, status_line = ai.prepare_context(clean_content, lines, compress_log=request.get("compress", True))
+            span["bytes"] = len(clean_content.encode("utf-8"))
+        self._send(type="status", text=status_line)
+
+        # 4. Fixes from past sessions that hit the same error, and rules
+        # for mechanical errors (which answer without the model)
+        if not request.get("question"):
+            with timer.span("recall"):
+                matches = recall.lookup(clean_content, exclude=session_id)
+            if matches:
+                self._send(type="recall", matches=matches)
+            if request.get("rules", True):
+                with timer.span("classify"):
+                    classified = classify.classify(clean_content)
+                if classified:
+                    rule, answer = classified
+                    self._send(type="status", text=f"Recognised by the '{rule}' rule (--no-rules asks the AI instead)")
+                    self._answer_locally(started, answer, session_dir, timer)
+                    return
+            # Answered in the background when the command failed (see
+            # `start --prefetch`)
+            if request.get("use_cache", True):
+                with timer.span("prefetch"):
+                    prefetched = prefetch.get_answer(session_dir, clean_content)
+                if prefetched:
+                    answer, age = prefetched
+                    self._send(type="status", text=f"⚡ Prefetched {age:.0f}s ago, when the command failed (--no-cache asks again)")
+                    self._answer_locally(started, answer, session_dir, timer)
+                    return
+
+        # 5. Keep the most recent commands that fit in the token budget
+        budget = request.get("budget") or ai.get_settings()["budget"]
+        prompt, tokens, omitted = ai.build_query_prompt(clean_content, request.get("question"), budget)
+        self._send(type="status", text=ai.describe_prompt(tokens, budget, omitted))
+
+        # 6. Stream the answer
+        self._send(type="prepared", seconds=time.perf_counter() - started)
+        with timer.span("ai_call") as span:
+            span["bytes"] = len(prompt.encode("utf-8"))
+            span["tokens"] = tokens
+            for piece in ai.stream_prompt(prompt, use_cache=request.get("use_cache", True)):
+                self._send(type="text", text=piece)
+        self._send(type="done")
+        stats.record(session_dir, "ask", timer)
+
+
+    def _answer_locally(self, started, answer, session_dir, timer):
+        """Send an answer that needed no model call, as a finished stream."""
+        self._send(type="prepared", seconds=time.perf_counter() - started)
+        self._send(type="text", text=answer)
+        self._send(type="done")
+        stats.record(session_dir, "ask", timer)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def connect():
+    """Connect to the running daemon, or return None if there isn't one."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(str(SOCKET_PATH))
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def request(sock, op, **fields):
+    """Send one request and yield the daemon's replies up to the final one (done, warning or error)."""
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps(dict(fields, op=op)) + "\n").encode("utf-8"))
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            yield message
+            if message["type"] in ("done", "error", "warning"):
+                return
+
+
+def is_running():
+    """True if a daemon is listening on SOCKET_PATH."""
+    sock = connect()
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def serve():
+    """Run the daemon in the foreground until it is told to shut down.
+
+    Raises:
+        RuntimeError: If a daemon is already running.
+    """
+    if is_running():
+        raise RuntimeError(f"Daemon already running on {SOCKET_PATH}")
+    # Left behind by a daemon that was killed
+    if SOCKET_PATH.exists():
+        SOCKET_PATH.unlink()
+
+    # Warm up: the SDK import and client setup are the slow part of a cold ask
+    try:
+        ai.get_provider()
+    except ValueError:
+        pass  # No API key yet; asks will report it
+
+    SOCKET_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Owner-only from the moment it exists: bind creates the socket with the
+    # umask's permissions
+    old_umask = os.umask(0o077)
+    try:
+        server = _Server(str(SOCKET_PATH), _Handler)
+    finally:
+        os.umask(old_umask)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if SOCKET_PATH.exists():
+            SOCKET_PATH.unlink()
+
+
+def stop():
+    """Ask the running daemon to exit. Returns False if none was running."""
+    sock = connect()
+    if sock is None:
+        return False
+    for _ in request(sock, "shutdown"):
+        pass
+    # The server notices the shutdown within its poll interval
+    for _ in range(20):
+        if not is_running():
+            break
+        time.sleep(0.1)
+    return True
@@ -0,0 +1,190 @@
+"""Fake model server: a local stand-in for the model API, for offline load tests.
+
+Usage:
+    python -m fixtrace.fake_server [--port 8765] [--latency 0.8] [--jitter 0.3]
+                                   [--chunks 8] [--chunk-delay 0.05]
+                                   [--error-rate 0.05] [--error-code 503] [--hang-rate 0]
+
+Point FixTrace at it with FIXTRACE_PROVIDER=local (and FIXTRACE_LOCAL_URL
+if it isn't on http://127.0.0.1:8765). Answers are canned text in the
+format of the prompt that was sent (suggestion, answer or summary).
+
+Time to the first piece is drawn from a log-normal distribution with median
+--latency and shape --jitter, so there is a realistic slow tail; the rest of
+the answer follows in --chunks pieces --chunk-delay apart. --error-rate of
+requests fail with --error-code and --hang-rate never answer (to exercise
+client timeouts).
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUGGESTION = "💡 Analysis: Port 3000 is already in use by another process.\n🚀 Suggestion: lsof -ti :3000 | xargs kill\n"
+ANSWER = "💬 Answer: The server failed to start because port 3000 was already taken; stop the old process and retry.\n"
+SUMMARY = """🛠 FixTrace Summary
+
+Problem:
+- The dev server would not start.
+
+Key Commands:
+- npm start
+
+Errors Encountered:
+- EADDRINUSE: address already in use :::3000
+
+Resolution Steps:
+1. Found the old server with lsof.
+2. Killed it and restarted.
+
+Root Cause:
+- A previous server was still running.
+
+Notes:
+- Served by the FixTrace fake model server.
+"""
+
+
+class FakeModel:
+    """Latency and error behaviour of the fake server (shared by its threads)."""
+
+    def __init__(self, latency=0.8, jitter=0.3, chunks=8, chunk_delay=0.05,
+                 error_rate=0.0, error_code=503, hang_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunks = max(1, chunks)
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.hang_rate = hang_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def plan(self):
+        """Decide one request's fate: ("error", None), ("hang", None) or ("ok", first-piece delay)."""
+        with self.lock:
+            self.requests += 1
+            roll = self.rng.random()
+            delay = self.latency * self.rng.lognormvariate(0, self.jitter) if self.jitter else self.latency
+            if roll < self.error_rate:
+                self.errors += 1
+                return "error", None
+            if roll < self.error_rate + self.hang_rate:
+                return "hang", None
+        return "ok", delay
+
+    def answer(self, prompt):
+        """Canned answer matching the kind of prompt, split into pieces."""
+        if "FixTrace Summary" in prompt or "compact notes" in prompt:
+            text = SUMMARY
+        elif "USER QUESTION" in prompt:
+            text = ANSWER
+        else:
+            text = SUGGESTION
+        size = -(-len(text) // self.chunks)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the load test's output
+
+    def do_POST(self):
+        model = self.server.model
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            prompt = json.loads(self.rfile.read(length))["prompt"]
+        except (ValueError, KeyError):
+            self._reply(400, {"error": "Expected {\"prompt\": ...}"})
+            return
+        if self.path not in ("/generate", "/stream"):
+            self._reply(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        outcome, delay = model.plan()
+        if outcome == "error":
+            self._reply(model.error_code, {"error": "Injected error"})
+            return
+        if outcome == "hang":
+            time.sleep(3600)
+            return
+
+        time.sleep(delay)
+        pieces = model.answer(prompt)
+        if self.path == "/generate":
+            time.sleep(model.chunk_delay * (len(pieces) - 1))
+            self._reply(200, {"text": "".join(pieces)})
+            return
+
+        # Stream one JSON line per piece (chunked, so pieces arrive as sent)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(model.chunk_delay)
+            data = (json.dumps({"text": piece}) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(model, host="127.0.0.1", port=8765):
+    """Create (but don't start) a fake server; port 0 picks a free one (see server_address)."""
+    server = _Server((host, port), _Handler)
+    server.model = model
+    return server
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency", type=float, default=0.8, help="Median seconds to the first piece")
+    arg_parser.add_argument("--jitter", type=float, default=0.3, help="Log-normal shape of the latency (0 = fixed)")
+    arg_parser.add_argument("--chunks", type=int, default=8, help="Pieces per streamed answer")
+    arg_parser.add_argument("--chunk-delay", type=float, default=0.05, help="Seconds between pieces")
+    arg_parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    arg_parser.add_argument("--error-code", type=int, default=503, help="HTTP status of injected failures")
+    arg_parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests never answered")
+    arg_parser.add_argument("--seed", type=int, default=None)
+    args = arg_parser.parse_args()
+
+    model = FakeModel(
+        latency=args.latency, jitter=args.jitter, chunks=args.chunks, chunk_delay=args.chunk_delay,
+        error_rate=args.error_rate, error_code=args.error_code, hang_rate=args.hang_rate, seed=args.seed,
+    )
+    server = make_server(model, args.host, args.port)
+    print(f"Fake model server on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n{model.requests} requests, {model.errors} injected errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Shell hooks: emit OSC 133 markers so the parser sees exact command boundaries.
+
+Install with (in ~/.bashrc or ~/.zshrc):
+
+    [ -n "$FIXTRACE_SESSION" ] && eval "$(fixtrace hook bash)"
+
+The hooks only run inside a recorded session (FIXTRACE_SESSION is set by
+the capture engine), so other shells are untouched and don't pay for
+starting fixtrace.
+"""
+
+# Markers: A = prompt starts, B = prompt ends, C = command runs,
+# D;<status> = command finished. B is kept at the end of PS1 (re-added if a
+# theme rebuilds the prompt); the others are printed by the hook functions.
+BASH_HOOK = r'''
+if [ -n "$FIXTRACE_SESSION" ] && [ -z "$__fixtrace_hooked" ]; then
+    __fixtrace_hooked=1
+    __fixtrace_at_prompt=1
+    __fixtrace_in_prompt=1  # Until the first prompt (the rest of the rc file isn't a command)
+
+    # First in PROMPT_COMMAND: report how the command finished
+    __fixtrace_status() {
+        local status=$?
+        __fixtrace_in_prompt=1
+        if [ -z "$__fixtrace_at_prompt" ]; then
+            printf '\033]133;D;%s\007' "$status"
+        fi
+        return $status
+    }
+
+    # Last in PROMPT_COMMAND: the prompt is about to be drawn
+    __fixtrace_precmd() {
+        __fixtrace_in_prompt=
+        __fixtrace_at_prompt=1
+        printf '\033]133;A\007'
+        case "$PS1" in
+            *'133;B'*) ;;
+            *) PS1="$PS1"'\[\033]133;B\007\]' ;;
+        esac
+    }
+
+    # DEBUG trap: runs before every simple command. Only the first one typed
+    # at the prompt starts a command (not PROMPT_COMMAND or completion).
+    __fixtrace_preexec() {
+        [ -n "$__fixtrace_in_prompt" ] && return
+        [ "$BASH_COMMAND" = "__fixtrace_status" ] && return
+        [ -n "$__fixtrace_at_prompt" ] || return
+        [ -n "$COMP_LINE" ] && return
+        __fixtrace_at_prompt=
+        printf '\033]133;C\007'
+    }
+
+    # bash 5.1+ also accepts PROMPT_COMMAND as an array; keep its entries
+    if [[ "$(declare -p PROMPT_COMMAND 2>/dev/null)" == "declare -a"* ]]; then
+        PROMPT_COMMAND=(__fixtrace_status "${PROMPT_COMMAND[@]}" __fixtrace_precmd)
+    else
+        PROMPT_COMMAND="__fixtrace_status${PROMPT_COMMAND:+;$PROMPT_COMMAND};__fixtrace_precmd"
+    fi
+    trap '__fixtrace_preexec' DEBUG
+fi
+'''
+
+ZSH_HOOK = r'''
+if [[ -n "$FIXTRACE_SESSION" && -z "$__fixtrace_hooked" ]]; then
+    __fixtrace_hooked=1
+
+    __fixtrace_precmd() {
+        local exit_status=$?
+        if [[ -n "$__fixtrace_ran" ]]; then
+            printf '\033]133;D;%s\007' "$exit_status"
+        fi
+        __fixtrace_ran=
+        printf '\033]133;A\007'
+        [[ "$PS1" == *'133;B'* ]] || PS1="$PS1"$'%{\e]133;B\a%}'
+    }
+
+    __fixtrace_preexec() {
+        __fixtrace_ran=1
+        printf '\033]133;C\007'
+    }
+
+    # First in line, so it sees the command's exit status
+    precmd_functions=(__fixtrace_precmd $precmd_functions)
+    preexec_functions+=(__fixtrace_preexec)
+fi
+'''
+
+HOOKS = {"bash": BASH_HOOK, "zsh": ZSH_HOOK}
+
+
+def get_hook(shell):
+    """Return the hook script for shell ("bash" or "zsh").
+
+    Raises:
+        ValueError: If the shell is not supported.
+    """
+    try:
+        return HOOKS[shell].lstrip("\n")
+    except KeyError:
+        raise ValueError(f"Unsupported shell: {shell} (expected one of {', '.join(HOOKS)})")
@@ -0,0 +1,208 @@
+"""Jobs: a persistent queue of AI summaries, worked through by a detached worker.
+
+Each job is a JSON file in session.JOBS_DIR named after its session:
+"queued" (waiting to run, or to be retried), "running", or "failed" (out
+of attempts). Finished jobs are deleted. Every change re-indexes the
+session, so `fixtrace list` shows the job's state.
+
+One worker at a time holds WORKER_LOCK; it runs the queued jobs oldest
+first, waits out retry delays, and exits once nothing is left to do.
+"""
+
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from . import session, bulk, stats
+
+WORKER_LOCK = session.JOBS_DIR / "worker.lock"
+LOG_FILE = session.FIXTRACE_DIR / "worker.log"
+
+# Attempts per job before it is marked failed
+MAX_ATTEMPTS = 5
+
+# Seconds before the first retry of a failed attempt (doubles each time)
+RETRY_DELAY = 30
+
+# Quick retries of transient API errors within one attempt
+API_RETRIES = 2
+
+# How often a worker waiting for a retry looks for new jobs
+POLL_INTERVAL = 5
+
+
+def _job_file(session_id):
+    return session.JOBS_DIR / f"{session_id}.json"
+
+
+def load(session_id):
+    """Return the session's job, or None if it has none."""
+    try:
+        with open(_job_file(session_id), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save(job):
+    """Write a job atomically and refresh its session's index entry."""
+    session.JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    job_file = _job_file(job["session_id"])
+    tmp_file = job_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(job, f, indent=2)
+    os.replace(tmp_file, job_file)
+    session.index_session(job["session_id"])
+
+
+def list_jobs():
+    """All jobs, oldest first."""
+    if not session.JOBS_DIR.exists():
+        return []
+    jobs = []
+    for job_file in session.JOBS_DIR.glob("*.json"):
+        job = load(job_file.stem)
+        if job:
+            jobs.append(job)
+    return sorted(jobs, key=lambda job: job["queued_at"])
+
+
+def enqueue(session_id):
+    """Queue (or re-queue) an AI summary for the session. Returns the job."""
+    job = {
+        "session_id": session_id,
+        "state": "queued",
+        "attempts": 0,
+        "error": None,
+        "queued_at": datetime.now().isoformat(),
+        "next_attempt": time.time(),
+    }
+    _save(job)
+    return job
+
+
+def remove(session_id):
+    """Delete the session's job, if any (it is done, or the session is gone)."""
+    try:
+        _job_file(session_id).unlink()
+    except FileNotFoundError:
+        return
+    session.index_session(session_id)
+
+
+def _lock():
+    """Take the worker lock. Returns the open lock file, or None if another worker has it."""
+    session.JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    lock_file = open(WORKER_LOCK, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def is_worker_running():
+    """True if a worker holds the lock."""
+    lock_file = _lock()
+    if lock_file is None:
+        return True
+    lock_file.close()
+    return False
+
+
+def start_worker():
+    """Start a detached worker unless one is running. Returns True if one was started."""
+    if is_worker_running():
+        return False
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_FILE, "a") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "fixtrace.cli", "worker"],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            start_new_session=True,
+        )
+    return True
+
+
+def resume():
+    """Start a worker if jobs are waiting and none is running (e.g. after a reboot)."""
+    if any(job["state"] == "queued" for job in list_jobs()):
+        start_worker()
+
+
+def _run(job):
+    """Run one attempt of a job, then delete it or schedule its retry."""
+    session_id = job["session_id"]
+    session_dir = session.get_session_dir(session_id)
+    if not session_dir.is_dir():
+        remove(session_id)
+        return
+
+    job.update(state="running", pid=os.getpid())
+    _save(job)
+
+    timer = stats.Timer()
+    try:
+        md_file, error = bulk.summarize_session(session_id, retries=API_RETRIES, timer=timer)
+    except Exception as e:
+        md_file, error = None, str(e)
+    stats.record(session_dir, "generate", timer)
+
+    if md_file:
+        remove(session_id)
+        print(f"{datetime.now().isoformat()} {session_id}: done", flush=True)
+        return
+
+    job["attempts"] += 1
+    job["error"] = error
+    job.pop("pid", None)
+    if job["attempts"] >= MAX_ATTEMPTS:
+        job["state"] = "failed"
+    else:
+        job["state"] = "queued"
+        job["next_attempt"] = time.time() + RETRY_DELAY * 2 ** (job["attempts"] - 1)
+    _save(job)
+    print(f"{datetime.now().isoformat()} {session_id}: attempt {job['attempts']} failed: {error}", flush=True)
+
+
+def _drain():
+    """Run queued jobs until none are left, sleeping through retry delays."""
+    # We hold the lock, so "running" jobs were left by a worker that died
+    for job in list_jobs():
+        if job["state"] == "running":
+            job["state"] = "queued"
+            job.pop("pid", None)
+            _save(job)
+
+    while True:
+        queued = [job for job in list_jobs() if job["state"] == "queued"]
+        if not queued:
+            return
+        now = time.time()
+        due = [job for job in queued if job["next_attempt"] <= now]
+        if due:
+            _run(due[0])
+        else:
+            wait = min(job["next_attempt"] for job in queued) - now
+            time.sleep(min(wait, POLL_INTERVAL))
+
+
+def run_worker():
+    """Work through the queue in this process. Returns False if another worker is running."""
+    while True:
+        lock_file = _lock()
+        if lock_file is None:
+            return False
+        try:
+            _drain()
+        finally:
+            lock_file.close()
+        # A job queued while we were exiting found the lock still held and
+        # started no worker of its own
+        if not any(job["state"] == "queued" for job in list_jobs()):
+            return True
@@ -1,6 +1,6 @@
 """Markdown generator: templates to produce doc-ready output from events."""
 
-import json
+from . import session, search, recall
 
 def generate_markdown(session_id, session_dir, metadata, ai_summary=None):
     """Generate markdown documentation from captured session.
@@ -12,19 +12,35 @@ def generate_markdown(session_id, session_dir, metadata, ai_summary=None):
         ai_summary: Optional AI-generated summary text to include
     """
     
-    jsonl_file = session_dir / "events.jsonl"
     markdown_file = session_dir / "summary.md"
     
-    # Parse events
-    events = []
+    # Write markdown
+    with open(markdown_file, 'w') as f:
+        f.write(render_markdown(session_id, metadata, ai_summary))
+    
+    # The session is now complete; keep the indexes in sync
+    session.index_session(session_id)
+    try:
+        search.index_session_text(session_id)
+    except Exception:
+        pass  # Search is best-effort; `fixtrace reindex` catches up later
     try:
-        with open(jsonl_file, 'r') as f:
-            for line in f:
-                if line.strip():
-                    events.append(json.loads(line))
-    except FileNotFoundError:
-        events = []
+        recall.index_session(session_id)
+    except Exception:
+        pass  # So is recall, with its own index; `fixtrace reindex` catches it up too
+    
+    return markdown_file
+
+def write_partial_markdown(session_id, session_dir, metadata, ai_summary):
+    """Write summary.md with the AI summary received so far (while it streams in).
     
+    generate_markdown writes the finished file and updates the indexes.
+    """
+    with open(session_dir / "summary.md", 'w') as f:
+        f.write(render_markdown(session_id, metadata, ai_summary, in_progress=True))
+
+def render_markdown(session_id, metadata, ai_summary=None, in_progress=False):
+    """Build the summary.md text."""
     # Build markdown
     md_lines = []
     md_lines.append(f"# Troubleshooting Session: {metadata.get('name', session_id)}")
@@ -44,11 +60,10 @@ def generate_markdown(session_id, session_dir, metadata, ai_summary=None):
     # Footer
     md_lines.append("---")
     md_lines.append("")
-    md_lines.append("*Generated by FixTrace*")
+    if in_progress:
+        md_lines.append("*Generating AI summary…*")
+    else:
+        md_lines.append("*Generated by FixTrace*")
     md_lines.append("")
     
-    # Write markdown
-    with open(markdown_file, 'w') as f:
-        f.write('\n'.join(md_lines))
-    
-    return markdown_file
+    return '\n'.join(md_lines)
@@ -1,177 +1,763 @@
 """Parser: strip ANSI codes, group commands/outputs, emit JSONL events."""
 
+import os
 import re
 import json
+from bisect import bisect_right
 from pathlib import Path
 from datetime import datetime
 
+from .capture import TIMING_HEADER
+from .redact import redact
+from .session import read_last_lines, get_recent_log_content
+
+
+# Precompiled patterns shared by every clean_text call.
+# OSC sequences (Operating System Commands, e.g. window titles)
+OSC_ESCAPE_RE = re.compile(r'\x1B\].*?(?:\x07|\x1B\\)')
+# Standard ANSI escape sequences (colors, modes, ...), except cursor
+# left/right/column moves and erase-line (final byte C, D, G or K), which
+# are left for the line renderer
+ANSI_ESCAPE_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@ABE-FH-JL-~])')
+
+NOISE_PATTERNS = (
+    "Asking AI...",
+    "Analyzing last",
+    "Using active session:",
+    "Using latest session:",
+    "Pulling from",
+    "Pull complete",
+    "Extracting",
+    "Downloading",
+    "Waiting",
+    "Verifying Checksum",
+    "Download complete",
+)
+# Common spinner characters (Braille patterns)
+SPINNER_CHARS = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+
+# A line is noise if it contains any noise pattern or any spinner character.
+# The literals and the spinner set are kept in separate patterns: mixing the
+# non-ASCII character class into the alternation defeats the regex engine's
+# literal-prefix scan and makes every search several times slower.
+NOISE_RE = re.compile("|".join(re.escape(p) for p in NOISE_PATTERNS))
+SPINNER_RE = re.compile("[" + SPINNER_CHARS + "]")
+
+# OSC 133 shell-integration markers (emitted by `fixtrace hook bash|zsh`):
+# A = prompt starts, B = prompt ends (the command is typed next),
+# C = the command runs (output follows), D;<status> = it finished.
+MARKER_PREFIX = '\x1b]133;'
+MARKER_PREFIX_BYTES = MARKER_PREFIX.encode()
+MARKER_RE = re.compile(r'\x1b\]133;([ABCD])((?:;[^\x07\x1b]*)?)(?:\x07|\x1b\\)')
+
+
+# Line endings: \r\n (and stray \r\r\n) are plain newlines; any other \r
+# is a carriage return that lets the line be overwritten
+CRLF_RE = re.compile(r'\r+\n')
+
+# What the virtual line buffer has to act on once the other escape
+# sequences are gone: carriage return, backspace, and cursor/erase-line
+# sequences. A plain character class keeps the scan fast.
+RENDER_RE = re.compile(r'[\r\x08\x1B]')
+
+# Tokens of a line being rendered: a run of printable text, or a control
+# character / escape sequence (with its CSI parameters and final byte)
+TERM_TOKEN_RE = re.compile(r'([^\r\x08\x1B]+)|(\r|\x08|\x1B(?:\[([0-?]*)[ -/]*([@-~])|[@-Z\\-_])?)')
+
+
+def _render_line(line):
+    """Return what a terminal would show after printing line (no newlines).
+    
+    Text overwrites what is under the cursor; \r, backspace and cursor
+    left/right/column moves reposition it; erase-line clears. Other escape
+    sequences (colours, ...) are dropped.
+    """
+    # Fast path: carriage returns only (progress bars, spinners)
+    if '\x08' not in line and '\x1b' not in line:
+        shown = ''
+        for frame in line.split('\r'):
+            shown = frame + shown[len(frame):]
+        return shown
+    
+    shown = ''
+    col = 0
+    for text, control, params, final in TERM_TOKEN_RE.findall(line):
+        if text:
+            if col > len(shown):
+                shown += ' ' * (col - len(shown))
+            shown = shown[:col] + text + shown[col + len(text):]
+            col += len(text)
+        elif control == '\r':
+            col = 0
+        elif control == '\x08':
+            col = max(0, col - 1)
+        elif final:
+            n = int(params) if params.isdigit() else 0
+            if final == 'K':
+                if n == 0:
+                    shown = shown[:col]
+                elif n == 1:
+                    shown = ' ' * min(col + 1, len(shown)) + shown[col + 1:]
+                elif n == 2:
+                    shown = ''
+            elif final == 'C':
+                col += max(n, 1)
+            elif final == 'D':
+                col = max(0, col - max(n, 1))
+            elif final == 'G':
+                col = max(n, 1) - 1
+    return shown
+
+
+def _render_lines(text):
+    """Apply the virtual line buffer to the lines that need it.
+    
+    A line never affects another one, and lines without anything to render
+    are copied through untouched.
+    """
+    pieces = []
+    pos = 0
+    match = RENDER_RE.search(text)
+    while match:
+        line_start = text.rfind('\n', 0, match.start()) + 1
+        line_end = text.find('\n', match.start())
+        if line_end == -1:
+            line_end = len(text)
+        pieces.append(text[pos:line_start])
+        pieces.append(_render_line(text[line_start:line_end]))
+        pos = line_end
+        match = RENDER_RE.search(text, line_end)
+    pieces.append(text[pos:])
+    return "".join(pieces)
+
 
 def clean_text(text):
-    """Remove ANSI escape codes, handle backspaces, and filter noise.
+    """Remove ANSI escape codes, render overwritten lines, and filter noise.
     
-    Refactored to be safer:
     - ANSI/OSC: Stripped.
-    - Backspaces: Handled.
-    - Carriage Returns (\r): Removed (not resolved) to avoid accidental text loss.
+    - Carriage returns, backspaces, cursor moves and erase-line: Rendered the
+      way a terminal would, so a progress bar leaves only its final frame.
+      (Cursor up/down is not followed: lines never affect each other, which
+      keeps cleaning streamable line by line.)
     - Noise: Aggressively filtered by pattern.
+    - Secrets (API keys, tokens, passwords): Masked, see redact.py.
+    
+    All patterns are compiled once at import time, and each stage is skipped
+    when the text contains nothing for it to do.
     """
-    # 1. Strip OSC sequences (Operating System Commands)
-    osc_escape = re.compile(r'\x1B\].*?(?:\x07|\x1B\\)')
-    text = osc_escape.sub('', text)
+    # 1. Strip OSC sequences (window titles, shell markers). Their
+    # terminators (BEL, ESC \\) would otherwise confuse the later stages.
+    if '\x1b]' in text:
+        text = OSC_ESCAPE_RE.sub('', text)
+
+    # 2. Normalise line endings
+    if '\r' in text:
+        text = text.replace('\r\n', '\n')
+        if '\r\n' in text:
+            text = CRLF_RE.sub('\n', text)
+
+    # 3. Strip ANSI escape sequences (colours, modes, ...), keeping the
+    # ones the renderer needs
+    if '\x1b' in text:
+        text = ANSI_ESCAPE_RE.sub('', text)
+
+    # 4. Render lines with \r, backspaces or cursor/erase sequences through
+    # the virtual line buffer
+    if '\r' in text or '\x08' in text or '\x1b' in text:
+        text = _render_lines(text)
+
+    # 5. Filter noise lines
+    noise_search = NOISE_RE.search
+    spinner_search = SPINNER_RE.search
+    text = "\n".join([
+        line for line in map(str.strip, text.split('\n'))
+        if line and not noise_search(line) and not spinner_search(line)
+    ])
+
+    # 6. Mask secrets, so they never reach events.jsonl or the model
+    return redact(text)
+
+
+# Regex to detect prompts at the start of a line
+# Matches:
+# - standard: user@host:path$ 
+# - zsh: path % 
+# - simple: $ 
+# It looks for a sequence ending in $, #, or % followed by whitespace
+# We use a non-greedy match for the prefix to avoid capturing too much
+PROMPT_RE = re.compile(r'^.*?(?:[\w\.~/@:-]+)\s*[\$#%]\s+(.*)$')
 
-    # 2. Strip standard ANSI escape sequences
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    text = ansi_escape.sub('', text)
+# Fallback for just a symbol prompt
+SIMPLE_PROMPT_RE = re.compile(r'^[\$#%]\s+(.*)$')
+
+# Approximate number of characters read (and cleaned) per streaming step.
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_raw_chunks(raw_file, chunk_size=READ_CHUNK_SIZE):
+    """Yield the raw file as text chunks that always end on a line boundary.
     
-    # 3. Handle backspaces
-    chars = []
-    for c in text:
-        if c == '\x08':
-            if chars and chars[-1] != '\n':
-                chars.pop()
-        else:
-            chars.append(c)
-    text = "".join(chars)
-
-    # 4. Filter Noise Lines
-    # We simply split by newline and filter. We do NOT attempt to resolve \r overwrites
-    # because it risks deleting valid commands if line-endings are messy.
-    # Instead, we rely on the noise_patterns to catch the junk.
-    lines = text.split('\n')
-    resolved_lines = []
-    
-    noise_patterns = [
-        "Asking AI...",
-        "Analyzing last",
-        "Using active session:",
-        "Using latest session:",
-        "Pulling from",
-        "Pull complete",
-        "Extracting",
-        "Downloading",
-        "Waiting",
-        "Verifying Checksum",
-        "Download complete"
-    ]
-    # Common spinner characters (Braille patterns)
-    spinner_chars = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+    clean_text never looks across a newline, so cleaning chunk by chunk gives
+    the same lines as cleaning the whole file at once. Only \n ends a line:
+    a bare \r is an overwrite that clean_text renders, so newline translation
+    is off.
+    """
+    for _, data in _iter_raw_blocks(raw_file, chunk_size):
+        yield data.decode('utf-8', errors='ignore')
+
 
+def _iter_raw_blocks(raw_file, chunk_size=READ_CHUNK_SIZE):
+    """Yield (offset, bytes) blocks of the raw file that end on a line boundary.
+    
+    A \n byte never occurs inside a multi-byte UTF-8 character, so each block
+    decodes on its own.
+    """
+    offset = 0
+    with open(raw_file, 'rb') as f:
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            data = b"".join(lines)
+            yield offset, data
+            offset += len(data)
+
+
+def iter_clean_lines(chunks):
+    """Clean each chunk and yield its non-empty lines."""
+    for chunk in chunks:
+        cleaned = clean_text(chunk)
+        if cleaned:
+            yield from cleaned.split('\n')
+
+
+def match_prompt(line):
+    """Return the command typed after a shell prompt, or None if not a prompt line."""
+    match = PROMPT_RE.match(line) or SIMPLE_PROMPT_RE.match(line)
+    if not match:
+        return None
+    # The regex capture group (1) contains the command text after the prompt.
+    # If the command is empty, it might be just a hit enter
+    return match.group(1).strip() or " "
+
+
+def iter_tokens(lines):
+    """Turn clean lines into ("command", text, None) and ("output", line, None) tokens.
+    
+    The third item is the time the line was recorded, which plain lines
+    don't carry (see iter_timed_tokens). Output seen before the first
+    command is probably pre-session noise or a header, so it is dropped.
+    """
+    seen_command = False
     for line in lines:
-        # Simple cleanup
-        line = line.replace('\r', '').strip()
-        
-        if not line:
-            continue
-
-        # Check for noise
-        is_noise = False
-        if any(pattern in line for pattern in noise_patterns):
-            is_noise = True
-        elif any(c in line for c in spinner_chars):
-            is_noise = True
+        command = match_prompt(line)
+        if command is not None:
+            seen_command = True
+            yield ("command", command, None)
+        elif seen_command:
+            yield ("output", line, None)
+
+
+def iter_timed_tokens(raw_file, timeline, markers=False, offset=0, seen_command=False):
+    """Like iter_tokens over the cleaned raw file, with each token's recorded time.
+    
+    With markers set, command boundaries come from OSC 133 markers (see
+    MarkerTokenizer) instead of prompt detection from the first marker on,
+    and "exit" tokens are produced as well. This is what the live parser
+    does too, so both give the same events.
+    
+    offset and seen_command let a caller pick up the file partway through.
+    """
+    tokenizer = None
+    for start, end, text in iter_new_lines(raw_file, offset, final=True):
+        timeline.release(start)
+        if markers and tokenizer is None and MARKER_PREFIX in text:
+            tokenizer = MarkerTokenizer(timeline)
+        if tokenizer is not None:
+            tokens = tokenizer.feed(text, start)
+        else:
+            tokens = _line_tokens(text, start, end, timeline)
+        for token in tokens:
+            if token[0] == "command":
+                seen_command = True
+            if seen_command:
+                yield token
+
+
+def _line_tokens(text, start, end, timeline):
+    """Tokens for one raw line (bytes start..end), using prompt detection."""
+    line = clean_text(text)
+    if not line:
+        return []
+    command = match_prompt(line)
+    if command is not None:
+        # The command ran when Enter was pressed, at the end of its line
+        return [("command", command, timeline.timestamp(end - 1))]
+    return [("output", line, timeline.timestamp(start))]
+
+
+def iter_untimed_tokens(raw_file):
+    """Tokens for a raw file without timing, deciding on markers while streaming.
+    
+    Chunks are cleaned whole and split by prompt detection (iter_tokens)
+    until one contains an OSC 133 marker. From the line with that first
+    marker on, iter_timed_tokens takes over, so the file is read only once.
+    """
+    handoff = []   # offset of the line with the first marker
+    
+    def chunks():
+        for offset, data in _iter_raw_blocks(raw_file):
+            marker = data.find(MARKER_PREFIX_BYTES)
+            if marker != -1:
+                line_start = data.rfind(b'\n', 0, marker) + 1
+                handoff.append(offset + line_start)
+                data = data[:line_start]
+            yield data.decode('utf-8', errors='ignore')
+            if handoff:
+                return
+    
+    seen_command = False
+    for token in iter_tokens(iter_clean_lines(chunks())):
+        # iter_tokens yields nothing before the first command
+        seen_command = True
+        yield token
+    if handoff:
+        yield from iter_timed_tokens(raw_file, Timeline(None), markers=True,
+                                     offset=handoff[0], seen_command=seen_command)
+
+
+class MarkerTokenizer:
+    """Turn raw lines carrying OSC 133 markers into tokens with exact boundaries.
+    
+    The text between B and C is the command as typed, the text between C
+    and D is its output, and D carries its exit status, which becomes an
+    ("exit", status, timestamp) token. Feed raw lines in order; each call
+    returns the tokens that line completes.
+    """
+    
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self.state = None       # "prompt", "input" or "output"
+        self.typed = []         # raw text since the prompt started or ended
+        self.input_offset = 0   # offset of the line the current command was typed on
+    
+    def feed(self, text, start):
+        """Tokens completed by the raw line text, which starts at byte offset start."""
+        tokens = []
+        pos = 0
+        for match in MARKER_RE.finditer(text):
+            self._text(text[pos:match.start()], start, tokens)
+            pos = match.end()
+            offset = start + len(text[:match.start()].encode('utf-8'))
+            self._marker(match.group(1), match.group(2), start, offset, tokens)
+        self._text(text[pos:], start, tokens)
+        return tokens
+    
+    def _text(self, text, start, tokens):
+        if not text:
+            return
+        if self.state in ("prompt", "input"):
+            self.typed.append(text)
+        elif self.state == "output":
+            line = clean_text(text)
+            if line:
+                tokens.extend(("output", part, self.timeline.timestamp(start)) for part in line.split('\n'))
+    
+    def _marker(self, kind, params, line_start, offset, tokens):
+        if kind == "A":
+            self.state = "prompt"
+            self.typed = []
+            self.input_offset = line_start
+        elif kind == "B":
+            # Readline redraws the prompt (B included) when the line is
+            # edited, so only the text after the last B is the command
+            self.state = "input"
+            self.typed = []
+            self.input_offset = line_start
+        elif kind == "C":
+            typed = clean_text("".join(self.typed))
+            if self.state == "prompt":
+                # No B marker (a theme rebuilt the prompt): find the command
+                # after the prompt the old way
+                typed = match_prompt(typed.split('\n')[-1]) or typed
+            if typed.strip():
+                tokens.append(("command", typed.strip(), self.timeline.timestamp(offset)))
+            self.state = "output"
+            self.typed = []
+        elif kind == "D":
+            if self.state == "output":
+                try:
+                    status = int(params.lstrip(';').split(';')[0])
+                except ValueError:
+                    status = None
+                tokens.append(("exit", status, self.timeline.timestamp(offset)))
+            self.state = None
+
+
+class Timeline:
+    """Map byte offsets in raw.txt to the wall-clock time they were recorded.
+    
+    Reads the timing sidecar written by the pty capture engine (see
+    capture.TIMING_HEADER), picking up new entries as it grows during a live
+    session. Offsets it has no timing for map to None.
+    
+    Lookups move forward through the file, so callers release() the chunks
+    they are done with and memory stays bounded however long the session
+    (the pty engine writes a chunk per echoed keystroke).
+    """
+    
+    # Released entries are dropped from the lists once there are this many
+    COMPACT_AFTER = 1024
+    
+    def __init__(self, timing_file):
+        self.timing_file = timing_file
+        self.start = None   # wall-clock time (epoch seconds) of the clock's zero
+        self.ends = []      # raw.txt offset where each chunk ends
+        self.times = []     # seconds since start when each chunk was recorded
+        self.base = 0       # entries before this index are released
+        self.offset = 0     # raw.txt offset where the last chunk read ends
+        self.elapsed = 0.0  # seconds since start of the last chunk read
+        self.position = 0   # bytes of timing_file read so far
+    
+    def _load(self):
+        """Read any complete entries appended to the timing file since the last call."""
+        if self.timing_file is None:
+            return
+        try:
+            with open(self.timing_file, 'rb') as f:
+                f.seek(self.position)
+                data = f.read()
+        except FileNotFoundError:
+            return
         
-        if not is_noise:
-            resolved_lines.append(line)
+        # Leave a half-written last line for next time
+        data = data[:data.rfind(b'\n') + 1]
+        self.position += len(data)
+        for line in data.decode('ascii', errors='ignore').splitlines():
+            if line.startswith(TIMING_HEADER):
+                self.start = float(line[len(TIMING_HEADER):])
+                continue
+            try:
+                delay, size = line.split()
+                self.elapsed += float(delay)
+                self.offset += int(size)
+            except ValueError:
+                continue
+            self.ends.append(self.offset)
+            self.times.append(self.elapsed)
+    
+    def release(self, offset):
+        """Forget the chunks that end at or before offset; later lookups must be at or after it."""
+        self.base = bisect_right(self.ends, offset, self.base)
+        if self.base >= self.COMPACT_AFTER:
+            del self.ends[:self.base]
+            del self.times[:self.base]
+            self.base = 0
+    
+    def timestamp(self, offset):
+        """ISO timestamp for the raw byte at offset, or None if it isn't timed."""
+        if offset >= self.offset:
+            self._load()
+        i = bisect_right(self.ends, offset, self.base)
+        if self.start is None or i >= len(self.ends):
+            return None
+        return datetime.fromtimestamp(self.start + self.times[i]).isoformat()
+
+
+def write_events(tokens, f):
+    """Group tokens into command/output events and write them to f as JSONL.
     
-    return "\n".join(resolved_lines)
+    Each output line is encoded and written as soon as it arrives, so even a
+    single huge command output is never held in memory. The bytes match
+    ``json.dumps`` of the complete event.
+    
+    Returns:
+        int: Number of events written.
+    """
+    count = 0
+    in_output = False
+    for kind, text, timestamp in tokens:
+        # Untimed tokens (no timing sidecar) are stamped with the parse time
+        if kind == "exit":
+            if in_output:
+                f.write('"}\n')
+                in_output = False
+            f.write(json.dumps({
+                "type": "exit",
+                "timestamp": timestamp or datetime.now().isoformat(),
+                "exit_code": text,
+            }) + '\n')
+            count += 1
+        elif kind == "command":
+            if in_output:
+                f.write('"}\n')
+                in_output = False
+            f.write(json.dumps({
+                "type": "command",
+                "timestamp": timestamp or datetime.now().isoformat(),
+                "command": text,
+            }) + '\n')
+            count += 1
+        elif in_output:
+            # "\n" between lines, JSON-escaped, then the line without its quotes
+            f.write('\\n' + json.dumps(text)[1:-1])
+        else:
+            timestamp = json.dumps(timestamp or datetime.now().isoformat())
+            f.write(f'{{"type": "output", "timestamp": {timestamp}, "content": "')
+            f.write(json.dumps(text)[1:-1])
+            in_output = True
+            count += 1
+    if in_output:
+        f.write('"}\n')
+    return count
 
 
-def parse_raw_to_jsonl(raw_file, jsonl_file):
+def parse_raw_to_jsonl(raw_file, jsonl_file, timing_file=None):
     """Parse raw script output to JSONL events.
     
     Handles:
     - zsh (%) and bash ($/#) prompts
     - ANSI color stripping
-    - Backspace correction
+    - Carriage returns, backspaces and cursor moves (rendered per line)
     - Command/Output grouping
-    """
     
-    with open(raw_file, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
+    The file is streamed through read → clean → detect prompts → group →
+    write, so peak memory does not grow with the size of the session.
     
-    # Clean the raw content
-    content = clean_text(content)
+    With a timing sidecar (pty capture engine), events are stamped with the
+    time they were recorded instead of the time of parsing. With shell
+    integration markers (`fixtrace hook`), commands are split exactly at the
+    markers and exit events are added.
     
-    lines = content.split('\n')
+    Returns:
+        int: Number of events written.
+    """
+    if timing_file is not None and Path(timing_file).exists():
+        tokens = iter_timed_tokens(raw_file, Timeline(timing_file), markers=True)
+    else:
+        tokens = iter_untimed_tokens(raw_file)
+    with open(jsonl_file, 'w') as f:
+        return write_events(tokens, f)
+
+
+def read_checkpoint(checkpoint_file):
+    """Read a live-parse checkpoint. Returns a dict or None if there is none."""
+    try:
+        with open(checkpoint_file, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_checkpoint(checkpoint_file, offset, events, done=False, events_bytes=None):
+    """Atomically replace the checkpoint so readers never see a partial file."""
+    tmp_file = Path(str(checkpoint_file) + ".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump({"offset": offset, "events": events, "done": done, "events_bytes": events_bytes}, f)
+    os.replace(tmp_file, checkpoint_file)
+
+
+def iter_new_lines(raw_file, offset, final):
+    """Yield (start_offset, end_offset, text) for each complete line after offset.
     
-    events = []
-    current_command = None
-    current_output = []
+    Lines end at \n only (see iter_raw_chunks). An unterminated last line is
+    left for the next call, unless final is set because the session is over.
+    """
+    try:
+        f = open(raw_file, 'rb')
+    except FileNotFoundError:
+        return
+
+    with f:
+        f.seek(offset)
+        carry = b''
+        while True:
+            data = f.read(READ_CHUNK_SIZE)
+            if not data and not (final and carry):
+                break
+            pieces = (carry + data).split(b'\n')
+            # The piece after the last \n is unterminated
+            carry = pieces.pop()
+            pieces = [piece + b'\n' for piece in pieces]
+            if not data:
+                if carry:
+                    pieces.append(carry)
+                carry = b''
+            for piece in pieces:
+                yield offset, offset + len(piece), piece.decode('utf-8', errors='ignore')
+                offset += len(piece)
+            if not data:
+                break
+
+
+def follow_raw_file(raw_file, jsonl_file, checkpoint_file, stop_event, interval=0.5, timing_file=None, on_tokens=None):
+    """Parse raw_file incrementally while the session is being recorded.
     
-    # Regex to detect prompts at the start of a line
-    # Matches:
-    # - standard: user@host:path$ 
-    # - zsh: path % 
-    # - simple: $ 
-    # It looks for a sequence ending in $, #, or % followed by whitespace
-    # We use a non-greedy match for the prefix to avoid capturing too much
-    prompt_re = re.compile(r'^.*?(?:[\w\.~/@:-]+)\s*[\$#%]\s+(.*)$')
+    New bytes are cleaned line by line as they arrive. A command block is
+    appended to jsonl_file once it is complete (the next prompt has been
+    seen). The checkpoint records how many events jsonl_file holds and the
+    byte offset where the still-open block starts, so readers can combine
+    the parsed events with the few raw bytes after it, and the size of
+    those events in jsonl_file, so they can be read from the end.
     
-    # Fallback for just a symbol prompt
-    simple_prompt_re = re.compile(r'^[\$#%]\s+(.*)$')
+    Runs until stop_event is set, then parses whatever is left and flushes
+    the last block, so finishing a session only touches the tail of the log.
+    Events are stamped from timing_file when there is one (see Timeline).
+    on_tokens, if given, is called with the tokens parsed in each poll,
+    including those of the still-open block, once the finished blocks are
+    written and checkpointed (see prefetch.py).
+    
+    Returns:
+        int: Number of events written.
+    """
+    read_offset = 0        # bytes of raw_file consumed so far
+    block_offset = 0       # where the pending (unwritten) block starts
+    pending = []           # tokens of the pending block
+    event_count = 0
+    checkpoint = None
+    timeline = Timeline(timing_file)
+    markers = None         # MarkerTokenizer once OSC 133 markers are seen
+    seen_command = False   # output before the first command is dropped
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Check for prompt
-        match = prompt_re.match(line) or simple_prompt_re.match(line)
-        
-        if match:
-            # We found a new command line
-            
-            # 1. Save the PREVIOUS command/output pair
-            if current_command:
-                events.append({
-                    "type": "command",
-                    "timestamp": datetime.now().isoformat(),
-                    "command": current_command,
-                })
-                # Only add output if there is something substantial
-                if current_output:
-                    events.append({
-                        "type": "output",
-                        "timestamp": datetime.now().isoformat(),
-                        "content": "\n".join(current_output).strip(),
-                    })
-                current_output = []
-            
-            # 2. Start the NEW command
-            # The regex capture group (1) contains the command text after the prompt
-            cmd_text = match.group(1).strip()
-            
-            # If the command is empty, it might be just a hit enter
-            current_command = cmd_text if cmd_text else " " 
-            
-        else:
-            # This line does not look like a prompt, assume it's output
-            # (Only if we have seen a command already, or just capture everything)
-            if current_command is not None:
-                current_output.append(line)
-            # If we haven't seen a command yet, it's probably pre-session noise or header
-            # We can ignore it or add it to a "header" event if we wanted.
-    
-    # Save the LAST command/output pair
-    if current_command:
-        events.append({
-            "type": "command",
-            "timestamp": datetime.now().isoformat(),
-            "command": current_command,
-        })
-        if current_output:
-            events.append({
-                "type": "output",
-                "timestamp": datetime.now().isoformat(),
-                "content": "\n".join(current_output).strip(),
-            })
-    
-    # Write JSONL
-    with open(jsonl_file, 'w') as f:
-        for event in events:
-            f.write(json.dumps(event) + '\n')
+    with open(jsonl_file, 'w') as out:
+        while True:
+            final = stop_event.wait(interval)
+
+            ready = []
+            new_tokens = []
+            for line_offset, end_offset, text in iter_new_lines(raw_file, read_offset, final):
+                read_offset = end_offset
+                timeline.release(line_offset)
+                # Switch to exact, marker-driven parsing once the shell
+                # hook shows up
+                if markers is None and MARKER_PREFIX in text:
+                    markers = MarkerTokenizer(timeline)
+                if markers is not None:
+                    tokens = markers.feed(text, line_offset)
+                else:
+                    tokens = _line_tokens(text, line_offset, end_offset, timeline)
+                if on_tokens:
+                    tokens = list(tokens)
+                    new_tokens.extend(tokens)
+                
+                for token in tokens:
+                    if token[0] == "command":
+                        seen_command = True
+                        ready.extend(pending)
+                        pending = [token]
+                        block_offset = markers.input_offset if markers else line_offset
+                    elif seen_command:
+                        # Output after an exit (a command run with nothing
+                        # typed) starts a block of its own
+                        if not pending:
+                            block_offset = line_offset
+                        pending.append(token)
+                        if token[0] == "exit":
+                            # The command has finished; no need to wait for the next one
+                            ready.extend(pending)
+                            pending = []
+
+            if final:
+                ready.extend(pending)
+                pending = []
+            if not pending:
+                block_offset = read_offset
+            if ready:
+                event_count += write_events(ready, out)
+                out.flush()
+
+            if checkpoint != (block_offset, event_count, final, out.tell()):
+                checkpoint = (block_offset, event_count, final, out.tell())
+                _write_checkpoint(checkpoint_file, *checkpoint)
+            if new_tokens and not final:
+                on_tokens(new_tokens)
+            if final:
+                return event_count
+
+
+def read_parsed_log(jsonl_file, checkpoint_file, raw_file, lines=None):
+    """Read a session log from already-parsed events plus the unparsed tail.
     
-    return events
+    Returns the readable log (see build_session_log) followed by the cleaned
+    raw text after the checkpoint, or None when the session has no
+    checkpoint (it was not parsed live). With lines, only the last lines of
+    the log are returned, and both files are read backwards from their ends
+    (see session.read_last_lines), so the cost depends on lines rather than
+    on the length of the session.
+    """
+    checkpoint = read_checkpoint(checkpoint_file)
+    if checkpoint is None:
+        return None
+    # Checkpoints written before events_bytes existed are read from the start
+    if lines and checkpoint.get("events_bytes") is not None:
+        return _read_parsed_tail(jsonl_file, checkpoint, raw_file, lines)
+
+    # Only read the events the checkpoint vouches for; a newer block may be
+    # half-written at the end of the file.
+    events = []
+    with open(jsonl_file, 'r') as f:
+        for line in f:
+            if len(events) >= checkpoint["events"]:
+                break
+            events.append(json.loads(line))
+
+    tail = ""
+    try:
+        with open(raw_file, 'rb') as f:
+            f.seek(checkpoint["offset"])
+            tail = clean_text(f.read().decode('utf-8', errors='ignore'))
+    except FileNotFoundError:
+        pass
+
+    log_text = "\n".join(part for part in (build_session_log(events), tail) if part)
+    return "\n".join(log_text.split("\n")[-lines:]) if lines else log_text
+
+
+def read_session_log(session_dir, lines=None):
+    """The cleaned log of a session, as `ask` and the daemon read it.
+    
+    Sessions parsed live are read from their events plus the unparsed tail
+    (see read_parsed_log); others from the last lines of raw.txt. Returns
+    "" if there is nothing to read.
+    """
+    log_text = read_parsed_log(
+        session_dir / "events.jsonl",
+        session_dir / "parse_state.json",
+        session_dir / "raw.txt",
+        lines=lines,
+    )
+    if not log_text:
+        log_text = clean_text(get_recent_log_content(session_dir, lines=lines or 0))
+    return log_text
+
+
+def _read_parsed_tail(jsonl_file, checkpoint, raw_file, lines):
+    """The last lines of read_parsed_log, read from the ends of the files."""
+    tail = ""
+    try:
+        tail = clean_text(read_last_lines(raw_file, lines, start=checkpoint["offset"]))
+    except FileNotFoundError:
+        pass
+    wanted = lines - (tail.count("\n") + 1 if tail else 0)
+
+    # Events hold a line each, except exit events (at most one per command)
+    # and multi-line output, so `wanted` events are usually enough; read
+    # more if they aren't
+    log_text = ""
+    count = wanted
+    while count > 0:
+        events = [
+            json.loads(line)
+            for line in read_last_lines(jsonl_file, count, end=checkpoint["events_bytes"]).split("\n")
+            if line
+        ]
+        log_text = build_session_log(events)
+        if len(events) < count or log_text.count("\n") + 1 >= wanted:
+            break
+        count *= 2
+
+    log_text = "\n".join(part for part in (log_text, tail) if part)
+    return "\n".join(log_text.split("\n")[-lines:])
 
 
 def parse_jsonl(jsonl_file):
@@ -198,4 +784,66 @@ def build_session_log(events):
             content = event.get('content', '')
             if content:
                 log_lines.append(content)
+        elif event.get('type') == 'exit' and event.get('exit_code'):
+            log_lines.append(f"(exit status {event['exit_code']})")
     return '\n'.join(log_lines)
+
+
+def split_session_log(log_text, max_chars):
+    """Split a session log (see build_session_log) into windows of at most max_chars.
+    
+    Windows break on command boundaries (lines starting with "$ "), so each
+    command stays with its output. A single block longer than max_chars is cut
+    between lines (or mid-line for a single huge line) as a last resort.
+    """
+    # Group lines into command blocks
+    blocks = []
+    for line in log_text.split('\n'):
+        if line.startswith("$ ") or not blocks:
+            blocks.append([line])
+        else:
+            blocks[-1].append(line)
+    
+    windows = []
+    current = []
+    size = 0
+    for block in blocks:
+        block_text = '\n'.join(block)
+        pieces = [block_text]
+        if len(block_text) > max_chars:
+            pieces = _split_oversized(block, max_chars)
+        for piece in pieces:
+            if current and size + len(piece) + 1 > max_chars:
+                windows.append('\n'.join(current))
+                current = []
+                size = 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        windows.append('\n'.join(current))
+    return windows
+
+
+def _split_oversized(lines, max_chars):
+    """Cut one oversized block into pieces of at most max_chars."""
+    pieces = []
+    current = []
+    size = 0
+    for line in lines:
+        if len(line) > max_chars:
+            if current:
+                pieces.append('\n'.join(current))
+                current = []
+                size = 0
+            while len(line) > max_chars:
+                pieces.append(line[:max_chars])
+                line = line[max_chars:]
+        if current and size + len(line) + 1 > max_chars:
+            pieces.append('\n'.join(current))
+            current = []
+            size = 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
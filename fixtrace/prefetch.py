@@ -0,0 +1,236 @@
+"""Prefetch: ask the model about a failing command before the user does.
+
+Opt-in (`fixtrace start --prefetch`, or `fixtrace config prefetch on`).
+While a session records, the live parser hands the tokens it parses to a
+Prefetcher as they stream in. Once a command fails (an error line, or a
+non-zero exit code from the shell hook) it waits until its output has been
+quiet for DEBOUNCE_SECONDS, then runs the request `fixtrace ask` would make
+and stores the answer in the session's prefetch.json, keyed by a
+fingerprint of the failing command. If the user has run fixtrace since the
+failure, `ask` is already making that request and nothing is prefetched.
+`ask` on the active session shows a stored answer for the same failure
+instantly (or waits for one still in flight) instead of asking again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from . import session, parser, compress, classify, ai, stats
+
+# Quiet period after a failure before the request is made; another failure
+# within it restarts the wait, so a burst of failures costs one request
+DEBOUNCE_SECONDS = 1.0
+
+# Prefetch requests in flight at once per session. A failure that arrives
+# while the cap is reached is prefetched once a request finishes.
+MAX_IN_FLIGHT = 1
+
+# Context sent, as `fixtrace ask` does by default
+CONTEXT_LINES = 1000
+
+# Output lines (from the end of the failing command) that identify it
+FINGERPRINT_LINES = 20
+
+
+def _prefetch_file(session_dir):
+    return session_dir / "prefetch.json"
+
+
+def _is_fixtrace(command):
+    """Our own commands (`fixtrace ask` prints answers that look like errors)."""
+    return command.split(" ", 1)[0] == "fixtrace"
+
+
+def fingerprint(log_text):
+    """Identify the most recent failing command of a cleaned log, or None if there is none.
+
+    Built from the command and the end of its output, which stay the same
+    whether the log comes from parsed events or from the raw tail.
+    """
+    for block in reversed(compress.split_blocks(log_text)):
+        command = (parser.match_prompt(block[0]) or "").strip()
+        if _is_fixtrace(command) or not any(compress.ERROR_RE.search(line) for line in block[1:]):
+            continue
+        output = [line for line in block[1:] if not line.startswith("(exit status")]
+        key = "\n".join([command] + output[-FINGERPRINT_LINES:])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return None
+
+
+def build_context(session_dir, lines=CONTEXT_LINES):
+    """The cleaned, compressed log `ask` would send for a live session (None if empty).
+
+    Events and raw text are both redacted when they are cleaned, so unlike
+    ask (which may read sessions parsed before redaction) this doesn't
+    redact again.
+    """
+    log_text = parser.read_session_log(session_dir, lines=lines)
+    if not log_text:
+        return None
+    return compress.compress_log(log_text)
+
+
+def _asked_since_failure(log_text):
+    """True if a fixtrace command was run after the most recent failing command."""
+    for block in reversed(compress.split_blocks(log_text)):
+        command = (parser.match_prompt(block[0]) or "").strip()
+        if _is_fixtrace(command):
+            return True
+        if any(compress.ERROR_RE.search(line) for line in block[1:]):
+            return False
+    return False
+
+
+def _save(session_dir, entry):
+    """Write prefetch.json atomically (ask may be reading it)."""
+    prefetch_file = _prefetch_file(session_dir)
+    tmp_file = prefetch_file.with_suffix(".json.tmp")
+    with open(tmp_file, "w") as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp_file, prefetch_file)
+
+
+def load(session_dir):
+    """The session's prefetch entry, or None."""
+    try:
+        with open(_prefetch_file(session_dir), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def get_answer(session_dir, log_text, wait=None):
+    """Return (answer, seconds_since_prefetched) for log_text's most recent failure, or None.
+
+    If the prefetch for that failure is still running, wait for it (up to
+    wait seconds, default the configured FIXTRACE_AI_TIMEOUT).
+    """
+    key = fingerprint(log_text)
+    if key is None:
+        return None
+    if wait is None:
+        wait = ai.get_settings()["timeout"]
+    deadline = time.time() + wait
+    while True:
+        entry = load(session_dir)
+        if not entry or entry.get("fingerprint") != key:
+            return None
+        if entry["state"] == "done":
+            return entry["answer"], time.time() - entry["finished_at"]
+        if entry["state"] != "running" or not _is_alive(entry["pid"]) or time.time() >= deadline:
+            return None
+        time.sleep(0.1)
+
+
+class Prefetcher:
+    """Watches a live session's finished command blocks and prefetches answers for failures."""
+
+    def __init__(self, session_id, session_dir, debounce=DEBOUNCE_SECONDS, max_in_flight=MAX_IN_FLIGHT):
+        self.session_id = session_id
+        self.session_dir = session_dir
+        self.debounce = debounce
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+        self.timer = None
+        self.missed = False     # a failure was skipped because the cap was reached
+        self.closed = False
+        self.command = ""       # command of the block being fed
+        self.failed = False     # whether that command has failed
+
+    def feed(self, tokens):
+        """Look at newly parsed tokens (see parser.follow_raw_file's on_tokens).
+
+        Output of a failed command (re)starts the debounce, so the request
+        is made once the output has settled.
+        """
+        settling = False
+        for kind, text, _ in tokens:
+            if kind == "command":
+                self.command = text
+                self.failed = False
+                continue
+            if _is_fixtrace(self.command):
+                continue
+            if kind == "exit":
+                self.failed = self.failed or bool(text)
+            elif not self.failed:
+                self.failed = bool(compress.ERROR_RE.search(text))
+            settling = settling or self.failed
+        if settling:
+            self._schedule()
+
+    def _schedule(self):
+        """(Re)start the debounce timer."""
+        with self.lock:
+            if self.closed:
+                return
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce, self._fire)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _fire(self):
+        if not self.slots.acquire(blocking=False):
+            self.missed = True
+            return
+        try:
+            self._prefetch()
+        except Exception:
+            pass  # Prefetching is best-effort; ask will just make the request itself
+        finally:
+            self.slots.release()
+        if self.missed:
+            self.missed = False
+            self._schedule()
+
+    def _prefetch(self):
+        """Make the request for the most recent failure, unless it's answered already."""
+        # Only while this is still the active session (see session.ACTIVE_PID_FILE)
+        if session.get_active_session()[0] != self.session_id:
+            return
+        context = build_context(self.session_dir)
+        key = fingerprint(context) if context else None
+        if key is None:
+            return
+        entry = load(self.session_dir)
+        if entry and entry.get("fingerprint") == key:
+            return  # Already prefetched (or being prefetched)
+        if _asked_since_failure(context):
+            return  # ask is making this request itself
+        if classify.classify(context):
+            return  # ask answers this one offline, instantly
+
+        entry = {"fingerprint": key, "state": "running", "pid": os.getpid(), "started_at": time.time()}
+        _save(self.session_dir, entry)
+        timer = stats.Timer()
+        with timer.span("ai_call") as span:
+            prompt, tokens, _ = ai.build_query_prompt(context)
+            span["bytes"] = len(prompt.encode("utf-8"))
+            span["tokens"] = tokens
+            answer = "".join(ai.stream_prompt(prompt))
+        if "⚠️ AI Error" in answer:
+            entry.update(state="failed", error=answer)
+        else:
+            entry.update(state="done", answer=answer)
+        entry["finished_at"] = time.time()
+        _save(self.session_dir, entry)
+        stats.record(self.session_dir, "prefetch", timer)
+
+    def close(self):
+        """Stop scheduling requests (one in flight is left to finish)."""
+        with self.lock:
+            self.closed = True
+            if self.timer is not None:
+                self.timer.cancel()
@@ -0,0 +1,118 @@
+"""Providers: the model backends behind ai.py.
+
+A provider has a `model` name (part of the response cache key) and two
+methods: generate(prompt) returns the response text, and
+generate_stream(prompt) yields it piece by piece. Errors are raised;
+retries, timeouts and concurrency limits are applied by ai.py.
+"""
+
+import json
+import os
+import socket
+
+# Where the local provider finds its server (see fake_server)
+DEFAULT_LOCAL_URL = "http://127.0.0.1:8765"
+
+
+class ProviderError(Exception):
+    """An error response from a model server. code is its HTTP status, if any."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class GeminiProvider:
+    """Google Gemini, through the google-genai SDK."""
+
+    def __init__(self, model, timeout):
+        # The SDK takes longer to import than the rest of the CLI put
+        # together, so it is only imported once a model call is made
+        from google import genai
+
+        api_key = os.environ.get('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set")
+        self.model = model
+        self.client = genai.Client(api_key=api_key, http_options={"timeout": int(timeout * 1000)})
+
+    def generate(self, prompt):
+        return self.client.models.generate_content(model=self.model, contents=prompt).text
+
+    def generate_stream(self, prompt):
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+
+class LocalProvider:
+    """A model server on this machine speaking fake_server's JSON protocol.
+
+    POST /generate {"prompt"} answers {"text"}; POST /stream answers one
+    JSON object per line, {"text"} pieces or a final {"error", "code"}.
+    """
+
+    def __init__(self, url, timeout):
+        self.url = url.rstrip("/")
+        self.model = f"local:{self.url}"
+        self.timeout = timeout
+
+    def _timeout(self):
+        return TimeoutError(f"No response from {self.url} within {self.timeout}s")
+
+    def _post(self, path, prompt):
+        # Imported here, like the Gemini SDK: urllib.request is slow to
+        # import and most commands never call the model
+        import urllib.error
+        import urllib.request
+
+        request = urllib.request.Request(
+            self.url + path,
+            data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ProviderError(f"{e.code} {message}", code=e.code)
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, socket.timeout):
+                raise self._timeout()
+            raise ConnectionError(f"Cannot reach {self.url}: {e.reason}")
+        except socket.timeout:
+            raise self._timeout()
+
+    def generate(self, prompt):
+        with self._post("/generate", prompt) as response:
+            try:
+                return json.loads(response.read())["text"]
+            except socket.timeout:
+                raise self._timeout()
+
+    def generate_stream(self, prompt):
+        with self._post("/stream", prompt) as response:
+            try:
+                for line in response:
+                    message = json.loads(line)
+                    if "error" in message:
+                        raise ProviderError(message["error"], code=message.get("code"))
+                    yield message["text"]
+            except socket.timeout:
+                raise self._timeout()
+
+
+def create(name, model, local_url, timeout):
+    """Create the provider called name: "gemini" or "local".
+
+    Raises:
+        ValueError: For an unknown provider (or a missing API key).
+    """
+    if name == "gemini":
+        return GeminiProvider(model, timeout)
+    if name == "local":
+        return LocalProvider(local_url, timeout)
+    raise ValueError(f"Unknown provider: {name} (expected gemini or local)")
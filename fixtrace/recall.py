@@ -0,0 +1,297 @@
+"""Recall: find past sessions that hit the same error, and the steps that fixed it.
+
+Every summarised session with "Resolution Steps" contributes one document
+per failing command: its error lines, reduced to a MinHash signature. The
+signatures are banded (locality-sensitive hashing) into an index next to
+the search index in index.db, so a lookup reads only the few documents
+that share a band with the query instead of comparing against all of them.
+"""
+
+import random
+import re
+import zlib
+from array import array
+from contextlib import closing
+
+from . import session, parser, compress
+
+# MinHash signature length, split into BANDS bands of ROWS values. Two
+# documents are compared if any band matches, which is likely (>50%) from
+# about (1 / BANDS) ** (1 / ROWS) ≈ 0.5 similarity
+NUM_HASHES = 64
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+# Estimated Jaccard similarity below which a past error isn't shown
+MIN_SIMILARITY = 0.5
+
+# Error lines kept per failing command, and failing commands per session
+MAX_ERROR_LINES = 5
+MAX_DOCS_PER_SESSION = 20
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260117)  # Fixed seed: signatures are stored, so they must not change
+_HASH_PARAMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES)]
+
+WORD_RE = re.compile(r'\w+')
+
+# Section headings of a summary: "Root Cause:" as the prompt asks for, or
+# Markdown ("## 🚀 Resolution Steps") in hand-edited files; "---" starts the footer
+HEADING_RE = re.compile(r'^(?:[A-Z][\w ]*:|#+ .*|---+)$')
+RESOLUTION_RE = re.compile(r'^(?:#+ )?\W*Resolution Steps:?$', re.IGNORECASE)
+
+
+def _connect():
+    """Open the recall index, populating it from the session folders the first time."""
+    conn = session.connect_index()
+    is_new = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'recall_docs'"
+    ).fetchone() is None
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS recall_docs (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            command TEXT NOT NULL,
+            error TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            minhash BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS recall_docs_session ON recall_docs (session_id);
+        CREATE TABLE IF NOT EXISTS recall_bands (
+            band INTEGER NOT NULL,
+            hash INTEGER NOT NULL,
+            doc_id INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS recall_bands_lookup ON recall_bands (band, hash);
+        CREATE INDEX IF NOT EXISTS recall_bands_doc ON recall_bands (doc_id);
+        CREATE TABLE IF NOT EXISTS recall_state (
+            session_id TEXT PRIMARY KEY,
+            signature TEXT NOT NULL
+        );
+    """)
+    if is_new:
+        with conn:
+            _update(conn)
+    return conn
+
+
+def _signature(session_dir):
+    """Fingerprint of the files we index, used to skip unchanged sessions."""
+    parts = []
+    for name in ("events.jsonl", "summary.md"):
+        try:
+            stat = (session_dir / name).stat()
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+def extract_resolution(summary_text):
+    """The "Resolution Steps" lines of a summary, or None if it has none."""
+    steps = None
+    for line in summary_text.split('\n'):
+        line = line.strip()
+        if steps is None:
+            if RESOLUTION_RE.match(line):
+                steps = []
+        elif HEADING_RE.match(line):
+            break
+        elif line:
+            steps.append(line)
+    return '\n'.join(steps) if steps else None
+
+
+def error_lines(block):
+    """The lines of a command block (command line first) that report its error."""
+    lines = [
+        line.strip() for line in block[1:]
+        if compress.ERROR_RE.search(line) and not line.startswith("(exit status")
+    ]
+    return lines[:MAX_ERROR_LINES]
+
+
+def last_error(log_text):
+    """(command, error_lines) of the most recent failing command in a cleaned log, or None."""
+    for block in reversed(compress.split_blocks(log_text)):
+        lines = error_lines(block)
+        if lines:
+            command = parser.match_prompt(block[0])
+            return (command or "").strip(), lines
+    return None
+
+
+def _shingles(text):
+    """Words and word pairs of an error, with numbers, ids and addresses masked."""
+    words = WORD_RE.findall(compress.VOLATILE_RE.sub('#', text).lower())
+    shingles = set(words)
+    shingles.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return shingles
+
+
+def minhash(text):
+    """MinHash signature of an error's shingles (None for text with no words)."""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text)]
+    if not hashes:
+        return None
+    return array('Q', [min((a * h + b) % _PRIME for h in hashes) for a, b in _HASH_PARAMS])
+
+
+def _band_hashes(signature):
+    """One stable hash per band of the signature."""
+    return [
+        zlib.crc32(signature[band * ROWS:(band + 1) * ROWS].tobytes())
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def _iter_documents(session_dir):
+    """Yield (command, error, resolution, signature) for each distinct failing command of a resolved session."""
+    try:
+        resolution = extract_resolution((session_dir / "summary.md").read_text(encoding="utf-8", errors="ignore"))
+    except FileNotFoundError:
+        return
+    if not resolution:
+        return
+
+    log_text = parser.build_session_log(parser.parse_jsonl(session_dir / "events.jsonl"))
+    seen = set()
+    for block in compress.split_blocks(log_text):
+        lines = error_lines(block)
+        if not lines:
+            continue
+        error = '\n'.join(lines)
+        signature = minhash(error)
+        if signature is None or signature.tobytes() in seen:
+            continue
+        seen.add(signature.tobytes())
+        yield (parser.match_prompt(block[0]) or "").strip(), error, resolution, signature
+        if len(seen) >= MAX_DOCS_PER_SESSION:
+            return
+
+
+def _index(conn, session_id):
+    """(Re)index one session inside the caller's transaction."""
+    session_dir = session.get_session_dir(session_id)
+    conn.execute(
+        "DELETE FROM recall_bands WHERE doc_id IN (SELECT id FROM recall_docs WHERE session_id = ?)",
+        (session_id,),
+    )
+    conn.execute("DELETE FROM recall_docs WHERE session_id = ?", (session_id,))
+    conn.execute("DELETE FROM recall_state WHERE session_id = ?", (session_id,))
+    if not session_dir.is_dir():
+        return
+    for command, error, resolution, signature in _iter_documents(session_dir):
+        doc_id = conn.execute(
+            "INSERT INTO recall_docs (session_id, command, error, resolution, minhash) VALUES (?, ?, ?, ?, ?)",
+            (session_id, command, error, resolution, signature.tobytes()),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO recall_bands VALUES (?, ?, ?)",
+            [(band, value, doc_id) for band, value in enumerate(_band_hashes(signature))],
+        )
+    conn.execute(
+        "INSERT INTO recall_state VALUES (?, ?)",
+        (session_id, _signature(session_dir)),
+    )
+
+
+def index_session(session_id):
+    """Add or refresh one session in the recall index (removes it if deleted)."""
+    with closing(_connect()) as conn, conn:
+        _index(conn, session_id)
+
+
+def update_index():
+    """Bring the recall index up to date with the session folders.
+
+    Returns the number of sessions (re)indexed or removed.
+    """
+    with closing(_connect()) as conn, conn:
+        return _update(conn)
+
+
+def _update(conn):
+    """Re-index changed sessions and drop deleted ones. Returns how many were touched."""
+    on_disk = {
+        d.name: _signature(d) for d in session.SESSIONS_DIR.iterdir() if d.is_dir()
+    }
+    indexed = dict(conn.execute("SELECT session_id, signature FROM recall_state"))
+    stale = [sid for sid, sig in on_disk.items() if indexed.get(sid) != sig]
+    stale += [sid for sid in indexed if sid not in on_disk]
+    for session_id in stale:
+        _index(conn, session_id)
+    return len(stale)
+
+
+def lookup(log_text, exclude=None, limit=3):
+    """Past sessions whose error resembles the most recent error in log_text.
+
+    Args:
+        log_text (str): A cleaned log (clean_text or build_session_log output).
+        exclude (str, optional): Session to leave out (the one being asked about).
+        limit (int): Maximum number of sessions to return.
+
+    Returns:
+        list: Best match per distinct resolution, most similar first: dicts
+        with session_id, name, started_at, similarity, command, error and
+        resolution.
+    """
+    found = last_error(log_text)
+    if not found:
+        return []
+    signature = minhash('\n'.join(found[1]))
+    if signature is None:
+        return []
+
+    with closing(_connect()) as conn:
+        candidates = set()
+        for band, value in enumerate(_band_hashes(signature)):
+            candidates.update(
+                row[0] for row in conn.execute(
+                    "SELECT doc_id FROM recall_bands WHERE band = ? AND hash = ?", (band, value)
+                )
+            )
+        if not candidates:
+            return []
+
+        placeholders = ",".join("?" * len(candidates))
+        rows = conn.execute(
+            f"""
+            SELECT recall_docs.*, sessions.name AS name, sessions.started_at AS started_at
+            FROM recall_docs
+            LEFT JOIN sessions ON sessions.session_id = recall_docs.session_id
+            WHERE recall_docs.id IN ({placeholders})
+            """,
+            list(candidates),
+        ).fetchall()
+
+    best = {}
+    for row in rows:
+        if row["session_id"] == exclude:
+            continue
+        score = similarity(signature, array('Q', row["minhash"]))
+        if score < MIN_SIMILARITY or score <= best.get(row["session_id"], {}).get("similarity", 0):
+            continue
+        best[row["session_id"]] = {
+            "session_id": row["session_id"],
+            "name": row["name"] or row["session_id"],
+            "started_at": row["started_at"] or "",
+            "similarity": score,
+            "command": row["command"],
+            "error": row["error"],
+            "resolution": row["resolution"],
+        }
+    # Sessions fixed the same way are shown once, by their closest error
+    matches = []
+    resolutions = set()
+    for match in sorted(best.values(), key=lambda match: -match["similarity"]):
+        if match["resolution"] not in resolutions:
+            resolutions.add(match["resolution"])
+            matches.append(match)
+    return matches[:limit]
@@ -0,0 +1,193 @@
+"""Search: full-text index over recorded commands, outputs, and summaries."""
+
+import itertools
+import json
+from contextlib import closing
+
+from . import session
+
+# Markers wrapped around matched terms in snippets (replaced by the CLI)
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# Ranked matches fetched per page, per result wanted. A session can match
+# in several documents (one per command, plus its summary), so a page holds
+# more rows than results; another page is read if it wasn't enough.
+DOCS_PER_RESULT = 4
+
+
+def _connect():
+    """Open the search index (it lives next to the session index in index.db).
+
+    The first time the index is created it is populated from the session
+    folders, so sessions recorded earlier are searchable right away.
+    """
+    conn = session.connect_index()
+    is_new = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'session_text'"
+    ).fetchone() is None
+    # Documents live in a plain table (indexed by session for cheap
+    # re-indexing); session_text is an external-content FTS5 index over it,
+    # kept in sync by triggers.
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS session_docs (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            content TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS session_docs_session ON session_docs (session_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS session_text USING fts5(
+            content, content='session_docs', content_rowid='id'
+        );
+        CREATE TRIGGER IF NOT EXISTS session_docs_insert AFTER INSERT ON session_docs BEGIN
+            INSERT INTO session_text (rowid, content) VALUES (new.id, new.content);
+        END;
+        CREATE TRIGGER IF NOT EXISTS session_docs_delete AFTER DELETE ON session_docs BEGIN
+            INSERT INTO session_text (session_text, rowid, content)
+            VALUES ('delete', old.id, old.content);
+        END;
+        CREATE TABLE IF NOT EXISTS session_text_state (
+            session_id TEXT PRIMARY KEY,
+            signature TEXT NOT NULL
+        );
+    """)
+    if is_new:
+        with conn:
+            _update(conn)
+    return conn
+
+
+def _signature(session_dir):
+    """Fingerprint of the files we index, used to skip unchanged sessions."""
+    parts = []
+    for name in ("events.jsonl", "summary.md"):
+        try:
+            stat = (session_dir / name).stat()
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append("-")
+    return "|".join(parts)
+
+
+def _iter_documents(session_id, session_dir):
+    """Yield (session_id, kind, content) rows: one per command block, plus the summary."""
+    block = []
+    try:
+        with open(session_dir / "events.jsonl", "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("type") == "command":
+                    if block:
+                        yield session_id, "command", "\n".join(block)
+                    block = [f"$ {event.get('command', '')}"]
+                elif event.get("type") == "output" and block:
+                    block.append(event.get("content", ""))
+    except FileNotFoundError:
+        pass
+    if block:
+        yield session_id, "command", "\n".join(block)
+
+    summary_file = session_dir / "summary.md"
+    if summary_file.exists():
+        yield session_id, "summary", summary_file.read_text(encoding="utf-8", errors="ignore")
+
+
+def _index(conn, session_id):
+    """(Re)index one session inside the caller's transaction."""
+    session_dir = session.get_session_dir(session_id)
+    conn.execute("DELETE FROM session_docs WHERE session_id = ?", (session_id,))
+    conn.execute("DELETE FROM session_text_state WHERE session_id = ?", (session_id,))
+    if not session_dir.is_dir():
+        return
+    conn.executemany(
+        "INSERT INTO session_docs (session_id, kind, content) VALUES (?, ?, ?)",
+        _iter_documents(session_id, session_dir),
+    )
+    conn.execute(
+        "INSERT INTO session_text_state VALUES (?, ?)",
+        (session_id, _signature(session_dir)),
+    )
+
+
+def index_session_text(session_id):
+    """Add or refresh one session in the search index (removes it if deleted)."""
+    with closing(_connect()) as conn, conn:
+        _index(conn, session_id)
+
+
+def update_index():
+    """Bring the search index up to date with the session folders.
+
+    Only sessions whose events or summary changed since they were last
+    indexed are re-read. Returns the number of sessions (re)indexed or removed.
+    """
+    with closing(_connect()) as conn, conn:
+        return _update(conn)
+
+
+def _update(conn):
+    """Re-index changed sessions and drop deleted ones. Returns how many were touched."""
+    on_disk = {
+        d.name: _signature(d) for d in session.SESSIONS_DIR.iterdir() if d.is_dir()
+    }
+    indexed = dict(conn.execute("SELECT session_id, signature FROM session_text_state"))
+    stale = [sid for sid, sig in on_disk.items() if indexed.get(sid) != sig]
+    stale += [sid for sid in indexed if sid not in on_disk]
+    for session_id in stale:
+        _index(conn, session_id)
+    return len(stale)
+
+
+def _to_fts_query(query):
+    """Quote each word so punctuation (ports, paths, colons) is matched literally."""
+    terms = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def search(query, limit=10):
+    """Search all sessions. Returns the best match per session, best first.
+
+    Each result has session_id, name, started_at, kind ("command" or
+    "summary"), and a snippet with matches wrapped in MATCH_START/MATCH_END.
+    """
+    fts_query = _to_fts_query(query)
+    if not fts_query:
+        return []
+
+    page_size = limit * DOCS_PER_RESULT
+    results = []
+    seen = set()
+    with closing(_connect()) as conn:
+        # Snippets are only built for the rows of each page, not for every
+        # match in the archive
+        for offset in itertools.count(0, page_size):
+            rows = conn.execute(
+                f"""
+                SELECT session_docs.session_id AS session_id, session_docs.kind AS kind,
+                       snippet(session_text, 0, '{MATCH_START}', '{MATCH_END}', '…', 16) AS snippet,
+                       sessions.name AS name, sessions.started_at AS started_at
+                FROM session_text
+                JOIN session_docs ON session_docs.id = session_text.rowid
+                LEFT JOIN sessions ON sessions.session_id = session_docs.session_id
+                WHERE session_text MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+                """,
+                (fts_query, page_size, offset),
+            ).fetchall()
+            for row in rows:
+                if row["session_id"] in seen:
+                    continue
+                seen.add(row["session_id"])
+                result = dict(row)
+                result["name"] = result["name"] or result["session_id"]
+                result["started_at"] = result["started_at"] or ""
+                results.append(result)
+                if len(results) >= limit:
+                    return results
+            if len(rows) < page_size:
+                break
+    return results
@@ -1,7 +1,11 @@
 """Session management: IDs, PID tracking, paths, and lifecycle."""
 
+import fcntl
+import io
 import os
 import json
+import sqlite3
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime
 import random
@@ -11,6 +15,18 @@ HOME = Path.home()
 FIXTRACE_DIR = HOME / ".fixtrace"
 SESSIONS_DIR = FIXTRACE_DIR / "sessions"
 ACTIVE_PID_FILE = FIXTRACE_DIR / "active_session.pid"
+INDEX_DB = FIXTRACE_DIR / "index.db"
+JOBS_DIR = FIXTRACE_DIR / "jobs"
+
+# Status shown for a session with a background summary job (see jobs.py)
+JOB_STATUS = {
+    "queued": "🕒 Queued",
+    "running": "⚙️ Summarizing",
+    "failed": "❌ Failed",
+}
+
+# First block size for reading logs backwards from EOF (doubles each step)
+TAIL_BLOCK_SIZE = 64 * 1024
 
 
 def ensure_dirs():
@@ -47,11 +63,47 @@ def create_session(name=None):
         "started_at": datetime.now().isoformat(),
     }
     
+    save_metadata(session_dir, metadata)
+    
+    index_session(session_id)
+    
+    return session_id, session_dir
+
+
+def load_metadata(session_dir):
+    """Read a session's metadata.json. Returns {} if it doesn't exist."""
+    metadata_file = session_dir / "metadata.json"
+    if not metadata_file.exists():
+        return {}
+    with open(metadata_file, "r") as f:
+        return json.load(f)
+
+
+def save_metadata(session_dir, metadata):
+    """Write a session's metadata.json atomically."""
     metadata_file = session_dir / "metadata.json"
-    with open(metadata_file, "w") as f:
+    tmp_file = session_dir / "metadata.json.tmp"
+    with open(tmp_file, "w") as f:
         json.dump(metadata, f, indent=2)
+    os.replace(tmp_file, metadata_file)
+
+
+def update_metadata(session_dir, update):
+    """Apply update(metadata) to a session's metadata.json and save it, under a lock.
     
-    return session_id, session_dir
+    ask, the daemon, prefetch and summaries all write metadata.json (see
+    stats.record). Holding the lock from the read to the write stops one
+    writer from overwriting another's change. Returns the updated metadata,
+    or {} (nothing is written) if the session has none.
+    """
+    with open(session_dir / "metadata.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        metadata = load_metadata(session_dir)
+        if not metadata:
+            return {}
+        update(metadata)
+        save_metadata(session_dir, metadata)
+        return metadata
 
 
 def save_active_pid(session_id, pid):
@@ -86,34 +138,179 @@ def get_session_dir(session_id):
     return SESSIONS_DIR / session_id
 
 
-def list_sessions():
-    """List all sessions with metadata."""
+def _read_session_record(session_dir):
+    """Build the index record for a session directory, or None if it has no metadata."""
+    metadata_file = session_dir / "metadata.json"
+    if not metadata_file.exists():
+        return None
+    
+    with open(metadata_file, "r") as f:
+        metadata = json.load(f)
+    
+    # A pending summary job decides the status; otherwise check if complete
+    job_state = _read_job_state(metadata["session_id"])
+    if job_state in JOB_STATUS:
+        status = JOB_STATUS[job_state]
+    elif (session_dir / "summary.md").exists():
+        status = "✅ Complete"
+    else:
+        status = "⏳ In Progress"
+    
+    return {
+        "session_id": metadata["session_id"],
+        "name": metadata.get("name", metadata["session_id"]),
+        "started_at": metadata.get("started_at", ""),
+        "status": status,
+    }
+
+
+def _read_job_state(session_id):
+    """State of the session's summary job ("queued", "running", "failed"), or None."""
+    try:
+        with open(JOBS_DIR / f"{session_id}.json", "r") as f:
+            return json.load(f).get("state")
+    except (OSError, ValueError):
+        return None
+
+
+def connect_index():
+    """Open the session index, creating (and populating) it on first use."""
     ensure_dirs()
-    sessions = []
-    
-    if not SESSIONS_DIR.exists():
-        return sessions
-    
-    for session_dir in sorted(SESSIONS_DIR.iterdir(), reverse=True):
-        if not session_dir.is_dir():
-            continue
-        
-        metadata_file = session_dir / "metadata.json"
-        if metadata_file.exists():
-            with open(metadata_file, "r") as f:
-                metadata = json.load(f)
-            
-            # Check if complete
-            has_markdown = (session_dir / "summary.md").exists()
-            
-            sessions.append({
-                "session_id": metadata["session_id"],
-                "name": metadata.get("name", metadata["session_id"]),
-                "started_at": metadata.get("started_at", ""),
-                "status": "✅ Complete" if has_markdown else "⏳ In Progress",
-            })
-    
-    return sessions
+    is_new = not INDEX_DB.exists()
+    
+    conn = sqlite3.connect(str(INDEX_DB), timeout=5)
+    conn.row_factory = sqlite3.Row
+    # Python's lower() so name filtering matches str.lower() for non-ASCII names
+    conn.create_function("py_lower", 1, str.lower)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            status TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at);
+        CREATE INDEX IF NOT EXISTS sessions_status ON sessions (status COLLATE NOCASE);
+    """)
+    
+    if is_new:
+        _rebuild(conn)
+    return conn
+
+
+def _rebuild(conn):
+    """Replace the index contents with a scan of SESSIONS_DIR."""
+    records = []
+    for session_dir in SESSIONS_DIR.iterdir():
+        if session_dir.is_dir():
+            try:
+                record = _read_session_record(session_dir)
+            except (ValueError, KeyError, OSError):
+                continue  # Unreadable metadata; leave it out of the index
+            if record:
+                records.append(record)
+    
+    with conn:
+        conn.execute("DELETE FROM sessions")
+        conn.executemany(
+            "INSERT INTO sessions VALUES (:session_id, :name, :started_at, :status)",
+            records,
+        )
+    return len(records)
+
+
+def rebuild_index():
+    """Rebuild the session index from the session folders. Returns the session count."""
+    with closing(connect_index()) as conn:
+        return _rebuild(conn)
+
+
+def index_session(session_id):
+    """Refresh one session's entry in the index (removing it if the folder is gone)."""
+    session_dir = get_session_dir(session_id)
+    record = _read_session_record(session_dir) if session_dir.is_dir() else None
+    
+    with closing(connect_index()) as conn, conn:
+        if record:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (:session_id, :name, :started_at, :status)",
+                record,
+            )
+        else:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+
+def list_sessions(name=None, status=None, since=None):
+    """List sessions with metadata, newest first.
+    
+    Args:
+        name (str, optional): Partial, case-insensitive match on the session name.
+        status (str, optional): Exact, case-insensitive match on the status.
+        since (str, optional): Only sessions started at or after this ISO date/time.
+    """
+    query = "SELECT session_id, name, started_at, status FROM sessions"
+    conditions = []
+    params = []
+    if name:
+        conditions.append("instr(py_lower(name), ?) > 0")
+        params.append(name.lower())
+    if status:
+        conditions.append("status = ? COLLATE NOCASE")
+        params.append(status)
+    if since:
+        conditions.append("started_at >= ?")
+        params.append(since)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY started_at DESC, session_id DESC"
+    
+    with closing(connect_index()) as conn:
+        return [dict(row) for row in conn.execute(query, params)]
+
+
+def get_latest_session():
+    """Return the most recently started session, or None if there are none."""
+    with closing(connect_index()) as conn:
+        row = conn.execute(
+            "SELECT session_id, name, started_at, status FROM sessions"
+            " ORDER BY started_at DESC, session_id DESC LIMIT 1"
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def read_last_lines(path, lines, block_size=TAIL_BLOCK_SIZE, start=0, end=None):
+    """Return the last N lines of a text file without reading all of it.
+    
+    Blocks are read backwards from EOF until they hold more than N lines, so
+    the cost depends on N rather than on the file size. The first line of the
+    buffer may be partial (and may start in the middle of a multi-byte UTF-8
+    character), so it is dropped unless the start of the file was reached.
+    The result matches ``"".join(f.readlines()[-lines:])`` on the file opened
+    in text mode with ``errors='ignore'`` and ``newline='\\n'`` (a bare \\r is
+    not a line break; clean_text renders it as an overwrite).
+    
+    start and end (default EOF) limit it to that byte range of the file, as
+    if the file held only those bytes.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        buf = b''
+        while True:
+            read_size = min(block_size, pos - start)
+            pos -= read_size
+            f.seek(pos)
+            buf = f.read(read_size) + buf
+            block_size *= 2
+
+            if pos > start and buf.count(b'\n') <= lines:
+                continue
+            text = buf.decode('utf-8', errors='ignore')
+            all_lines = io.StringIO(text, newline='\n').readlines()
+            if pos == start:
+                return "".join(all_lines[-lines:])
+            if len(all_lines) - 1 >= lines:
+                return "".join(all_lines[1:][-lines:])
+
 
 def get_recent_log_content(session_dir, lines=50):
     """Read the last N lines from the session's raw.txt file."""
@@ -122,10 +319,10 @@ def get_recent_log_content(session_dir, lines=50):
         return ""
     
     try:
-        # Simple implementation: read all lines and take the last N
-        # For huge files, we'd want to use `seek` from the end, but for MVP this is fine.
-        with open(raw_file, 'r', encoding='utf-8', errors='ignore') as f:
-            all_lines = f.readlines()
-            return "".join(all_lines[-lines:])
+        if lines <= 0:
+            # Preserve readlines()[-0:] semantics (the whole file)
+            with open(raw_file, 'r', encoding='utf-8', errors='ignore', newline='\n') as f:
+                return f.read()
+        return read_last_lines(raw_file, lines)
     except Exception as e:
-        return f"[Error reading log: {str(e)}]"
\ No newline at end of file
+        return f"[Error reading log: {str(e)}]"
@@ -0,0 +1,113 @@
+"""Stats: per-stage timing spans, kept in each session's metadata.json and aggregated by `fixtrace stats`."""
+
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import session
+
+# Pipeline stages in the order they run (`fixtrace stats` lists them so).
+# "parse" covers cleaning, prompt detection and writing events.jsonl, which
+# the parser does together in one streaming pass.
+STAGES = ("read_raw", "clean", "parse", "build_log", "recall", "classify", "prefetch", "ai_call", "write_markdown")
+
+# Runs kept per session; older ones are dropped so repeated asks don't grow
+# metadata.json without bound
+MAX_RUNS = 50
+
+
+class Timer:
+    """Timing spans for one command run: stage -> {"seconds", "bytes", "tokens"}."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def span(self, stage):
+        """Time the block as stage. Set "bytes" / "tokens" on the yielded dict to record them too.
+
+        A block that raises is not recorded.
+        """
+        counts = {}
+        started = time.perf_counter()
+        yield counts
+        self.add(stage, time.perf_counter() - started, **counts)
+
+    def add(self, stage, seconds, **counts):
+        """Add a span; spans of the same stage within a run are summed."""
+        entry = self.stages.setdefault(stage, {"seconds": 0.0})
+        entry["seconds"] += seconds
+        for key, value in counts.items():
+            entry[key] = entry.get(key, 0) + value
+
+
+def record(session_dir, command, timer):
+    """Append a run's spans to the session's metadata.json (best-effort)."""
+    if not timer.stages:
+        return
+    run = {
+        "command": command,
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "stages": {
+            stage: dict(span, seconds=round(span["seconds"], 6))
+            for stage, span in timer.stages.items()
+        },
+    }
+
+    def add_run(metadata):
+        runs = metadata.setdefault("timings", [])
+        runs.append(run)
+        del runs[:-MAX_RUNS]
+
+    try:
+        session.update_metadata(session_dir, add_run)
+    except Exception:
+        pass  # Timing must never break the command it measures
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list (fraction 0.5 = median)."""
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def aggregate(command=None, since=None):
+    """Per-stage p50/p95 across sessions.
+
+    Args:
+        command (str, optional): Only runs of this command (start, generate, ask).
+        since (str, optional): Only sessions started at or after this ISO date/time.
+
+    Returns:
+        dict: stage -> {"runs", "p50", "p95" (seconds), "bytes_p50", "tokens_p50"},
+        ordered as STAGES (unknown stages last).
+    """
+    samples = {}
+    for sess in session.list_sessions(since=since):
+        try:
+            metadata = session.load_metadata(session.get_session_dir(sess["session_id"]))
+        except (ValueError, OSError):
+            continue
+        for run in metadata.get("timings", []):
+            if command and run.get("command") != command:
+                continue
+            for stage, span in run.get("stages", {}).items():
+                samples.setdefault(stage, []).append(span)
+
+    order = list(STAGES) + sorted(set(samples) - set(STAGES))
+    result = {}
+    for stage in order:
+        spans = samples.get(stage)
+        if not spans:
+            continue
+        seconds = [span["seconds"] for span in spans]
+        result[stage] = {
+            "runs": len(spans),
+            "p50": percentile(seconds, 0.5),
+            "p95": percentile(seconds, 0.95),
+        }
+        for key in ("bytes", "tokens"):
+            values = [span[key] for span in spans if key in span]
+            result[stage][f"{key}_p50"] = percentile(values, 0.5) if values else None
+    return result
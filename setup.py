@@ -5,7 +5,7 @@ from setuptools import setup, find_packages
 setup(
     name="fixtrace",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "typer>=0.9.0",
         "rich>=13.0.0",
@@ -0,0 +1,52 @@
+"""Shared fixtures: every test runs against its own empty ~/.fixtrace."""
+
+import pytest
+
+from fixtrace import ai, cache, classify, jobs, parser, redact, session
+
+
+@pytest.fixture(autouse=True)
+def fixtrace_dir(tmp_path, monkeypatch):
+    """Point every fixtrace path at a fresh directory, with the built-in rules only."""
+    home = tmp_path / ".fixtrace"
+    monkeypatch.setattr(session, "FIXTRACE_DIR", home)
+    monkeypatch.setattr(session, "SESSIONS_DIR", home / "sessions")
+    monkeypatch.setattr(session, "ACTIVE_PID_FILE", home / "active_session.pid")
+    monkeypatch.setattr(session, "INDEX_DB", home / "index.db")
+    monkeypatch.setattr(session, "JOBS_DIR", home / "jobs")
+    monkeypatch.setattr(cache, "CACHE_DIR", home / "cache")
+    monkeypatch.setattr(cache, "STATS_FILE", home / "cache" / "stats.json")
+    monkeypatch.setattr(jobs, "WORKER_LOCK", home / "jobs" / "worker.lock")
+    monkeypatch.setattr(jobs, "LOG_FILE", home / "worker.log")
+    # The user's own rule files must not change what the tests see
+    monkeypatch.setattr(redact, "_matcher", redact.Matcher(redact.DEFAULT_RULES))
+    monkeypatch.setattr(classify, "_classifier", classify.Classifier(classify.DEFAULT_RULES))
+    monkeypatch.setattr(ai, "_settings", None)
+    return home
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Replace the model with a stand-in; returns the list of prompts it was sent."""
+    prompts = []
+
+    def request(prompt):
+        prompts.append(prompt)
+        return f"answer {len(prompts)}"
+
+    monkeypatch.setattr(ai, "_request", request)
+    monkeypatch.setattr(ai, "_request_stream", lambda prompt: iter([request(prompt)]))
+    return prompts
+
+
+@pytest.fixture
+def make_session():
+    """Returns a function that creates a parsed session with a failing command: (session_id, session_dir)."""
+
+    def make(index=0):
+        session_id, session_dir = session.create_session(f"s{index}")
+        (session_dir / "raw.txt").write_text(f"user@host:~$ make {index}\r\nerror: build {index} failed\r\n")
+        parser.parse_raw_to_jsonl(session_dir / "raw.txt", session_dir / "events.jsonl")
+        return session_id, session_dir
+
+    return make
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from fixtrace import ai, bulk
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = bulk.RateLimiter(20)
+    calls = []
+    lock = threading.Lock()
+
+    def call():
+        limiter.wait()
+        with lock:
+            calls.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    calls.sort()
+    gaps = [b - a for a, b in zip(calls, calls[1:])]
+    assert min(gaps) >= 0.05 - 0.005
+    assert calls[-1] - calls[0] >= 5 * 0.05 - 0.01
+
+
+def test_rate_limiter_first_call_and_no_limit_do_not_wait():
+    for rate in (5, 0, None):
+        started = time.monotonic()
+        bulk.RateLimiter(rate).wait()
+        assert time.monotonic() - started < 0.05
+    limiter = bulk.RateLimiter(0)
+    started = time.monotonic()
+    for _ in range(100):
+        limiter.wait()
+    assert time.monotonic() - started < 0.05
+
+
+def test_cached_summaries_are_not_rate_limited(model, make_session):
+    session_ids = [make_session(i)[0] for i in range(5)]
+    results = list(bulk.summarize_sessions(session_ids, rate=5))
+    assert [error for _, _, error in results] == [None] * 5
+    assert len(model) == 5
+
+    started = time.monotonic()
+    results = list(bulk.summarize_sessions(session_ids, rate=5))
+    # Five rate-limited requests would take at least 0.8s
+    assert time.monotonic() - started < 0.5
+    assert [error for _, _, error in results] == [None] * 5
+    assert len(model) == 5
+
+
+def test_summary_fingerprint_marks_finished_summaries(model, make_session, monkeypatch):
+    session_id, session_dir = make_session()
+    assert not bulk.is_up_to_date(session_id)
+    md_file, error = bulk.summarize_session(session_id)
+    assert error is None
+    assert "answer 1" in md_file.read_text()
+    assert bulk.is_up_to_date(session_id)
+
+    # A new summary prompt or model makes every summary stale
+    monkeypatch.setattr(ai, "SUMMARY_PROMPT", ai.SUMMARY_PROMPT + "\nBe brief.")
+    assert not bulk.is_up_to_date(session_id)
+
+
+def test_interrupted_summary_is_not_up_to_date(model, make_session, monkeypatch):
+    session_id, session_dir = make_session()
+    bulk.summarize_session(session_id)
+
+    def interrupted(log_text, on_progress=None, **kwargs):
+        on_progress("half a summ")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(ai, "generate_summary", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        bulk.summarize_session(session_id)
+    assert "half a summ" in (session_dir / "summary.md").read_text()
+    assert not bulk.is_up_to_date(session_id)
+
+
+def test_failed_summary_restores_the_previous_one(model, make_session, monkeypatch):
+    session_id, session_dir = make_session()
+    bulk.summarize_session(session_id)
+    previous = (session_dir / "summary.md").read_text()
+
+    def fails(log_text, on_progress=None, **kwargs):
+        on_progress("half a summ")
+        return None, "Model API error: boom"
+
+    monkeypatch.setattr(ai, "generate_summary", fails)
+    assert bulk.summarize_session(session_id) == (None, "Model API error: boom")
+    assert (session_dir / "summary.md").read_text() == previous
+    assert bulk.is_up_to_date(session_id)
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from fixtrace import classify
+
+
+def log(command, *output):
+    return "\n".join([f"user@host:~/app$ {command}", *output, "user@host:~/app$ fixtrace ask"])
+
+
+# (rule, log it answers, a suggestion line it must contain)
+POSITIVE = [
+    ("module_not_found", log("python app.py", "ModuleNotFoundError: No module named 'yaml'"), "pip install PyYAML"),
+    ("node_module_not_found", log("node index.js", "Error: Cannot find module 'express/lib/router'"), "npm install express"),
+    ("port_in_use", log("npm start", "Error: listen EADDRINUSE: address already in use :::3000"), "lsof -i tcp:3000"),
+    ("address_in_use", log("./server", "OSError: [Errno 98] Address already in use"), "lsof -nP -iTCP -sTCP:LISTEN"),
+    ("command_not_found", log("pnpm dev", "bash: pnpm: command not found"), "command -v pnpm"),
+    ("script_not_executable", log("./deploy.sh", "bash: ./deploy.sh: Permission denied"), "chmod +x ./deploy.sh"),
+    (
+        "docker_socket",
+        log("docker ps", "Got permission denied while trying to connect to the Docker daemon socket at unix:///var/run/docker.sock"),
+        "sudo usermod -aG docker $USER",
+    ),
+    (
+        "npm_global_eacces",
+        log("npm install -g typescript", "npm ERR! Error: EACCES: permission denied, mkdir '/usr/local/lib/node_modules/typescript'"),
+        "mkdir -p ~/.npm-global && npm config set prefix ~/.npm-global",
+    ),
+    ("missing_env_var", log("python app.py", "KeyError: 'DATABASE_URL'"), "export DATABASE_URL=<value>"),
+]
+
+# (rule, a log that looks like its error but isn't one it should answer)
+NEGATIVE = [
+    # A dotted name's package can't be told from its first component
+    ("module_not_found", log("python app.py", "ModuleNotFoundError: No module named 'google.genai'")),
+    ("node_module_not_found", log("node index.js", "Error: Cannot find name 'express'")),
+    ("port_in_use", log("cat notes.md", "remember to check port 3000")),
+    ("address_in_use", log("grep -r bind src", "src/server.py: sock.bind(address)")),
+    ("command_not_found", log("grep -c found results.txt", "not found: 0")),
+    ("script_not_executable", log("cat /etc/shadow", "cat: /etc/shadow: Permission denied")),
+    ("docker_socket", log("docker ps", "Cannot connect to the Docker daemon. Is the docker daemon running?")),
+    ("npm_global_eacces", log("touch /etc/hosts", "touch: cannot touch '/etc/hosts': Permission denied")),
+    # Not an environment variable's name
+    ("missing_env_var", log("python app.py", "KeyError: 'user_id'")),
+]
+
+
+@pytest.mark.parametrize("rule, text, suggestion", POSITIVE, ids=[case[0] for case in POSITIVE])
+def test_rule_answers_its_error(rule, text, suggestion):
+    name, answer = classify.classify(text)
+    assert name == rule
+    assert answer.startswith("💡 Analysis: ")
+    assert f"🚀 Suggestion: {suggestion}" in answer
+
+
+@pytest.mark.parametrize("rule, text", NEGATIVE, ids=[case[0] for case in NEGATIVE])
+def test_rule_ignores_lookalikes(rule, text):
+    result = classify.classify(text)
+    assert result is None or result[0] != rule
+
+
+def test_every_rule_is_covered():
+    assert {case[0] for case in POSITIVE} == set(classify.DEFAULT_RULES)
+    assert {case[0] for case in NEGATIVE} == set(classify.DEFAULT_RULES)
+
+
+def test_only_the_latest_error_is_answered():
+    text = "\n".join([
+        log("python app.py", "ModuleNotFoundError: No module named 'flask'"),
+        "user@host:~/app$ pytest",
+        "E   AssertionError: assert 1 == 2",
+    ])
+    assert classify.classify(text) is None
+
+
+def test_user_rules_come_first(tmp_path):
+    rules_file = tmp_path / "error_rules.json"
+    rules_file.write_text(json.dumps({
+        "rules": {"yarn_missing": {
+            "pattern": "yarn: command not found",
+            "analysis": "Yarn isn't installed.",
+            "suggestion": "corepack enable",
+        }},
+        "disabled": ["module_not_found"],
+    }))
+    classifier = classify.Classifier(classify.load_rules(rules_file))
+    assert classifier.classify(log("yarn", "bash: yarn: command not found"))[0] == "yarn_missing"
+    assert classifier.classify(log("python app.py", "ModuleNotFoundError: No module named 'yaml'")) is None
+
+
+def test_invalid_rule_raises():
+    with pytest.raises(ValueError):
+        classify.Classifier({"broken": {"pattern": "x"}})
@@ -0,0 +1,62 @@
+from fixtrace import compress
+
+
+def test_collapse_repeats_keeps_the_last_line_of_a_run():
+    lines = ["Retrying...", "Retrying...", "Retrying...", "Connected"]
+    assert compress.collapse_repeats(lines) == ["Retrying... (×3)", "Connected"]
+
+
+def test_collapse_repeats_ignores_addresses_ids_and_timestamps():
+    lines = [
+        "2026-01-17 10:00:01 worker 0x7f3a2c waiting",
+        "2026-01-17 10:00:02 worker 0x7f3b10 waiting",
+        "2026-01-17T10:00:03Z worker 0x7f3c44 waiting",
+    ]
+    assert compress.collapse_repeats(lines) == ["2026-01-17T10:00:03Z worker 0x7f3c44 waiting (×3)"]
+
+
+def test_collapse_repeats_keeps_lines_that_differ_in_other_numbers():
+    # Line numbers, ports and status codes matter to the model
+    lines = ["foo.py:12: error: boom", "foo.py:40: error: boom", "GET /api 200", "GET /api 500"]
+    assert compress.collapse_repeats(lines) == lines
+
+
+def test_collapse_repeats_only_merges_adjacent_lines():
+    lines = ["a", "b", "a", "a"]
+    assert compress.collapse_repeats(lines) == ["a", "b", "a (×2)"]
+
+
+def test_truncate_output_leaves_short_output_alone():
+    lines = [f"line {i}" for i in range(compress.HEAD_LINES + compress.TAIL_LINES)]
+    assert compress.truncate_output(lines, len(lines)) == lines
+
+
+def test_truncate_output_keeps_head_tail_and_errors():
+    lines = [f"line {i}" for i in range(100)]
+    lines[50] = "ERROR: disk full"
+    result = compress.truncate_output(lines, 40)
+
+    context = compress.ERROR_CONTEXT_LINES
+    assert result[:compress.HEAD_LINES] == lines[:compress.HEAD_LINES]
+    assert result[-compress.TAIL_LINES:] == lines[-compress.TAIL_LINES:]
+    error_at = result.index("ERROR: disk full")
+    assert result[error_at - context:error_at + context + 1] == lines[50 - context:50 + context + 1]
+    assert result[compress.HEAD_LINES] == f"... ({50 - context - compress.HEAD_LINES} lines omitted) ..."
+    assert result[error_at + context + 1] == f"... ({100 - compress.TAIL_LINES - 51 - context} lines omitted) ..."
+
+
+def test_truncate_output_merges_overlapping_context():
+    lines = [f"line {i}" for i in range(100)]
+    lines[20] = lines[23] = "Traceback (most recent call last):"
+    result = compress.truncate_output(lines, 40)
+    assert lines[17:27] == result[result.index(lines[17]):result.index(lines[17]) + 10]
+    assert sum(line.endswith("lines omitted) ...") for line in result) == 2
+
+
+def test_compress_log_gives_the_latest_failure_more_room():
+    old = ["user@host:~/app$ make"] + [f"cc -c file{i}.c" for i in range(100)]
+    latest = ["user@host:~/app$ pytest"] + [f"test_{i} PASSED" for i in range(99)] + ["test_99 FAILED"]
+    result = compress.compress_log("\n".join(old + latest)).split("\n")
+    assert len(result) < len(old) + len(latest)
+    # The older block is cut to MAX_BLOCK_LINES; the failing one fits whole
+    assert result[-len(latest):] == latest
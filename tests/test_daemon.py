@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from fixtrace import cli, daemon
+
+
+@pytest.fixture
+def socket_path(monkeypatch):
+    # Unix socket paths are limited to about 100 characters, less than
+    # pytest's tmp_path can take
+    socket_dir = Path(tempfile.mkdtemp(prefix="fixtrace"))
+    monkeypatch.setattr(daemon, "SOCKET_PATH", socket_dir / "daemon.sock")
+    yield daemon.SOCKET_PATH
+    daemon.stop()
+    shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+@pytest.mark.parametrize("question", [[], ["why did make fail?"]])
+def test_daemon_sends_the_same_prompt_as_in_process_ask(model, make_session, socket_path, question):
+    session_id, session_dir = make_session()
+    runner = CliRunner()
+    args = ["ask", *question, "--no-cache", "--no-rules"]
+
+    result = runner.invoke(cli.app, args)
+    assert result.exit_code == 0, result.output
+    assert "via daemon" not in result.output
+
+    threading.Thread(target=daemon.serve, daemon=True).start()
+    for _ in range(50):
+        if daemon.is_running():
+            break
+        time.sleep(0.05)
+    result = runner.invoke(cli.app, args + ["--verbose"])
+    assert result.exit_code == 0, result.output
+    assert "via daemon" in result.output
+
+    assert len(model) == 2
+    assert model[0] == model[1]
+    assert "error: build 0 failed" in model[0]
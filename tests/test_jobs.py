@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from fixtrace import bulk, jobs
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """Record start_worker calls instead of spawning a worker; returns the list of calls."""
+    calls = []
+    monkeypatch.setattr(jobs, "start_worker", lambda: calls.append(True) or True)
+    return calls
+
+
+def test_resume_starts_a_worker_only_for_queued_jobs(started, make_session):
+    jobs.resume()
+    assert started == []
+
+    session_id, _ = make_session()
+    job = jobs.enqueue(session_id)
+    job["state"] = "failed"
+    jobs._save(job)
+    jobs.resume()
+    assert started == []
+
+    jobs.enqueue(session_id)
+    jobs.resume()
+    assert started == [True]
+
+
+def test_successful_run_removes_the_job(model, make_session):
+    session_id, _ = make_session()
+    jobs._run(jobs.enqueue(session_id))
+    assert jobs.load(session_id) is None
+    assert bulk.is_up_to_date(session_id)
+
+
+def test_failed_run_is_retried_with_backoff(monkeypatch, make_session):
+    monkeypatch.setattr(bulk, "summarize_session", lambda *args, **kwargs: (None, "Model API error: boom"))
+    session_id, _ = make_session()
+    jobs.enqueue(session_id)
+
+    for attempt in range(1, jobs.MAX_ATTEMPTS):
+        before = time.time()
+        jobs._run(jobs.load(session_id))
+        job = jobs.load(session_id)
+        assert (job["state"], job["attempts"], job["error"]) == ("queued", attempt, "Model API error: boom")
+        delay = jobs.RETRY_DELAY * 2 ** (attempt - 1)
+        assert before + delay <= job["next_attempt"] <= time.time() + delay
+
+    jobs._run(jobs.load(session_id))
+    job = jobs.load(session_id)
+    assert (job["state"], job["attempts"]) == ("failed", jobs.MAX_ATTEMPTS)
+
+
+def test_job_for_a_deleted_session_is_dropped():
+    jobs.enqueue("2026-01-01-gone00")
+    jobs._run(jobs.load("2026-01-01-gone00"))
+    assert jobs.list_jobs() == []
+
+
+def test_drain_requeues_jobs_left_running(model, make_session):
+    # A worker that died mid-job leaves it "running"
+    session_id, _ = make_session()
+    job = jobs.enqueue(session_id)
+    job.update(state="running", pid=999999)
+    jobs._save(job)
+    other_id, _ = make_session(1)
+    jobs.enqueue(other_id)
+
+    jobs._drain()
+    assert jobs.list_jobs() == []
+    assert bulk.is_up_to_date(session_id) and bulk.is_up_to_date(other_id)
+
+
+def test_only_one_worker_holds_the_lock():
+    lock_file = jobs._lock()
+    try:
+        assert jobs.is_worker_running()
+        assert jobs.run_worker() is False
+    finally:
+        lock_file.close()
+    assert not jobs.is_worker_running()
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+import pytest
+
+from fixtrace import parser
+from fixtrace.capture import TIMING_HEADER
+
+PROMPT = "user@host:~/app$ "
+MARK_A, MARK_B, MARK_C = "\x1b]133;A\x07", "\x1b]133;B\x07", "\x1b]133;C\x07"
+
+PLAIN_LOG = (
+    "Script started on 2026-01-17\r\n"
+    f"{PROMPT}ls\r\n"
+    "app.py  README.md\r\n"
+    f"{PROMPT}pyets\x08\x08\x08test -q\r\n"
+    "collecting 1 item\rcollected 3 items\r\n"
+    "foo.py:12: error: boom\r\n"
+    f"{PROMPT}echo done\r\n"
+    "done\r\n"
+)
+
+
+def _marked(command, output, status):
+    return f"{MARK_A}{PROMPT}{MARK_B}{command}\r\n{MARK_C}{output}\x1b]133;D;{status}\x07"
+
+
+MARKER_LOG = (
+    # Prompt detection until the hook shows up
+    f"{PROMPT}source ~/.bashrc\r\n"
+    "loaded\r\n"
+    + _marked("make", "src/a.c:3: error: expected ';'\r\nmake: *** [build] Error 1\r\n", 2)
+    # Printed after D and before the next prompt: not any command's output
+    + "background job finished\r\n"
+    + _marked("ls", "app.py\r\n", 0)
+    + f"{MARK_A}{PROMPT}{MARK_B}"
+)
+
+LOGS = {"plain": PLAIN_LOG, "markers": MARKER_LOG}
+
+
+def _events(jsonl_file, timestamps=False):
+    events = [json.loads(line) for line in jsonl_file.read_text().splitlines()]
+    if not timestamps:
+        for event in events:
+            event.pop("timestamp")
+    return events
+
+
+def _timing(data, chunk_size):
+    """A timing sidecar for data written in chunk_size pieces, a second apart."""
+    lines = [f"{TIMING_HEADER}1700000000.000000\n"]
+    for start in range(0, len(data), chunk_size):
+        lines.append(f"1.000000 {len(data[start:start + chunk_size])}\n")
+    return lines
+
+
+def batch_parse(tmp_path, data, timing=None):
+    raw_file = tmp_path / "batch.txt"
+    raw_file.write_bytes(data)
+    timing_file = None
+    if timing:
+        timing_file = tmp_path / "batch_timing.txt"
+        timing_file.write_text("".join(timing))
+    parser.parse_raw_to_jsonl(raw_file, tmp_path / "batch.jsonl", timing_file)
+    return tmp_path / "batch.jsonl"
+
+
+def live_parse(tmp_path, data, chunk_size=7, timing=None):
+    """Feed data to follow_raw_file a few bytes at a time, as a live session would."""
+    raw_file = tmp_path / "live.txt"
+    jsonl_file = tmp_path / "live.jsonl"
+    raw_file.write_bytes(b"")
+    timing_file = None
+    if timing:
+        timing_file = tmp_path / "live_timing.txt"
+        timing_file.write_text(timing[0])
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=parser.follow_raw_file,
+        args=(raw_file, jsonl_file, tmp_path / "live_state.json", stop),
+        kwargs={"interval": 0.001, "timing_file": timing_file},
+    )
+    thread.start()
+    with open(raw_file, "ab") as raw:
+        for i, start in enumerate(range(0, len(data), chunk_size)):
+            # Timing first, as the pty engine writes it
+            if timing:
+                with open(timing_file, "a") as f:
+                    f.write(timing[i + 1])
+            raw.write(data[start:start + chunk_size])
+            raw.flush()
+            time.sleep(0.002)
+    stop.set()
+    thread.join()
+    return jsonl_file
+
+
+@pytest.mark.parametrize("name", sorted(LOGS))
+def test_live_parse_matches_batch(tmp_path, name):
+    data = LOGS[name].encode()
+    assert _events(live_parse(tmp_path, data)) == _events(batch_parse(tmp_path, data))
+
+
+@pytest.mark.parametrize("name", sorted(LOGS))
+def test_live_parse_matches_batch_with_timing(tmp_path, name):
+    data = LOGS[name].encode()
+    timing = _timing(data, 7)
+    live = _events(live_parse(tmp_path, data, timing=timing), timestamps=True)
+    assert live == _events(batch_parse(tmp_path, data, timing=timing), timestamps=True)
+    assert all(event["timestamp"].startswith("2023-11-1") for event in live)
+
+
+def test_plain_log_events(tmp_path):
+    events = _events(batch_parse(tmp_path, PLAIN_LOG.encode()))
+    assert events == [
+        {"type": "command", "command": "ls"},
+        {"type": "output", "content": "app.py  README.md"},
+        # Backspaces and carriage returns are rendered as a terminal would
+        {"type": "command", "command": "pytest -q"},
+        {"type": "output", "content": "collected 3 items\nfoo.py:12: error: boom"},
+        {"type": "command", "command": "echo done"},
+        {"type": "output", "content": "done"},
+    ]
+
+
+def test_marker_log_events(tmp_path):
+    events = _events(batch_parse(tmp_path, MARKER_LOG.encode()))
+    assert events == [
+        {"type": "command", "command": "source ~/.bashrc"},
+        {"type": "output", "content": "loaded"},
+        {"type": "command", "command": "make"},
+        {"type": "output", "content": "src/a.c:3: error: expected ';'\nmake: *** [build] Error 1"},
+        {"type": "exit", "exit_code": 2},
+        {"type": "command", "command": "ls"},
+        {"type": "output", "content": "app.py"},
+        {"type": "exit", "exit_code": 0},
+    ]
+
+
+def test_markers_found_after_the_first_read_block(tmp_path, monkeypatch):
+    # The switch to marker parsing happens mid-file, in a later block
+    monkeypatch.setattr(parser, "READ_CHUNK_SIZE", 64)
+    data = (PLAIN_LOG * 5 + MARKER_LOG).encode()
+    events = _events(batch_parse(tmp_path, data))
+    assert events[-2:] == [{"type": "output", "content": "app.py"}, {"type": "exit", "exit_code": 0}]
+    assert _events(live_parse(tmp_path, data, chunk_size=97)) == events
+
+
+def test_read_parsed_log_tail_matches_full_read(tmp_path):
+    data = (PLAIN_LOG * 20).encode() + f"{PROMPT}tail -f log\r\nstill running\r\n".encode()
+    live_parse(tmp_path, data, chunk_size=4096)
+    args = (tmp_path / "live.jsonl", tmp_path / "live_state.json", tmp_path / "live.txt")
+    full = parser.read_parsed_log(*args)
+    for lines in (1, 3, 10, 1000):
+        assert parser.read_parsed_log(*args, lines=lines) == "\n".join(full.split("\n")[-lines:])
+
+
+def test_timeline_maps_offsets_and_releases_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser.Timeline, "COMPACT_AFTER", 4)
+    timing_file = tmp_path / "timing.txt"
+    timing_file.write_text(f"{TIMING_HEADER}1700000000.000000\n" + "1.000000 10\n" * 20)
+    timeline = parser.Timeline(timing_file)
+    assert timeline.timestamp(0) == timeline.timestamp(9)
+    assert timeline.timestamp(10) > timeline.timestamp(9)
+    assert timeline.timestamp(500) is None
+    timeline.release(100)
+    assert len(timeline.ends) < 20
+    # Lookups after the released offset still see the right chunk
+    assert timeline.timestamp(105) == parser.Timeline(timing_file).timestamp(105)